@@ -1,96 +1,991 @@
+import contextlib
+import copy
 import datetime
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import List, Optional
-from dataclasses import dataclass, field
+from dataclasses import asdict
+import json
+import logging
 import math
+import os
+import threading
+import time
 
+import numpy as np
 
-# ==================== 데이터 클래스 정의 ====================
-
-@dataclass
-class RoutePreference:
-    """사용자의 여행 선호도 (route_preferences 테이블)"""
-    preference_id: Optional[int] = None
-    user_id: int = 0
-    start_date: Optional[datetime.date] = None
-    end_date: Optional[datetime.date] = None
-    theme_id: int = 0
-    schedule_type: str = "relaxed"  # relaxed or packed
-    travelers_count: int = 1
-    preferred_language: str = "en"
-    transport_mode: str = "public"  # walk, public, taxi, car
-    created_at: Optional[datetime.datetime] = None
-
-
-@dataclass
-class Activity:
-    """일정에 포함될 활동/관광지 (itinerary_activities 테이블)"""
-    # 기본 정보
-    activity_id: Optional[int] = None
-    activity_name: str = ""
-    lat: float = 0.0
-    lon: float = 0.0
-    
-    # 일정 관련
-    itinerary_id: Optional[int] = None
-    activity_order: int = 0
-    activity_time: Optional[datetime.time] = None
-    activity_description: Optional[str] = None
-    
-    # 위치 정보
-    location_id: Optional[int] = None  # locations 테이블 FK
-    location_name: Optional[str] = None
-    location_address: Optional[str] = None
-    
-    # 비용 및 시간
-    estimated_duration_minutes: int = 120  # 기본 2시간
-    estimated_cost: Optional[float] = None
-    
-    # 카테고리
-    activity_category_id: Optional[int] = None
-    
-    # 알고리즘용 추가 필드
-    priority_score: float = 0.0
-    categories: List[str] = field(default_factory=list)  # 알고리즘 계산용
-    
-    @property
-    def avg_duration_hours(self) -> float:
-        """시간 단위로 변환"""
-        return self.estimated_duration_minutes / 60
-
-
-@dataclass
-class DailyItinerary:
-    """일일 일정 (route_itinerary 테이블)"""
-    itinerary_id: Optional[int] = None
-    route_id: Optional[int] = None
-    day_number: int = 1
-    day_date: datetime.date = None
-    day_description: Optional[str] = None
-    
-    # 활동 리스트
-    activities: List[Activity] = field(default_factory=list)
-    
-    # 계산 값
-    total_distance: float = 0.0
-    total_estimated_cost: float = 0.0
-
-
-@dataclass
-class Route:
-    """전체 여행 루트 (recommended_routes 테이블)"""
-    route_id: Optional[int] = None
-    preference_id: Optional[int] = None
-    route_name: str = ""
-    route_description: Optional[str] = None
-    total_estimated_cost: Optional[float] = None
-    difficulty_level: str = "easy"  # easy, moderate, challenging
-    generated_at: Optional[datetime.datetime] = None
-    is_active: bool = True
-    ai_model: str = "custom_greedy_algorithm"
-    ai_version: str = "1.0"
-    
-    # 일정 리스트
-    itinerary: List[DailyItinerary] = field(default_factory=list)
+# 데이터 모델, 계측, 카탈로그 소스(API/스냅샷/테마 역색인), 사용자 선호 벡터는 별도 모듈
+from route_models import (
+    popularity_score,
+    RoutePreference,
+    Activity,
+    DailyItinerary,
+    Route,
+    ActivityTable,
+    SharedActivityTable,
+)
+from route_metrics import (
+    RouteTrace,
+    _CURRENT_TRACE,
+    current_trace,
+    MetricsRegistry,
+    METRICS,
+    _db_timed,
+    _TracedCursor,
+)
+from catalog_api_client import (
+    CatalogApiClient,
+    default_catalog_client,
+)
+from catalog_snapshot import (
+    CatalogSnapshot,
+)
+from theme_index import (
+    ThemeLocationIndex,
+)
+from user_preference import (
+    RATING_PREFERENCE_WEIGHT,
+    feature_code,
+    sparse_add,
+    UserPreferenceVector,
+    UserPreferenceStore,
+)
+
+EARTH_RADIUS_KM = 6371
+
+# 일정 최적화 방식 -> Route.ai_model
+AI_MODELS = {
+    "greedy": "custom_greedy_algorithm",
+    "beam": "beam_search_orienteering",
+}
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 거리 계산 유틸 ====================
+
+def haversine_matrix(lats, lons, to_lats=None, to_lons=None) -> np.ndarray:
+    """
+    좌표 집합 간 Haversine 거리 행렬 (km)
+
+    Parameters:
+    - lats, lons: 출발 지점 위도/경도 배열 (도 단위)
+    - to_lats, to_lons: 도착 지점 위도/경도 배열 (생략시 출발 지점과 동일)
+
+    Returns:
+    - np.ndarray: (len(lats), len(to_lats)) 거리 행렬
+    """
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))[:, None]
+    if to_lats is None:
+        lat2, lon2 = lat1.T, lon1.T
+    else:
+        lat2 = np.radians(np.asarray(to_lats, dtype=np.float64))[None, :]
+        lon2 = np.radians(np.asarray(to_lons, dtype=np.float64))[None, :]
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS_KM * c
+
+
+class DistanceMatrix:
+    """
+    활동 좌표 집합에 대한 거리 행렬 (km)
+    
+    n x n 전체를 미리 계산하지 않고, 그리디 탐색에서 실제로 방문한 지점의 행만
+    벡터 연산으로 계산해 캐시한다. 카탈로그가 커져도 메모리는 O(방문 수 x n).
+    """
+    
+    def __init__(self, lats, lons):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self._rows = {}
+    
+    @classmethod
+    def from_activities(cls, activities: List["Activity"]) -> "DistanceMatrix":
+        lats = np.fromiter((a.lat for a in activities), dtype=np.float64, count=len(activities))
+        lons = np.fromiter((a.lon for a in activities), dtype=np.float64, count=len(activities))
+        return cls(lats, lons)
+    
+    def __len__(self) -> int:
+        return self.lats.size
+    
+    def row(self, i: int) -> np.ndarray:
+        """i번 지점에서 모든 지점까지의 거리"""
+        row = self._rows.get(i)
+        if row is None:
+            row = haversine_matrix(self.lats[i:i + 1], self.lons[i:i + 1],
+                                   self.lats, self.lons)[0]
+            self._rows[i] = row
+        return row
+    
+    def __getitem__(self, key):
+        """matrix[i, j] / matrix[i, indices] 형태의 조회"""
+        i, cols = key
+        return self.row(int(i))[cols]
+    
+    def pairwise(self, indices) -> np.ndarray:
+        """선택된 지점들 사이의 부분 거리 행렬"""
+        indices = np.asarray(indices, dtype=np.intp)
+        return haversine_matrix(self.lats[indices], self.lons[indices])
+
+
+class SpatialGridIndex:
+    """
+    활동 좌표에 대한 격자(grid) 공간 인덱스
+    
+    위경도를 km 평면으로 근사 투영한 뒤 cell_km 크기의 격자 칸에 인덱스를 담아둔다.
+    반경 질의는 반경을 덮는 칸만 확인하므로 전체 카탈로그를 매번 훑지 않는다.
+    삭제는 alive 플래그로 처리한다 (O(1), 재구축 불필요).
+    """
+    
+    KM_PER_DEG_LAT = 110.574
+    
+    def __init__(self, lats, lons, cell_km: float = 2.0):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_km = cell_km
+        self.alive = np.ones(self.lats.size, dtype=bool)
+        
+        ref_lat = float(self.lats.mean()) if self.lats.size else 0.0
+        self._km_per_deg_lon = 111.320 * math.cos(math.radians(ref_lat))
+        
+        # 격자 칸 번호 계산 후 칸별로 인덱스 묶기
+        cx, cy = self._cell(self.lats, self.lons)
+        self._cells = {}
+        if self.lats.size:
+            order = np.lexsort((cy, cx))
+            keys = np.stack([cx[order], cy[order]], axis=1)
+            boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+            for chunk in np.split(order, boundaries):
+                self._cells[(int(cx[chunk[0]]), int(cy[chunk[0]]))] = chunk
+    
+    @classmethod
+    def from_activities(cls, activities: List["Activity"], cell_km: float = 2.0) -> "SpatialGridIndex":
+        lats = np.fromiter((a.lat for a in activities), dtype=np.float64, count=len(activities))
+        lons = np.fromiter((a.lon for a in activities), dtype=np.float64, count=len(activities))
+        return cls(lats, lons, cell_km)
+    
+    def _cell(self, lats, lons):
+        cx = np.floor(np.asarray(lons) * self._km_per_deg_lon / self.cell_km).astype(np.int64)
+        cy = np.floor(np.asarray(lats) * self.KM_PER_DEG_LAT / self.cell_km).astype(np.int64)
+        return cx, cy
+    
+    def remove(self, indices):
+        """인덱스 삭제 (이후 질의에서 제외)"""
+        self.alive[indices] = False
+    
+    def restore_all(self):
+        """삭제된 인덱스 전부 복구"""
+        self.alive[:] = True
+    
+    def query(self, lat: float, lon: float, radius_km: float, k: int, predicate=None) -> tuple:
+        """
+        반경 내 가까운 후보 k개 조회
+        
+        Parameters:
+        - lat, lon: 기준 좌표
+        - radius_km: 탐색 반경
+        - k: 최대 반환 개수
+        - predicate: 후보 인덱스 배열 -> bool 배열 (추가 필터, 예: 시간 제약)
+        
+        Returns:
+        - (indices, distances): 인덱스 오름차순으로 정렬된 후보와 거리(km)
+        """
+        cx, cy = self._cell(lat, lon)
+        reach = int(math.ceil(radius_km / self.cell_km))
+        chunks = [
+            self._cells[(int(cx) + dx, int(cy) + dy)]
+            for dx in range(-reach, reach + 1)
+            for dy in range(-reach, reach + 1)
+            if (int(cx) + dx, int(cy) + dy) in self._cells
+        ]
+        if not chunks:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        
+        idx = np.concatenate(chunks)
+        keep = self.alive[idx]
+        if predicate is not None:
+            keep &= predicate(idx)
+        idx = idx[keep]
+        if idx.size == 0:
+            return idx, np.empty(0)
+        
+        dist = haversine_matrix([lat], [lon], self.lats[idx], self.lons[idx])[0]
+        inside = dist <= radius_km
+        idx, dist = idx[inside], dist[inside]
+        if idx.size > k:
+            nearest = np.argpartition(dist, k - 1)[:k]
+            idx, dist = idx[nearest], dist[nearest]
+        
+        order = np.argsort(idx)
+        return idx[order], dist[order]
+
+
+# ==================== 여행 지역 ====================
+
+def preference_region(preference: RoutePreference) -> Optional[tuple]:
+    """
+    선호도의 여행 지역 (카탈로그 조회 조건 + 캐시 키, 지역 제한이 없으면 None)
+    
+    Returns:
+    - ("radius", lat, lon, radius_km) 또는 ("bbox", min_lat, min_lon, max_lat, max_lon)
+      좌표는 소수점 5자리(약 1m)로 반올림해 같은 지역이 같은 키가 되게 한다
+    """
+    anchor = (preference.anchor_lat, preference.anchor_lon, preference.radius_km)
+    if preference.bbox is not None:
+        if any(v is not None for v in anchor):
+            raise ValueError("기준점/반경과 bbox는 함께 지정할 수 없습니다.")
+        if len(preference.bbox) != 4:
+            raise ValueError("bbox는 (min_lat, min_lon, max_lat, max_lon) 형식이어야 합니다.")
+        min_lat, min_lon, max_lat, max_lon = (round(float(v), 5) for v in preference.bbox)
+        if not (-90 <= min_lat < max_lat <= 90 and -180 <= min_lon < max_lon <= 180):
+            raise ValueError(f"잘못된 bbox: {preference.bbox}")
+        return ("bbox", min_lat, min_lon, max_lat, max_lon)
+    
+    if all(v is None for v in anchor):
+        return None
+    if any(v is None for v in anchor):
+        raise ValueError("anchor_lat, anchor_lon, radius_km는 함께 지정해야 합니다.")
+    lat, lon, radius_km = (float(v) for v in anchor)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius_km <= 0:
+        raise ValueError(f"잘못된 기준점/반경: {anchor}")
+    return ("radius", round(lat, 5), round(lon, 5), round(radius_km, 3))
+
+
+def region_bounds(region: tuple) -> tuple:
+    """
+    지역을 감싸는 경계 상자 (min_lat, min_lon, max_lat, max_lon) - 공간 인덱스 범위 조회용
+    
+    반경 지역은 구면에서 원에 외접하는 상자 (경도 폭은 원이 가장 넓어지는 위도 기준)
+    """
+    if region[0] == "bbox":
+        return region[1:]
+    _, lat, lon, radius_km = region
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    ratio = math.sin(angle) / max(math.cos(math.radians(lat)), 1e-12)
+    dlon = 180.0 if ratio >= 1 else math.degrees(math.asin(ratio))
+    return (max(-90.0, lat - dlat), max(-180.0, lon - dlon),
+            min(90.0, lat + dlat), min(180.0, lon + dlon))
+
+
+def region_mask(region: tuple, lats, lons) -> np.ndarray:
+    """좌표 배열 중 지역 안에 있는 항목 (bool 배열, 경계 포함)"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    min_lat, min_lon, max_lat, max_lon = region_bounds(region)
+    mask = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+    if region[0] == "radius" and mask.any():
+        # 상자 안의 후보만 실제 거리 확인
+        _, lat, lon, radius_km = region
+        idx = np.flatnonzero(mask)
+        mask[idx] = haversine_matrix([lat], [lon], lats[idx], lons[idx])[0] <= radius_km
+    return mask
+
+
+# ==================== 일자별 지역 분할 ====================
+
+def _project_km(lats, lons) -> np.ndarray:
+    """위경도 -> 평균 위도 기준 평면 좌표 (km), 군집화용 근사"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    ref_lat = math.radians(float(lats.mean())) if lats.size else 0.0
+    return np.column_stack([
+        lons * 111.320 * math.cos(ref_lat),
+        lats * 110.574,
+    ])
+
+
+def _sweep_labels(points: np.ndarray, num_groups: int) -> np.ndarray:
+    """중심점 기준 각도순으로 정렬 후 같은 크기로 나누기"""
+    center = points.mean(axis=0)
+    angles = np.arctan2(points[:, 1] - center[1], points[:, 0] - center[0])
+    order = np.argsort(angles, kind="stable")
+    labels = np.empty(points.shape[0], dtype=np.intp)
+    for group, members in enumerate(np.array_split(order, num_groups)):
+        labels[members] = group
+    return labels
+
+
+def _balanced_assign(dist: np.ndarray, capacity: int) -> np.ndarray:
+    """
+    용량 제한 할당: 각 점을 가까운 중심부터 시도하되 중심별로 capacity개까지만 받는다.
+    (총 용량 >= 점 수이면 중심 수만큼의 라운드 안에 모두 할당된다)
+    """
+    n, k = dist.shape
+    preference = np.argsort(dist, axis=1, kind="stable")
+    labels = np.full(n, -1, dtype=np.intp)
+    remaining = np.full(k, capacity, dtype=np.intp)
+    for rank in range(k):
+        pending = np.flatnonzero(labels < 0)
+        if pending.size == 0:
+            break
+        choice = preference[pending, rank]
+        for group in range(k):
+            members = pending[choice == group]
+            if members.size == 0 or remaining[group] <= 0:
+                continue
+            take = members[np.argsort(dist[members, group], kind="stable")[:remaining[group]]]
+            labels[take] = group
+            remaining[group] -= take.size
+    return labels
+
+
+def cluster_day_groups(lats, lons, num_days: int, method: str = "kmeans",
+                       scores=None, iterations: int = 10) -> List[np.ndarray]:
+    """
+    활동을 여행 일수만큼의 지역 그룹으로 분할
+    
+    Parameters:
+    - lats, lons: 좌표 배열
+    - num_days: 그룹 수
+    - method: "sweep" (중심 기준 각도 분할) or "kmeans" (용량 제한 k-means, sweep으로 초기화)
+    - scores: 점수 배열 (있으면 최고 점수가 높은 그룹이 앞 날짜가 된다)
+    - iterations: k-means 반복 횟수
+    
+    Returns:
+    - List[np.ndarray]: 날짜별 인덱스 배열 (크기는 최대 ceil(n / num_days))
+    """
+    points = _project_km(lats, lons)
+    n = points.shape[0]
+    num_days = max(1, min(num_days, n))
+    if n == 0:
+        return [np.empty(0, dtype=np.intp)]
+    
+    labels = _sweep_labels(points, num_days)
+    if method == "kmeans":
+        capacity = -(-n // num_days)
+        for _ in range(iterations):
+            centers = np.array([points[labels == g].mean(axis=0) for g in range(num_days)])
+            dist = np.linalg.norm(points[:, None, :] - centers[None, :, :], axis=2)
+            new_labels = _balanced_assign(dist, capacity)
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+    elif method != "sweep":
+        raise ValueError(f"지원하지 않는 day_clustering: {method}")
+    
+    groups = [np.flatnonzero(labels == g) for g in range(num_days)]
+    if scores is not None:
+        scores = np.asarray(scores)
+        groups.sort(key=lambda g: -scores[g].max() if g.size else np.inf)
+    return groups
+
+
+# ==================== 이동 시간 계산 ====================
+
+class TravelTimeProvider:
+    """
+    이동 시간 계산기 기본 클래스
+    
+    RoutePreference.transport_mode별로 하나씩 등록해 사용한다.
+    거리(km)와 출발/도착 location_id를 받아 이동 시간(시간 단위)을 돌려준다.
+    """
+    
+    def travel_hours(self, distances_km, from_ids=None, to_ids=None) -> np.ndarray:
+        """
+        Parameters:
+        - distances_km: 거리 배열 (스칼라 또는 행렬)
+        - from_ids, to_ids: distances_km와 broadcast 가능한 location_id 배열
+        
+        Returns:
+        - np.ndarray: 이동 시간 (시간)
+        """
+        raise NotImplementedError
+    
+    def reach_km(self, hours: float) -> float:
+        """주어진 시간 안에 이동 가능한 대략적인 직선 거리 (공간 인덱스 반경용)"""
+        raise NotImplementedError
+
+
+class SpeedTravelTimeProvider(TravelTimeProvider):
+    """
+    속도 + 우회 계수 모델
+    
+    이동 시간 = 직선 거리 x detour_factor / speed_kmh + overhead_minutes
+    (overhead: 대기/환승/주차 등 고정 시간, 같은 장소 간 이동에는 적용하지 않음)
+    """
+    
+    def __init__(self, speed_kmh: float, detour_factor: float = 1.0, overhead_minutes: float = 0.0):
+        self.speed_kmh = speed_kmh
+        self.detour_factor = detour_factor
+        self.overhead_minutes = overhead_minutes
+    
+    def travel_hours(self, distances_km, from_ids=None, to_ids=None) -> np.ndarray:
+        distances_km = np.asarray(distances_km, dtype=np.float64)
+        hours = distances_km * self.detour_factor / self.speed_kmh
+        if self.overhead_minutes:
+            hours = hours + np.where(distances_km > 0, self.overhead_minutes / 60, 0.0)
+        return hours
+    
+    def reach_km(self, hours: float) -> float:
+        return max(0.0, hours - self.overhead_minutes / 60) * self.speed_kmh / self.detour_factor
+
+
+class MatrixTravelTimeProvider(TravelTimeProvider):
+    """
+    미리 계산된 이동 시간 행렬 백엔드
+    
+    행렬은 TravelTimeMatrixStore가 저장한 .npy 파일을 memory-map으로 연다.
+    pickle시 파일 경로만 전달되므로 워커 프로세스들이 같은 페이지 캐시를 공유한다.
+    행렬에 없는 location_id 쌍은 fallback으로 계산한다.
+    """
+    
+    def __init__(self, matrix_path, ids_path, fallback: TravelTimeProvider):
+        self.matrix_path = str(matrix_path)
+        self.ids_path = str(ids_path)
+        self.fallback = fallback
+        self._matrix = None
+        self._ids = None
+    
+    def __getstate__(self):
+        return {"matrix_path": self.matrix_path, "ids_path": self.ids_path, "fallback": self.fallback}
+    
+    def __setstate__(self, state):
+        self.__init__(**state)
+    
+    def _open(self):
+        if self._matrix is None:
+            self._matrix = np.load(self.matrix_path, mmap_mode="r")
+            self._ids = np.load(self.ids_path)  # 정렬된 location_id
+        return self._matrix, self._ids
+    
+    def _positions(self, location_ids):
+        _, ids = self._open()
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        pos = np.searchsorted(ids, location_ids)
+        pos = np.minimum(pos, ids.size - 1)
+        return pos, ids[pos] == location_ids
+    
+    def travel_hours(self, distances_km, from_ids=None, to_ids=None) -> np.ndarray:
+        hours = self.fallback.travel_hours(distances_km, from_ids, to_ids)
+        if from_ids is None or to_ids is None:
+            return hours
+        
+        matrix, _ = self._open()
+        from_pos, from_found = self._positions(from_ids)
+        to_pos, to_found = self._positions(to_ids)
+        found = from_found & to_found
+        if np.any(found):
+            from_pos, to_pos, found = np.broadcast_arrays(from_pos, to_pos, found)
+            hours = np.broadcast_to(hours, found.shape).astype(np.float64)
+            hours[found] = matrix[from_pos[found], to_pos[found]]
+        return hours
+    
+    def reach_km(self, hours: float) -> float:
+        return self.fallback.reach_km(hours)
+
+
+class TravelTimeMatrixStore:
+    """
+    이동 시간 행렬 저장소 (.npy, memory-mapped)
+    
+    파일 구성 (directory 아래):
+    - {transport_mode}_{set_name}.npy      : (n, n) float32 이동 시간 행렬 (시간)
+    - {transport_mode}_{set_name}_ids.npy  : 행렬 행/열 순서의 location_id (오름차순)
+    """
+    
+    def __init__(self, directory: str = "cache/travel_time"):
+        self.directory = Path(directory)
+    
+    @staticmethod
+    def set_name_for(location_ids) -> str:
+        """location_id 집합의 해시 (set_name 기본값)"""
+        ids = np.unique(np.asarray(location_ids, dtype=np.int64))
+        return hashlib.sha1(ids.tobytes()).hexdigest()[:16]
+    
+    def _paths(self, transport_mode: str, set_name: str) -> tuple:
+        base = self.directory / f"{transport_mode}_{set_name}"
+        return base.with_name(base.name + ".npy"), base.with_name(base.name + "_ids.npy")
+    
+    def precompute(self, transport_mode: str, location_ids, lats, lons,
+                   provider: TravelTimeProvider, set_name: Optional[str] = None,
+                   block_rows: int = 1024) -> str:
+        """
+        위치 집합의 이동 시간 행렬 계산 후 저장 (행 블록 단위로 디스크에 직접 기록)
+        
+        Parameters:
+        - transport_mode: 이동수단
+        - location_ids, lats, lons: 위치 집합
+        - provider: 행렬을 채울 계산기 (예: 속도 모델, 외부 경로 API 래퍼)
+        - set_name: 저장 이름 (없으면 location_id 집합 해시)
+        
+        Returns:
+        - str: set_name
+        """
+        location_ids = np.asarray(location_ids, dtype=np.int64)
+        order = np.argsort(location_ids, kind="stable")
+        ids = location_ids[order]
+        lats = np.asarray(lats, dtype=np.float64)[order]
+        lons = np.asarray(lons, dtype=np.float64)[order]
+        set_name = set_name or self.set_name_for(ids)
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        matrix_path, ids_path = self._paths(transport_mode, set_name)
+        tmp_path = matrix_path.with_name(matrix_path.name + ".tmp")
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32,
+                                           shape=(ids.size, ids.size))
+        for start in range(0, ids.size, block_rows):
+            stop = min(start + block_rows, ids.size)
+            dist = haversine_matrix(lats[start:stop], lons[start:stop], lats, lons)
+            matrix[start:stop] = provider.travel_hours(dist, ids[start:stop, None], ids[None, :])
+        matrix.flush()
+        del matrix
+        
+        np.save(ids_path, ids)
+        os.replace(tmp_path, matrix_path)
+        return set_name
+    
+    def open(self, transport_mode: str, set_name: str,
+             fallback: TravelTimeProvider) -> Optional[MatrixTravelTimeProvider]:
+        """저장된 행렬을 provider로 열기 (없으면 None)"""
+        matrix_path, ids_path = self._paths(transport_mode, set_name)
+        if not (matrix_path.exists() and ids_path.exists()):
+            return None
+        return MatrixTravelTimeProvider(matrix_path, ids_path, fallback)
+
+
+# 이동수단별 기본 이동 시간 모델 (도심 평균 기준, 필요시 조정)
+TRANSPORT_PROFILES = {
+    "walk": {"speed_kmh": 4.5, "detour_factor": 1.25, "overhead_minutes": 0},
+    "public": {"speed_kmh": 22, "detour_factor": 1.35, "overhead_minutes": 10},  # 대기/환승
+    "taxi": {"speed_kmh": 28, "detour_factor": 1.3, "overhead_minutes": 5},      # 호출 대기
+    "car": {"speed_kmh": 32, "detour_factor": 1.3, "overhead_minutes": 10},      # 주차
+}
+
+
+def default_travel_time_providers() -> dict:
+    """transport_mode -> SpeedTravelTimeProvider"""
+    return {mode: SpeedTravelTimeProvider(**profile) for mode, profile in TRANSPORT_PROFILES.items()}
+
+
+# ==================== 카탈로그 캐시 ====================
+
+class ActivityCatalogCache:
+    """
+    (theme_id, transport_mode)별 활동 카탈로그 캐시
+    
+    - LRU: max_entries 개수 초과시 가장 오래 안 쓴 항목 제거
+    - TTL: ttl_seconds 이내는 그대로 사용 (hit)
+    - stale-while-revalidate: TTL이 지났어도 stale_seconds 이내면 기존 데이터를 바로
+      돌려주고 백그라운드 스레드에서 새로 조회
+    - 스냅샷: 조회 성공시 snapshot_dir에 JSON으로 저장, 조회 실패시 폴백으로 사용
+    """
+    
+    def __init__(self,
+                 max_entries: int = 64,
+                 ttl_seconds: float = 300,
+                 stale_seconds: float = 3600,
+                 snapshot_dir: Optional[str] = "cache/catalog"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        
+        self._entries = OrderedDict()  # key -> (activities, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        
+        # 통계
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        self.snapshot_fallbacks = 0
+    
+    def get(self, key: tuple, loader) -> List[Activity]:
+        """
+        캐시 조회 (없거나 너무 오래됐으면 loader 호출)
+        
+        Parameters:
+        - key: (theme_id, transport_mode) 또는 지역 제한시 (theme_id, transport_mode, region)
+        - loader: 인자 없는 함수, 실패시 예외 발생
+        
+        Returns:
+        - List[Activity]: 호출자가 수정해도 되는 사본
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                activities, fetched_at = entry
+                age = now - fetched_at
+                if age <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._copy(activities)
+                if age <= self.ttl_seconds + self.stale_seconds:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    self._refresh_in_background(key, loader)
+                    return self._copy(activities)
+            self.misses += 1
+        
+        try:
+            activities = loader()
+        except Exception as e:
+            logger.warning("카탈로그 조회 실패 %s: %s", key, e)
+            return self.fallback(key)
+        
+        self.put(key, activities)
+        return self._copy(activities)
+    
+    def put(self, key: tuple, activities: List[Activity]):
+        """캐시 저장 + 스냅샷 기록"""
+        with self._lock:
+            self._entries[key] = (activities, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._write_snapshot(key, activities)
+    
+    def fallback(self, key: tuple) -> List[Activity]:
+        """조회 실패시 폴백: 메모리의 (만료된) 항목 -> 디스크 스냅샷 -> 빈 리스트"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return self._copy(entry[0])
+        
+        activities = self._read_snapshot(key)
+        if activities:
+            with self._lock:
+                self.snapshot_fallbacks += 1
+        return activities
+    
+    def invalidate(self, key: Optional[tuple] = None):
+        """특정 항목 (None이면 전체) 무효화"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refresh_failures": self.refresh_failures,
+                "snapshot_fallbacks": self.snapshot_fallbacks,
+            }
+    
+    def _refresh_in_background(self, key: tuple, loader):
+        """백그라운드 갱신 (같은 key는 동시에 하나만, 호출자는 lock 보유 상태)"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                self.put(key, loader())
+            except Exception as e:
+                logger.warning("카탈로그 백그라운드 갱신 실패 %s: %s", key, e)
+                with self._lock:
+                    self.refresh_failures += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        threading.Thread(target=refresh, name=f"catalog-refresh-{key}", daemon=True).start()
+    
+    @staticmethod
+    def _copy(activities: List[Activity]) -> List[Activity]:
+        # 루트 엔진은 항목을 수정하지 않으므로(ActivityTable) 리스트만 복사한다
+        return list(activities)
+    
+    def _snapshot_path(self, key: tuple) -> Path:
+        theme_id, transport_mode = key[:2]
+        # 지역 제한 카탈로그: (theme_id, transport_mode, region)
+        suffix = f"_{hashlib.sha1(repr(key[2]).encode()).hexdigest()[:12]}" if len(key) > 2 else ""
+        return self.snapshot_dir / f"catalog_{theme_id}_{transport_mode}{suffix}.json"
+    
+    def _write_snapshot(self, key: tuple, activities: List[Activity]):
+        if self.snapshot_dir is None:
+            return
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            path = self._snapshot_path(key)
+            tmp = path.with_suffix(".tmp")
+            rows = [asdict(a) for a in activities]
+            tmp.write_text(json.dumps(rows, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning("카탈로그 스냅샷 저장 실패 %s: %s", key, e)
+    
+    def _read_snapshot(self, key: tuple) -> List[Activity]:
+        if self.snapshot_dir is None:
+            return []
+        path = self._snapshot_path(key)
+        if not path.exists():
+            return []
+        try:
+            rows = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("카탈로그 스냅샷 읽기 실패 %s: %s", key, e)
+            return []
+        # 카탈로그 단계의 활동은 일정 정보(activity_time 등)가 비어 있다
+        return [Activity(**{**row, "activity_time": None}) for row in rows]
+
+
+# ==================== 루트 결과 캐시 ====================
+
+def route_signature(preference: RoutePreference, variant: tuple = ()) -> tuple:
+    """
+    루트 생성 결과를 결정하는 항목 (같으면 같은 루트가 생성된다)
+    
+    Parameters:
+    - preference: 선호도 (테마, 이동수단, 일정 강도, 여행 일수, 여행 지역)
+    - variant: 선호도 밖의 결정 요소 (예: solver)
+    """
+    num_days = (preference.end_date - preference.start_date).days + 1
+    region = preference_region(preference)
+    signature = (preference.theme_id, preference.transport_mode, preference.schedule_type, num_days)
+    if region is not None:
+        signature += (region,)
+    return (*signature, *variant)
+
+
+class RouteResultCache:
+    """
+    생성된 루트 재사용 캐시 (LRU)
+    
+    키는 (route_signature, 카탈로그 버전)이며, 같은 signature로 다른 카탈로그 버전이
+    들어오면 이전 버전 항목은 제거된다. 저장/반환 모두 사본이므로 호출자가 루트를
+    수정하거나 저장(route_id 부여)해도 캐시에는 영향이 없다.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (signature, version) -> (Route, start_date)
+        self._versions = {}            # signature -> 최신 카탈로그 버전
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, preference: RoutePreference, catalog_version: str,
+            variant: tuple = ()) -> Optional[Route]:
+        """
+        캐시된 루트를 preference 기준으로 날짜를 옮겨 반환 (없으면 None)
+        """
+        signature = route_signature(preference, variant)
+        with self._lock:
+            entry = self._entries.get((signature, catalog_version))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((signature, catalog_version))
+            self.hits += 1
+            template, template_start = entry
+        return rebase_route(template, template_start, preference)
+    
+    def put(self, preference: RoutePreference, catalog_version: str, route: Route,
+            variant: tuple = ()):
+        """루트 저장 (같은 signature의 이전 카탈로그 버전 항목은 제거)"""
+        signature = route_signature(preference, variant)
+        template = rebase_route(route, preference.start_date, preference)
+        with self._lock:
+            previous = self._versions.get(signature)
+            if previous is not None and previous != catalog_version:
+                if self._entries.pop((signature, previous), None) is not None:
+                    self.invalidations += 1
+            self._versions[signature] = catalog_version
+            self._entries[(signature, catalog_version)] = (template, preference.start_date)
+            self._entries.move_to_end((signature, catalog_version))
+            while len(self._entries) > self.max_entries:
+                (old_signature, old_version), _ = self._entries.popitem(last=False)
+                if self._versions.get(old_signature) == old_version:
+                    del self._versions[old_signature]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+def rebase_route(route: Route, route_start: datetime.date, preference: RoutePreference) -> Route:
+    """
+    루트 사본을 preference의 시작일 기준으로 이동 (DB ID는 비움)
+    
+    Parameters:
+    - route: 원본 루트
+    - route_start: 원본 루트의 시작일
+    - preference: 새 루트의 선호도
+    """
+    shift = preference.start_date - route_start
+    rebased = copy.deepcopy(route)
+    rebased.route_id = None
+    rebased.preference_id = preference.preference_id
+    rebased.route_name = f"{preference.start_date} ~ {preference.end_date} 여행"
+    rebased.generated_at = None
+    rebased.trace = None
+    for daily in rebased.itinerary:
+        daily.itinerary_id = None
+        daily.route_id = None
+        daily.day_date = daily.day_date + shift
+        for activity in daily.activities:
+            activity.activity_id = None
+            activity.itinerary_id = None
+    return rebased
+
+
+# ==================== 루트 템플릿 (사전 생성) ====================
+
+def route_to_dict(route: Route) -> dict:
+    """Route -> JSON 저장용 dict (날짜/시각은 ISO 문자열, trace 제외)"""
+    data = asdict(route)
+    data.pop("trace", None)
+    return json.loads(json.dumps(data, ensure_ascii=False, default=str))
+
+
+def route_from_dict(data: dict) -> Route:
+    """route_to_dict 결과 -> Route"""
+    itinerary = []
+    for day in data.get("itinerary", []):
+        activities = [
+            Activity(**{
+                **activity,
+                "activity_time": datetime.time.fromisoformat(activity["activity_time"])
+                if activity.get("activity_time") else None,
+            })
+            for activity in day.get("activities", [])
+        ]
+        itinerary.append(DailyItinerary(**{
+            **day,
+            "day_date": datetime.date.fromisoformat(day["day_date"]) if day.get("day_date") else None,
+            "activities": activities,
+        }))
+    generated_at = data.get("generated_at")
+    return Route(**{
+        **data,
+        "generated_at": datetime.datetime.fromisoformat(generated_at) if generated_at else None,
+        "itinerary": itinerary,
+        "trace": None,
+    })
+
+
+class RouteTemplateStore:
+    """
+    사전 생성 루트 템플릿 (야간 pre-warm 작업 결과)
+    
+    signature(테마, 이동수단, 일정 강도, 여행 일수)별로 가장 비싼 최적화 설정으로 만든 루트를
+    한 개씩 보관한다. solver와 무관하게 같은 signature 요청에 그대로 쓰며, 카탈로그 버전이
+    다르면(카탈로그 변경) 사용하지 않는다. 카탈로그 조회 방식/스냅샷/점수 설정이 요청을 처리하는
+    엔진과 같아야 카탈로그 버전이 일치하며 (route_engine.build_route_system), 버전이 달라
+    쓰지 못한 템플릿은 stale로 세고 signature + 요청 카탈로그 버전마다 한 번 경고를 남긴다.
+    
+    템플릿은 개인화 없이 만든 것이므로 개인화 요청에는 쓰지 않는다 (TravelRecommendationSystem._cached_route).
+    """
+    
+    def __init__(self):
+        self._templates = {}  # signature -> (catalog_version, Route, start_date, demand)
+        self._warned = set()  # 경고를 남긴 (signature, 요청 카탈로그 버전)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._templates)
+    
+    def get(self, preference: RoutePreference, catalog_version: str) -> Optional[Route]:
+        """템플릿을 preference 기준으로 날짜를 옮겨 반환 (없거나 카탈로그 버전이 다르면 None)"""
+        signature = route_signature(preference)
+        with self._lock:
+            # 템플릿은 테마 전체 카탈로그로 만든 것이므로 지역 제한 요청에는 쓰지 않는다
+            if len(signature) > 4:
+                self.misses += 1
+                return None
+            entry = self._templates.get(signature)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != catalog_version:
+                self.stale += 1
+                warn = (signature, catalog_version) not in self._warned
+                self._warned.add((signature, catalog_version))
+                if warn:
+                    logger.warning(
+                        "루트 템플릿 %s 사용 안 함: 카탈로그 버전 %s != 템플릿 %s "
+                        "(route_prewarm과 엔진 구성이 다르거나 카탈로그가 바뀜)",
+                        signature, catalog_version[:12], entry[0][:12]
+                    )
+                return None
+            self.hits += 1
+            _, template, template_start, _ = entry
+        return rebase_route(template, template_start, preference)
+    
+    def put(self, preference: RoutePreference, catalog_version: str, route: Route, demand: int = 0):
+        """템플릿 저장 (같은 signature는 교체)"""
+        if preference_region(preference) is not None:
+            raise ValueError("지역 제한 선호도는 템플릿으로 저장할 수 없습니다.")
+        template = rebase_route(route, preference.start_date, preference)
+        template.preference_id = None
+        template.route_name = ""
+        with self._lock:
+            self._templates[route_signature(preference)] = (
+                catalog_version, template, preference.start_date, demand
+            )
+    
+    def rows(self) -> List[dict]:
+        """DB 저장용 행 (route_templates)"""
+        with self._lock:
+            items = list(self._templates.items())
+        return [
+            {
+                "theme_id": theme_id,
+                "transport_mode": transport_mode,
+                "schedule_type": schedule_type,
+                "num_days": num_days,
+                "catalog_version": catalog_version,
+                "start_date": start_date,
+                "route_json": json.dumps(route_to_dict(template), ensure_ascii=False),
+                "demand_count": demand,
+            }
+            for (theme_id, transport_mode, schedule_type, num_days), (catalog_version, template, start_date, demand)
+            in items
+        ]
+    
+    def load(self, rows: List[dict]) -> int:
+        """DB 행으로 전체 교체 (route_templates 조회 결과)"""
+        templates = {}
+        for row in rows:
+            route_json = row["route_json"]
+            data = json.loads(route_json) if isinstance(route_json, (str, bytes)) else route_json
+            signature = (row["theme_id"], row["transport_mode"], row["schedule_type"], int(row["num_days"]))
+            templates[signature] = (
+                row["catalog_version"], route_from_dict(data), row["start_date"], row.get("demand_count", 0)
+            )
+        with self._lock:
+            self._templates = templates
+            self._warned.clear()
+        return len(templates)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "templates": len(self._templates),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+            }
 
 
 # ==================== DatabaseConnector 클래스 ====================
@@ -98,374 +993,2695 @@ class Route:
 class DatabaseConnector:
     """데이터베이스 연결 및 데이터 조회"""
     
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, catalog_cache: Optional[ActivityCatalogCache] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 api_client: Optional[CatalogApiClient] = None,
+                 catalog_source: str = "api",
+                 theme_index: Optional[ThemeLocationIndex] = None,
+                 catalog_language: str = "en",
+                 user_preferences: Optional[UserPreferenceStore] = None):
+        """
+        Parameters:
+        - db_connection: pymysql.connect() 객체
+        - catalog_cache: 활동 카탈로그 캐시 (없으면 기본 설정으로 생성)
+        - metrics: 소요 시간/DB 왕복 수를 기록할 지표 모음 (없으면 METRICS)
+        - api_client: 카탈로그 API 클라이언트 (없으면 프로세스 공용 클라이언트)
+        - catalog_source: 테마 카탈로그 조회 방식
+            "api" (팀 백엔드 API), "db" (locations/태그/카테고리 테이블로 만든 테마 역색인)
+        - theme_index: "db" 방식의 테마 역색인 (여러 연결이 공유, 없으면 새로 생성)
+        - catalog_language: "db" 방식의 장소 이름/주소 언어 (ko, en)
+        - user_preferences: 사용자 선호 가중치 캐시 (여러 연결이 공유, 없으면 새로 생성)
+        """
+        if catalog_source not in ("api", "db"):
+            raise ValueError(f"지원하지 않는 catalog_source: {catalog_source}")
+        
+        self.conn = db_connection
+        self.catalog_cache = catalog_cache if catalog_cache is not None else ActivityCatalogCache()
+        self.metrics = metrics if metrics is not None else METRICS
+        self.api_client = api_client
+        self.catalog_source = catalog_source
+        self.theme_index = theme_index if theme_index is not None else ThemeLocationIndex()
+        self.catalog_language = catalog_language
+        self.user_preferences = user_preferences if user_preferences is not None else UserPreferenceStore()
+        self._coordinates_srid = None
+    
+    def _cursor(self):
+        """DB 왕복 수가 기록되는 cursor"""
+        return _TracedCursor(self.conn.cursor(), self.metrics)
+    
+    def fetch_activities_by_theme(self, theme_id: int, transport_mode: str = "public",
+                                  region: Optional[tuple] = None):
+        """
+        테마에 맞는 활동/관광지 조회 - API 호출 방식 (카탈로그 캐시 사용) 또는 DB 테마 역색인
+        
+        Parameters:
+        - theme_id: trip_themes 테이블의 theme_id
+        - transport_mode: 이동수단
+        - region: 여행 지역 (preference_region 결과, None이면 지역 제한 없음)
+        
+        Returns:
+        - List[Activity]: 조건에 맞는 활동 리스트
+        """
+        # DB 테마 역색인 (posting list 교집합, 네트워크 호출 없음)
+        # 지역 제한은 공간 인덱스로 찾은 location_id와 한 번 더 교집합
+        if self.catalog_source == "db":
+            self._ensure_theme_index()
+            current_trace().count("theme_index_lookups")
+            within = self.fetch_region_location_ids(region) if region is not None else None
+            return self.theme_index.activities(theme_id, within)
+        
+        # API를 통해 관광지 데이터 가져오기 (지역별로 따로 캐시)
+        key = (theme_id, transport_mode) if region is None else (theme_id, transport_mode, region)
+        return self.catalog_cache.get(
+            key,
+            lambda: self._request_activities(theme_id, transport_mode, region)
+        )
+    
+    @_db_timed("region_lookup")
+    def fetch_region_location_ids(self, region: tuple) -> np.ndarray:
+        """
+        여행 지역 안의 location_id (오름차순)
+        
+        경계 상자(MBRContains)로 locations.coordinates 공간 인덱스 범위 조회를 하고,
+        latitude/longitude 컬럼으로 상자 경계를, 반경 지역은 ST_Distance_Sphere로
+        상자 모서리 부분을 정확히 거른다.
+        
+        coordinates는 POINT(경도, 위도) 값에 SRID 4326을 붙여 저장한다 (ktrip_migrations.sql).
+        MySQL 8은 SRID가 지정되지 않은 컬럼의 공간 인덱스를 쓰지 않으므로,
+        마이그레이션 전 스키마(SRID 0)에서는 같은 조건이 전체 스캔으로 실행된다.
+        
+        Parameters:
+        - region: preference_region 결과
+        
+        Returns:
+        - np.ndarray: location_id 배열 (int64)
+        """
+        min_lat, min_lon, max_lat, max_lon = region_bounds(region)
+        if self._location_srid() == 4326:
+            # 지리 SRS의 기본 축 순서는 (위도, 경도)이므로 WKT는 경도-위도 순서임을 명시
+            envelope = ("POLYGON(({0:.7f} {1:.7f}, {2:.7f} {1:.7f}, {2:.7f} {3:.7f}, "
+                        "{0:.7f} {3:.7f}, {0:.7f} {1:.7f}))"
+                        .format(min_lon, min_lat, max_lon, max_lat))
+            sql = ("SELECT location_id FROM locations "
+                   "WHERE MBRContains(ST_GeomFromText(%s, 4326, 'axis-order=long-lat'), coordinates)")
+            params = [envelope]
+            center = "ST_SRID(POINT(%s, %s), 4326)"
+        else:
+            sql = ("SELECT location_id FROM locations "
+                   "WHERE MBRContains(ST_MakeEnvelope(POINT(%s, %s), POINT(%s, %s)), coordinates)")
+            params = [min_lon, min_lat, max_lon, max_lat]
+            center = "POINT(%s, %s)"
+        # 지리 SRS의 MBR은 측지선 경계라 위/아래 변이 조금 넓으므로 좌표 컬럼으로 다시 자른다
+        sql += " AND latitude BETWEEN %s AND %s AND longitude BETWEEN %s AND %s"
+        params += [min_lat, max_lat, min_lon, max_lon]
+        if region[0] == "radius":
+            _, lat, lon, radius_km = region
+            # 엔진의 haversine과 같은 지구 반지름 사용
+            sql += f" AND ST_Distance_Sphere(coordinates, {center}, %s) <= %s"
+            params += [lon, lat, EARTH_RADIUS_KM * 1000, radius_km * 1000]
+        
+        cursor = self._cursor()
+        cursor.execute(sql + " ORDER BY location_id", params)
+        current_trace().count("region_queries")
+        ids = [row["location_id"] for row in self._rows_as_dicts(cursor)]
+        return np.array(ids, dtype=np.int64)
+    
+    def _location_srid(self) -> int:
+        """locations.coordinates 컬럼의 SRID (연결마다 한 번 조회, 지정 안 됨이면 0)"""
+        if self._coordinates_srid is None:
+            cursor = self._cursor()
+            cursor.execute(
+                "SELECT SRS_ID AS srs_id FROM information_schema.ST_GEOMETRY_COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'locations' "
+                "AND COLUMN_NAME = 'coordinates'"
+            )
+            rows = self._rows_as_dicts(cursor)
+            srid = rows[0]["srs_id"] if rows else None
+            self._coordinates_srid = int(srid) if srid is not None else 0
+            if self._coordinates_srid != 4326:
+                logger.warning(
+                    "locations.coordinates에 SRID 4326이 없어 지역 조회가 공간 인덱스를 쓰지 못합니다 "
+                    "(ktrip_migrations.sql 적용 필요)"
+                )
+        return self._coordinates_srid
+    
+    @_db_timed("catalog_request")
+    def _request_activities(self, theme_id: int, transport_mode: str = "public",
+                            region: Optional[tuple] = None):
+        """
+        API 호출 + 응답 파싱 (실패시 예외 발생)
+        
+        실제 API 엔드포인트에 맞게 수정
+        
+        Parameters:
+        - theme_id: 테마 ID
+        - transport_mode: 이동수단
+        - region: 여행 지역 (API에서 공간 조건으로 걸러 응답 크기를 줄인다)
+        
+        Returns:
+        - List[Activity]: 활동 리스트
+        """
+        # 팀 자체 백엔드 API 호출 (공용 클라이언트: 연결 풀, 재시도, 페이지네이션)
+        client = self.api_client if self.api_client is not None else default_catalog_client()
+        
+        # 요청 파라미터 (offset/limit은 클라이언트가 페이지별로 채움)
+        params = {
+            'theme_id': theme_id,
+            'transport_mode': transport_mode,
+        }
+        if region is not None:
+            min_lat, min_lon, max_lat, max_lon = region_bounds(region)
+            params.update(min_lat=min_lat, min_lon=min_lon, max_lat=max_lat, max_lon=max_lon)
+            if region[0] == "radius":
+                params.update(anchor_lat=region[1], anchor_lon=region[2], radius_km=region[3])
+        
+        # API 호출
+        current_trace().count("api_requests")
+        items = client.fetch_locations(params)
+        
+        # 응답 데이터 파싱 (API 응답 구조에 맞게 수정)
+        activities = [self._parse_activity(item) for item in items]
+        
+        # 리뷰/인기도 특징은 카탈로그를 불러올 때 한 번만 붙인다 (루트 생성 중 집계 쿼리 없음)
+        self.attach_popularity(activities)
+        
+        return activities
+    
+    @staticmethod
+    def _parse_activity(item: dict) -> Activity:
+        """API 응답 항목 -> Activity"""
+        return Activity(
+            location_id=item.get('id'),
+            activity_name=item.get('name', ''),
+            lat=float(item.get('latitude', 0)),
+            lon=float(item.get('longitude', 0)),
+            activity_description=item.get('description'),
+            location_name=item.get('name'),
+            location_address=item.get('address'),
+            estimated_duration_minutes=item.get('duration', 120),
+            estimated_cost=float(item.get('cost', 0)) if item.get('cost') else None,
+            activity_category_id=item.get('category_id'),
+            categories=[item.get('category_name')] if item.get('category_name') else []
+        )
+    
+    def attach_popularity(self, activities: List[Activity]):
+        """
+        location_review_features를 한 번에 조회해 Activity.popularity_score 설정
+        
+        특징 테이블 조회에 실패해도 카탈로그는 그대로 사용한다 (인기도 0).
+        """
+        location_ids = sorted({a.location_id for a in activities if a.location_id is not None})
+        try:
+            features = self.fetch_location_features(location_ids)
+        except Exception as e:
+            logger.warning("리뷰 특징 조회 실패: %s", e)
+            return
+        
+        # 집계 행이 없는 장소(리뷰 없음)는 사전 평점만으로 계산한 값
+        default_score = popularity_score()
+        for activity in activities:
+            row = features.get(activity.location_id)
+            if row is None:
+                activity.popularity_score = default_score
+                continue
+            activity.popularity_score = popularity_score(
+                review_count=row["review_count"],
+                rating_sum=row["rating_sum"],
+                like_count=row["like_count"],
+                external_rating=float(row["external_rating"])
+                if row["external_rating"] is not None else None,
+                external_review_count=row["external_review_count"],
+            )
+    
+    @_db_timed("fetch_location_features")
+    def fetch_location_features(self, location_ids: List[int]) -> dict:
+        """
+        장소별 리뷰 특징 조회 (location_review_features, BULK_INSERT_CHUNK개씩 IN 조회)
+        
+        Returns:
+        - dict: location_id -> 특징 행(dict)
+        """
+        features = {}
+        if not location_ids:
+            return features
+        
+        cursor = self._cursor()
+        for start in range(0, len(location_ids), self.BULK_INSERT_CHUNK):
+            chunk = location_ids[start:start + self.BULK_INSERT_CHUNK]
+            cursor.execute(
+                "SELECT location_id, review_count, rating_sum, like_count, "
+                "external_rating, external_review_count "
+                "FROM location_review_features WHERE location_id IN ("
+                + ", ".join(["%s"] * len(chunk)) + ")",
+                chunk
+            )
+            for row in self._rows_as_dicts(cursor):
+                features[row["location_id"]] = row
+        return features
+    
+    @_db_timed("refresh_location_features")
+    def refresh_location_features(self, full: bool = False) -> int:
+        """
+        location_review_features 갱신 (배치 작업용)
+        
+        증분 갱신은 마지막 갱신 시각 이후 리뷰 작성/수정/삭제(reviews.updated_at),
+        좋아요 추가/취소(review_likes.updated_at, 취소는 is_deleted 변경), 외부 평점
+        동기화(synced_at)가 있었던 장소만 다시 집계한다. 좋아요 행을 DELETE로 지우는
+        경로(review_api의 좋아요 취소)는 시각이 남지 않으므로 주기적으로 full=True
+        전체 재계산을 함께 돌린다.
+        
+        Parameters:
+        - full: True면 모든 장소 재계산
+        
+        Returns:
+        - int: 갱신한 장소 수
+        """
+        cursor = self._cursor()
+        
+        try:
+            cursor.execute("SELECT NOW() AS started_at, "
+                           "(SELECT MAX(refreshed_at) FROM location_review_features) AS since")
+            row = self._rows_as_dicts(cursor)[0]
+            started_at, since = row["started_at"], row["since"]
+            
+            if full or since is None:
+                cursor.execute("SELECT location_id FROM locations")
+            else:
+                cursor.execute("""
+                    SELECT location_id FROM reviews
+                    WHERE updated_at >= %s AND location_id IS NOT NULL
+                    UNION
+                    SELECT r.location_id FROM review_likes rl
+                    JOIN reviews r ON r.review_id = rl.review_id
+                    WHERE rl.updated_at >= %s AND r.location_id IS NOT NULL
+                    UNION
+                    SELECT location_id FROM location_api_sources
+                    WHERE synced_at >= %s
+                """, (since, since, since))
+            location_ids = [r["location_id"] for r in self._rows_as_dicts(cursor)]
+            
+            for start in range(0, len(location_ids), self.BULK_INSERT_CHUNK):
+                chunk = location_ids[start:start + self.BULK_INSERT_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"""
+                    INSERT INTO location_review_features
+                    (location_id, review_count, rating_sum, like_count,
+                     external_rating, external_review_count, refreshed_at)
+                    SELECT l.location_id,
+                           COALESCE(rv.review_count, 0), COALESCE(rv.rating_sum, 0),
+                           COALESCE(rv.like_count, 0),
+                           ext.external_rating, COALESCE(ext.external_review_count, 0), %s
+                    FROM locations l
+                    LEFT JOIN (
+                        SELECT r.location_id, COUNT(*) AS review_count, SUM(r.rating) AS rating_sum,
+                               SUM(COALESCE(lk.likes, 0)) AS like_count
+                        FROM reviews r
+                        LEFT JOIN (
+                            SELECT review_id, COUNT(*) AS likes FROM review_likes
+                            WHERE is_deleted = FALSE GROUP BY review_id
+                        ) lk ON lk.review_id = r.review_id
+                        WHERE r.is_deleted = FALSE AND r.location_id IN ({placeholders})
+                        GROUP BY r.location_id
+                    ) rv ON rv.location_id = l.location_id
+                    LEFT JOIN (
+                        SELECT location_id,
+                               SUM(rating * review_count) / NULLIF(SUM(review_count), 0) AS external_rating,
+                               SUM(review_count) AS external_review_count
+                        FROM location_api_sources
+                        WHERE rating IS NOT NULL AND review_count > 0
+                          AND location_id IN ({placeholders})
+                        GROUP BY location_id
+                    ) ext ON ext.location_id = l.location_id
+                    WHERE l.location_id IN ({placeholders})
+                    ON DUPLICATE KEY UPDATE
+                        review_count = VALUES(review_count),
+                        rating_sum = VALUES(rating_sum),
+                        like_count = VALUES(like_count),
+                        external_rating = VALUES(external_rating),
+                        external_review_count = VALUES(external_review_count),
+                        refreshed_at = VALUES(refreshed_at)
+                """, [started_at, *chunk, *chunk, *chunk])
+            
+            self.conn.commit()
+            return len(location_ids)
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"리뷰 특징 갱신 실패: {str(e)}")
+
+    # 다중 행 INSERT 한 번에 넣을 최대 행 수 (max_allowed_packet 고려)
+    BULK_INSERT_CHUNK = 1000
+    
+    @_db_timed("export_catalog_snapshot")
+    def export_catalog_snapshot(self, directory: str = "cache/catalog_snapshot",
+                                language: str = "en") -> CatalogSnapshot:
+        """
+        locations + location_categories + location_tag_map (+ 리뷰 특징) -> 카탈로그 스냅샷 기록
+        
+        Parameters:
+        - directory: 스냅샷 루트 디렉터리
+        - language: 이름/주소 언어 (ko, en) - 해당 언어 값이 없으면 영어/한국어 순으로 사용
+        
+        Returns:
+        - CatalogSnapshot: 새로 기록한 (또는 내용이 같은 기존) 스냅샷
+        """
+        locations, tag_rows = self._catalog_rows(language)
+        tags = {}
+        for row in tag_rows:
+            tags.setdefault(row["location_id"], []).append(row["tag_name"])
+        
+        # 테마 규칙은 스냅샷의 카테고리 CSR과 같은 이름 기준으로 기록
+        rules, names = self._theme_rules()
+        themes = {
+            theme_id: {
+                "categories": {names[("category", c)]: w for c, w in rule["categories"].items()},
+                "tags": {names[("tag", t)]: (w, req) for t, (w, req) in rule["tags"].items()},
+            }
+            for theme_id, rule in rules.items()
+        }
+        return CatalogSnapshot.write(directory, locations, tags, themes=themes)
+    
+    def _catalog_rows(self, language: str = "en", after_location_id: int = 0) -> tuple:
+        """
+        루트 엔진용 장소 행 + 태그 행 조회 (스냅샷/테마 역색인 공통)
+        
+        Parameters:
+        - language: 이름/주소 언어 (ko, en) - 해당 언어 값이 없으면 다른 언어 값 사용
+        - after_location_id: 이 값보다 큰 location_id만 조회 (증분 갱신용)
+        
+        Returns:
+        - (locations, tag_rows): 장소 행에는 popularity_score가 계산되어 있다
+        """
+        if language not in ("ko", "en"):
+            raise ValueError(f"지원하지 않는 language: {language}")
+        other = "ko" if language == "en" else "en"
+        
+        cursor = self._cursor()
+        cursor.execute(
+            f"SELECT l.location_id, COALESCE(l.name_{language}, l.name_{other}) AS name, "
+            f"COALESCE(l.address_{language}, l.address_{other}) AS address, "
+            "l.latitude, l.longitude, l.location_category_id AS category_id, "
+            "c.category_name_en AS category_name, "
+            "f.review_count, f.rating_sum, f.like_count, f.external_rating, f.external_review_count "
+            "FROM locations l "
+            "JOIN location_categories c ON c.category_id = l.location_category_id "
+            "LEFT JOIN location_review_features f ON f.location_id = l.location_id "
+            "WHERE l.location_id > %s "
+            "ORDER BY l.location_id",
+            (after_location_id,)
+        )
+        locations = self._rows_as_dicts(cursor)
+        
+        cursor.execute(
+            "SELECT m.location_id, m.tag_id, t.tag_name FROM location_tag_map m "
+            "JOIN location_tags t ON t.tag_id = m.tag_id "
+            "WHERE m.location_id > %s "
+            "ORDER BY m.location_id, t.tag_name",
+            (after_location_id,)
+        )
+        tag_rows = self._rows_as_dicts(cursor)
+        
+        # 인기도는 attach_popularity와 같은 식으로 미리 계산해 둔다
+        for row in locations:
+            if row["review_count"] is None:
+                row["popularity_score"] = popularity_score()
+                continue
+            row["popularity_score"] = popularity_score(
+                review_count=row["review_count"],
+                rating_sum=row["rating_sum"],
+                like_count=row["like_count"],
+                external_rating=float(row["external_rating"])
+                if row["external_rating"] is not None else None,
+                external_review_count=row["external_review_count"],
+            )
+        return locations, tag_rows
+    
+    @_db_timed("refresh_theme_index")
+    def refresh_theme_index(self, full: bool = False) -> int:
+        """
+        테마 역색인 갱신 (테마 규칙 + 장소/태그)
+        
+        Parameters:
+        - full: True면 전체 재구축, False면 마지막 갱신 이후 추가된 장소만 반영
+        
+        Returns:
+        - int: 반영한 장소 수
+        """
+        index = self.theme_index
+        after = 0 if full else index.max_location_id
+        locations, tag_rows = self._catalog_rows(self.catalog_language, after)
+        rules, names = self._theme_rules()
+        index.apply(locations, tag_rows, rules, names, full=full)
+        return len(locations)
+    
+    def _theme_rules(self) -> tuple:
+        """
+        테마 매칭 규칙 조회 (trip_theme_categories + trip_theme_tags)
+        
+        Returns:
+        - (rules, names): rules는 theme_id -> {"categories": {id: 가중치}, "tags": {id: (가중치, 필수)}},
+          names는 ("category"|"tag", id) -> 이름
+        """
+        cursor = self._cursor()
+        rules = {}
+        names = {}
+        cursor.execute(
+            "SELECT tc.theme_id, tc.category_id, tc.weight, c.category_name_en AS name "
+            "FROM trip_theme_categories tc "
+            "JOIN location_categories c ON c.category_id = tc.category_id"
+        )
+        for row in self._rows_as_dicts(cursor):
+            rule = rules.setdefault(row["theme_id"], {"categories": {}, "tags": {}})
+            rule["categories"][row["category_id"]] = float(row["weight"])
+            names[("category", row["category_id"])] = row["name"]
+        cursor.execute(
+            "SELECT tt.theme_id, tt.tag_id, tt.weight, tt.is_required, t.tag_name AS name "
+            "FROM trip_theme_tags tt "
+            "JOIN location_tags t ON t.tag_id = tt.tag_id"
+        )
+        for row in self._rows_as_dicts(cursor):
+            rule = rules.setdefault(row["theme_id"], {"categories": {}, "tags": {}})
+            rule["tags"][row["tag_id"]] = (float(row["weight"]), bool(row["is_required"]))
+            names[("tag", row["tag_id"])] = row["name"]
+        return rules, names
+    
+    def theme_category_weights(self, theme_id: int) -> Optional[dict]:
+        """
+        DB 테마 규칙의 매칭 가중치 {카테고리/태그 이름: 가중치}
+        
+        catalog_source="db"일 때만 값이 있다 (API 카탈로그는 None).
+        """
+        if self.catalog_source != "db":
+            return None
+        self._ensure_theme_index()
+        return self.theme_index.weights(theme_id)
+    
+    def _ensure_theme_index(self):
+        """테마 역색인이 오래됐으면 갱신 (동시에 한 스레드만, 나머지는 기존 색인 사용)"""
+        index = self.theme_index
+        full = index.needs_refresh()
+        if full is None:
+            return
+        # 첫 구축은 기다리고, 이후 갱신 중에는 기존 색인을 그대로 쓴다
+        if not index.refresh_lock.acquire(blocking=index.refreshed_at is None):
+            return
+        try:
+            full = index.needs_refresh()
+            if full is not None:
+                self.refresh_theme_index(full=full)
+        finally:
+            index.refresh_lock.release()
+    
+    def user_preference_weights(self, user_id: int) -> Optional[tuple]:
+        """
+        개인화용 사용자 선호 가중치 (메모리 캐시 -> 저장된 선호 벡터 순, 조회만 함)
+        
+        선호 벡터 계산/저장은 refresh_user_preference(설문 제출/루트 평가 후 갱신 API,
+        야간 배치 user_preference_refresh.py)가 맡고, 루트 생성 중에는 DB에 쓰지 않는다.
+        
+        Returns:
+        - (weights, digest) 또는 None (저장된 선호 벡터가 없거나 비어 있음 -> 개인화 없음)
+          weights는 {카테고리/태그 이름: 가중치}, digest는 벡터 내용 해시
+        """
+        return self.user_preferences.get(
+            user_id, lambda: self._preference_weights(self.load_user_preference(user_id))
+        )
+    
+    def refresh_user_preference(self, user_id: int, full: bool = False) -> Optional[tuple]:
+        """
+        선호 벡터 증분 갱신 + 저장 후 메모리 캐시 교체 (갱신 API/배치용)
+        
+        Parameters:
+        - user_id: 사용자 ID
+        - full: True면 저장된 벡터를 버리고 처음부터 다시 계산 (평가를 바꾼 경우)
+        
+        Returns:
+        - user_preference_weights와 같은 형식
+        """
+        vector = self.update_user_preference(user_id, UserPreferenceVector(user_id) if full else None)
+        value = self._preference_weights(vector)
+        self.user_preferences.put(user_id, value)
+        return value
+    
+    def _preference_weights(self, vector: Optional[UserPreferenceVector]) -> Optional[tuple]:
+        """선호 벡터 -> ({카테고리/태그 이름: 가중치}, digest) (비어 있으면 None)"""
+        if vector is None:
+            return None
+        codes, weights = vector.combined()
+        if not codes.size:
+            return None
+        names = self.user_preferences.names(self._feature_names)
+        by_name = {}
+        for code, weight in zip(codes.tolist(), weights.tolist()):
+            name = names.get(code)
+            if name:
+                by_name[name] = by_name.get(name, 0.0) + weight
+        return (by_name, vector.digest()) if by_name else None
+    
+    def _feature_names(self) -> dict:
+        """선호 벡터 특징 코드 -> 카테고리/태그 이름 (카탈로그 카테고리 이름과 같은 값)"""
+        cursor = self._cursor()
+        cursor.execute("SELECT category_id, category_name_en AS name FROM location_categories")
+        names = {feature_code("category", row["category_id"]): row["name"]
+                 for row in self._rows_as_dicts(cursor)}
+        cursor.execute("SELECT tag_id, tag_name AS name FROM location_tags")
+        names.update({feature_code("tag", row["tag_id"]): row["name"]
+                      for row in self._rows_as_dicts(cursor)})
+        return names
+    
+    def load_user_preference(self, user_id: int) -> Optional[UserPreferenceVector]:
+        """저장된 선호 벡터 조회 (없으면 None)"""
+        cursor = self._cursor()
+        cursor.execute("""
+            SELECT survey_vector, rating_vector, last_answer_id, last_rating_id
+            FROM user_preference_vectors
+            WHERE user_id = %s
+        """, (user_id,))
+        rows = self._rows_as_dicts(cursor)
+        if not rows:
+            return None
+        row = rows[0]
+        survey_codes, survey_weights = UserPreferenceVector.unpack(row["survey_vector"])
+        rating_codes, rating_weights = UserPreferenceVector.unpack(row["rating_vector"])
+        return UserPreferenceVector(
+            user_id=user_id,
+            survey_codes=survey_codes,
+            survey_weights=survey_weights,
+            rating_codes=rating_codes,
+            rating_weights=rating_weights,
+            last_answer_id=int(row["last_answer_id"]),
+            last_rating_id=int(row["last_rating_id"]),
+        )
+    
+    @_db_timed("update_user_preference")
+    def update_user_preference(self, user_id: int,
+                               vector: Optional[UserPreferenceVector] = None) -> UserPreferenceVector:
+        """
+        선호 벡터 증분 갱신 + 저장 (바뀐 것이 없으면 저장하지 않음)
+        
+        - 설문: 사용자의 최신 answer id가 달라졌으면 답한 선택지의
+          survey_option_categories/survey_option_tags 가중치 합으로 다시 계산
+        - 평가: last_rating_id 이후 평가한 루트의 활동 카테고리/태그에
+          thumbs_up이면 +, thumbs_down이면 - RATING_PREFERENCE_WEIGHT를 활동 수로 나눠 더함
+        
+        평가를 나중에 바꾼 경우(같은 rating_id)는 증분 갱신에 반영되지 않으므로,
+        UserPreferenceVector(user_id)를 넘겨 처음부터 다시 계산한다.
+        
+        Parameters:
+        - user_id: 사용자 ID
+        - vector: 갱신할 벡터 (없으면 저장된 벡터, 그것도 없으면 빈 벡터에서 시작)
+        
+        Returns:
+        - UserPreferenceVector: 갱신된 벡터
+        """
+        if vector is None:
+            vector = self.load_user_preference(user_id) or UserPreferenceVector(user_id)
+        changed = False
+        cursor = self._cursor()
+        
+        # 1. 설문 부분
+        cursor.execute(
+            "SELECT COALESCE(MAX(id), 0) AS last_id FROM survey_answers WHERE user_id = %s",
+            (user_id,)
+        )
+        last_answer_id = int(self._rows_as_dicts(cursor)[0]["last_id"])
+        if last_answer_id != vector.last_answer_id:
+            cursor.execute("""
+                SELECT 'category' AS kind, oc.category_id AS feature_id, oc.weight
+                FROM survey_answers a
+                JOIN survey_option_categories oc ON oc.option_id = a.option_id
+                WHERE a.user_id = %s
+                UNION ALL
+                SELECT 'tag' AS kind, ot.tag_id AS feature_id, ot.weight
+                FROM survey_answers a
+                JOIN survey_option_tags ot ON ot.option_id = a.option_id
+                WHERE a.user_id = %s
+            """, (user_id, user_id))
+            rows = self._rows_as_dicts(cursor)
+            vector.survey_codes, vector.survey_weights = sparse_add((
+                [feature_code(row["kind"], row["feature_id"]) for row in rows],
+                [float(row["weight"]) for row in rows],
+            ))
+            vector.last_answer_id = last_answer_id
+            changed = True
+        
+        # 2. 평가 부분 (새 평가만)
+        cursor.execute("""
+            SELECT r.rating_id, r.rating_type, ia.location_id, l.location_category_id AS category_id
+            FROM route_ratings r
+            JOIN user_saved_routes s ON s.saved_route_id = r.saved_route_id
+            JOIN route_itinerary ri ON ri.route_id = s.route_id
+            JOIN itinerary_activities ia ON ia.itinerary_id = ri.itinerary_id
+            JOIN locations l ON l.location_id = ia.location_id
+            WHERE r.user_id = %s AND r.rating_id > %s
+            ORDER BY r.rating_id
+        """, (user_id, vector.last_rating_id))
+        rows = self._rows_as_dicts(cursor)
+        if rows:
+            location_ids = sorted({row["location_id"] for row in rows})
+            cursor.execute(
+                "SELECT location_id, tag_id FROM location_tag_map WHERE location_id IN (" +
+                ", ".join(["%s"] * len(location_ids)) + ")",
+                location_ids
+            )
+            tags = {}
+            for row in self._rows_as_dicts(cursor):
+                tags.setdefault(row["location_id"], []).append(row["tag_id"])
+            
+            ratings = {}
+            for row in rows:
+                ratings.setdefault(row["rating_id"], []).append(row)
+            codes, weights = [], []
+            for activities in ratings.values():
+                sign = 1.0 if activities[0]["rating_type"] == "thumbs_up" else -1.0
+                share = sign * RATING_PREFERENCE_WEIGHT / len(activities)
+                for row in activities:
+                    codes.append(feature_code("category", row["category_id"]))
+                    weights.append(share)
+                    for tag_id in tags.get(row["location_id"], []):
+                        codes.append(feature_code("tag", tag_id))
+                        weights.append(share)
+            vector.rating_codes, vector.rating_weights = sparse_add(
+                (vector.rating_codes, vector.rating_weights), (codes, weights)
+            )
+            vector.last_rating_id = max(ratings)
+            changed = True
+        
+        if changed:
+            self.save_user_preference(vector)
+        return vector
+    
+    def save_user_preference(self, vector: UserPreferenceVector):
+        """선호 벡터 저장 (user_preference_vectors upsert)"""
+        cursor = self._cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO user_preference_vectors
+                    (user_id, survey_vector, rating_vector, last_answer_id, last_rating_id)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    survey_vector = VALUES(survey_vector),
+                    rating_vector = VALUES(rating_vector),
+                    last_answer_id = VALUES(last_answer_id),
+                    last_rating_id = VALUES(last_rating_id),
+                    updated_at = CURRENT_TIMESTAMP
+            """, (
+                vector.user_id,
+                UserPreferenceVector.pack(vector.survey_codes, vector.survey_weights),
+                UserPreferenceVector.pack(vector.rating_codes, vector.rating_weights),
+                vector.last_answer_id,
+                vector.last_rating_id,
+            ))
+            self.conn.commit()
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"선호 벡터 저장 실패: {str(e)}")
+    
+    @_db_timed("fetch_stale_preference_users")
+    def fetch_stale_preference_users(self, limit: int = 1000) -> List[int]:
+        """
+        선호 벡터를 갱신해야 하는 사용자 ID (야간 배치용)
+        
+        설문에 답했거나 루트를 평가했는데 저장된 선호 벡터가 없거나,
+        벡터 저장 이후 새 설문 응답/평가가 있는 사용자
+        """
+        cursor = self._cursor()
+        cursor.execute("""
+            SELECT a.user_id
+            FROM (
+                SELECT user_id, MAX(id) AS last_answer_id, 0 AS last_rating_id
+                FROM survey_answers
+                GROUP BY user_id
+                UNION ALL
+                SELECT user_id, 0 AS last_answer_id, MAX(rating_id) AS last_rating_id
+                FROM route_ratings
+                GROUP BY user_id
+            ) a
+            LEFT JOIN user_preference_vectors v ON v.user_id = a.user_id
+            GROUP BY a.user_id
+            HAVING MAX(a.last_answer_id) <> COALESCE(MAX(v.last_answer_id), 0)
+                OR MAX(a.last_rating_id) > COALESCE(MAX(v.last_rating_id), 0)
+            ORDER BY a.user_id
+            LIMIT %s
+        """, (limit,))
+        return [int(row["user_id"]) for row in self._rows_as_dicts(cursor)]
+    
+    @_db_timed("fetch_popular_signatures")
+    def fetch_popular_signatures(self, lookback_days: int = 90, horizon_days: int = 30,
+                                 limit: int = 50, min_count: int = 2) -> List[dict]:
+        """
+        route_preferences에서 자주 요청된 루트 signature 조회 (템플릿 사전 생성용)
+        
+        최근 lookback_days일 동안 만들어진 선호도와, 출발일이 앞으로 horizon_days일 안인
+        선호도(연휴 등 다가오는 수요)를 함께 센다. 지역 제한 선호도는 템플릿 대상이 아니므로 제외한다.
+        
+        Parameters:
+        - lookback_days: 최근 생성 기간 (일)
+        - horizon_days: 다가오는 출발일 기간 (일)
+        - limit: 최대 signature 수
+        - min_count: 최소 요청 수
+        
+        Returns:
+        - List[dict]: theme_id, transport_mode, schedule_type, num_days, demand (요청 수 내림차순)
+        """
+        cursor = self._cursor()
+        cursor.execute("""
+            SELECT theme_id, transport_mode, schedule_type,
+                   DATEDIFF(end_date, start_date) + 1 AS num_days,
+                   COUNT(*) AS demand
+            FROM route_preferences
+            WHERE (created_at >= NOW() - INTERVAL %s DAY
+                   OR start_date BETWEEN CURDATE() AND CURDATE() + INTERVAL %s DAY)
+              AND anchor_lat IS NULL AND bbox_min_lat IS NULL
+            GROUP BY theme_id, transport_mode, schedule_type, num_days
+            HAVING demand >= %s AND num_days BETWEEN 1 AND 30
+            ORDER BY demand DESC
+            LIMIT %s
+        """, (lookback_days, horizon_days, min_count, limit))
+        return [
+            {**row, "num_days": int(row["num_days"]), "demand": int(row["demand"])}
+            for row in self._rows_as_dicts(cursor)
+        ]
+    
+    @_db_timed("save_route_templates")
+    def save_route_templates(self, store: RouteTemplateStore) -> int:
+        """
+        템플릿 저장 (route_templates, signature별 upsert)
+        
+        Returns:
+        - int: 저장한 템플릿 수
+        """
+        rows = store.rows()
+        if not rows:
+            return 0
+        cursor = self._cursor()
+        
+        try:
+            cursor.executemany("""
+                INSERT INTO route_templates
+                    (theme_id, transport_mode, schedule_type, num_days, catalog_version,
+                     start_date, route_json, demand_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    catalog_version = VALUES(catalog_version),
+                    start_date = VALUES(start_date),
+                    route_json = VALUES(route_json),
+                    demand_count = VALUES(demand_count),
+                    generated_at = CURRENT_TIMESTAMP
+            """, [
+                (row["theme_id"], row["transport_mode"], row["schedule_type"], row["num_days"],
+                 row["catalog_version"], row["start_date"], row["route_json"], row["demand_count"])
+                for row in rows
+            ])
+            self.conn.commit()
+            return len(rows)
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"루트 템플릿 저장 실패: {str(e)}")
+    
+    @_db_timed("load_route_templates")
+    def load_route_templates(self, store: RouteTemplateStore, max_age_days: int = 7) -> int:
+        """
+        최근 max_age_days일 안에 생성된 템플릿을 store에 불러오기
+        
+        Returns:
+        - int: 불러온 템플릿 수
+        """
+        cursor = self._cursor()
+        cursor.execute("""
+            SELECT theme_id, transport_mode, schedule_type, num_days, catalog_version,
+                   start_date, route_json, demand_count
+            FROM route_templates
+            WHERE generated_at >= NOW() - INTERVAL %s DAY
+        """, (max_age_days,))
+        return store.load(self._rows_as_dicts(cursor))
+    
+    def save_route(self, route: Route, preference: RoutePreference):
+        """
+        생성된 루트를 DB에 저장
+        
+        Parameters:
+        - route: Route 객체
+        - preference: RoutePreference 객체
+        
+        Returns:
+        - route_id: 저장된 route의 ID
+        """
+        return self.save_routes([route], [preference])[0]
+    
+    @_db_timed("save_route")
+    def save_routes(self, routes: List[Route], preferences: List[RoutePreference]) -> List[int]:
+        """
+        여러 루트를 한 트랜잭션에서 일괄 저장
+        
+        테이블마다 다중 행 INSERT 한 번(BULK_INSERT_CHUNK 행 단위)으로 저장하고,
+        각 행의 ID는 첫 INSERT ID(lastrowid)부터 auto_increment_increment 간격으로
+        계산한다. (InnoDB는 행 수가 정해진 단순 다중 행 INSERT에 연속된 ID를 할당)
+        
+        Parameters:
+        - routes: Route 리스트
+        - preferences: routes와 같은 순서의 RoutePreference 리스트
+        
+        Returns:
+        - List[int]: 저장된 route_id 리스트
+        """
+        if len(routes) != len(preferences):
+            raise ValueError("routes와 preferences의 개수가 다릅니다.")
+        
+        cursor = self._cursor()
+        
+        try:
+            route_ids = self._insert_route_headers(cursor, routes, preferences)
+            self._insert_itineraries(
+                cursor, [(route, daily) for route in routes for daily in route.itinerary]
+            )
+            
+            self.conn.commit()
+            return route_ids
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"루트 저장 실패: {str(e)}")
+    
+    @_db_timed("save_route_header")
+    def save_route_header(self, route: Route, preference: RoutePreference) -> int:
+        """
+        일정 없이 루트(+선호도)만 먼저 저장 (스트리밍 생성용)
+        
+        이후 하루 일정이 완성될 때마다 save_itinerary_day로 추가한다.
+        
+        Returns:
+        - route_id: 저장된 route의 ID
+        """
+        cursor = self._cursor()
+        
+        try:
+            route_id = self._insert_route_headers(cursor, [route], [preference])[0]
+            self.conn.commit()
+            return route_id
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"루트 저장 실패: {str(e)}")
+    
+    @_db_timed("save_itinerary_day")
+    def save_itinerary_day(self, route: Route, daily: DailyItinerary):
+        """
+        save_route_header로 저장된 루트에 하루 일정 추가 + 루트 총 비용/ai_model 갱신
+        
+        루트 템플릿/캐시를 사용하면 ai_model은 헤더 저장 후 첫 날짜를 만들 때 바뀌므로
+        (만든 방식을 그대로 기록) 날짜마다 함께 갱신한다.
+        
+        Parameters:
+        - route: route_id가 있는 루트 (total_estimated_cost는 현재까지의 합계)
+        - daily: 추가할 하루 일정
+        """
+        if route.route_id is None:
+            raise ValueError("route_id가 없는 루트입니다. save_route_header를 먼저 호출하세요.")
+        
+        cursor = self._cursor()
+        
+        try:
+            self._insert_itineraries(cursor, [(route, daily)])
+            cursor.execute(
+                "UPDATE recommended_routes SET total_estimated_cost = %s, ai_model = %s "
+                "WHERE route_id = %s",
+                (route.total_estimated_cost, route.ai_model, route.route_id)
+            )
+            self.conn.commit()
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"일정 저장 실패: {str(e)}")
+    
+    @_db_timed("delete_route")
+    def delete_route(self, route_id: int):
+        """
+        루트 삭제 (날짜별 일정/활동은 FK CASCADE로 함께 삭제)
+        
+        스트리밍 생성이 실패/취소되어 일부 날짜만 저장된 루트를 지울 때 사용한다.
+        루트와 함께 저장된 선호도는 다른 루트가 쓰지 않을 때만 지운다.
+        
+        Parameters:
+        - route_id: 삭제할 route의 ID
+        """
+        cursor = self._cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT preference_id FROM recommended_routes WHERE route_id = %s", (route_id,)
+            )
+            rows = self._rows_as_dicts(cursor)
+            cursor.execute("DELETE FROM recommended_routes WHERE route_id = %s", (route_id,))
+            if rows:
+                preference_id = rows[0]["preference_id"]
+                cursor.execute("""
+                    DELETE FROM route_preferences
+                    WHERE preference_id = %s
+                      AND NOT EXISTS (SELECT 1 FROM recommended_routes WHERE preference_id = %s)
+                """, (preference_id, preference_id))
+            self.conn.commit()
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"루트 삭제 실패: {str(e)}")
+    
+    def _insert_route_headers(self, cursor, routes: List[Route],
+                              preferences: List[RoutePreference]) -> List[int]:
+        """route_preferences(새 선호도만) + recommended_routes 다중 행 INSERT (커밋 없음)"""
+        # 1. route_preferences 저장 (이미 있다면 스킵, 같은 객체는 한 번만)
+        new_preferences = list({
+            id(p): p for p in preferences if p.preference_id is None
+        }.values())
+        preference_ids = self._bulk_insert(cursor, """
+            INSERT INTO route_preferences 
+            (user_id, start_date, end_date, theme_id, schedule_type, 
+             travelers_count, preferred_language, transport_mode,
+             anchor_lat, anchor_lon, radius_km,
+             bbox_min_lat, bbox_min_lon, bbox_max_lat, bbox_max_lon)
+            VALUES """, "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", [
+            (p.user_id, p.start_date, p.end_date, p.theme_id, p.schedule_type,
+             p.travelers_count, p.preferred_language, p.transport_mode,
+             p.anchor_lat, p.anchor_lon, p.radius_km,
+             *(p.bbox if p.bbox is not None else (None,) * 4))
+            for p in new_preferences
+        ])
+        for p, preference_id in zip(new_preferences, preference_ids):
+            p.preference_id = preference_id
+        
+        # 2. recommended_routes 저장
+        route_ids = self._bulk_insert(cursor, """
+            INSERT INTO recommended_routes 
+            (preference_id, route_name, route_description, total_estimated_cost,
+             difficulty_level, ai_model, ai_version, is_active)
+            VALUES """, "(%s, %s, %s, %s, %s, %s, %s, %s)", [
+            (p.preference_id, r.route_name, r.route_description,
+             r.total_estimated_cost, r.difficulty_level,
+             r.ai_model, r.ai_version, r.is_active)
+            for r, p in zip(routes, preferences)
+        ])
+        for route, route_id in zip(routes, route_ids):
+            route.route_id = route_id
+        
+        return route_ids
+    
+    def _insert_itineraries(self, cursor, dailies: list):
+        """
+        route_itinerary + itinerary_activities 다중 행 INSERT (커밋 없음)
+        
+        Parameters:
+        - dailies: (route, daily) 리스트 (route.route_id가 있어야 함)
+        """
+        # 3. route_itinerary 저장 (전체 루트의 모든 날짜)
+        itinerary_ids = self._bulk_insert(cursor, """
+            INSERT INTO route_itinerary 
+            (route_id, day_number, day_date, day_description)
+            VALUES """, "(%s, %s, %s, %s)", [
+            (route.route_id, daily.day_number, daily.day_date, daily.day_description)
+            for route, daily in dailies
+        ])
+        for (route, daily), itinerary_id in zip(dailies, itinerary_ids):
+            daily.route_id = route.route_id
+            daily.itinerary_id = itinerary_id
+        
+        # 4. itinerary_activities 저장 (전체 활동)
+        # POINT(%s, %s) 때문에 드라이버의 executemany 일괄 처리가 적용되지 않으므로
+        # 다중 행 VALUES를 직접 구성한다
+        activities = [
+            (daily, activity)
+            for _, daily in dailies for activity in daily.activities
+        ]
+        activity_ids = self._bulk_insert(cursor, """
+            INSERT INTO itinerary_activities 
+            (itinerary_id, activity_order, activity_time, activity_name,
+             activity_description, location_id, location_name, location_address,
+             coordinates, estimated_duration_minutes, estimated_cost, activity_category_id)
+            VALUES """, "(%s, %s, %s, %s, %s, %s, %s, %s, POINT(%s, %s), %s, %s, %s)", [
+            (daily.itinerary_id, activity.activity_order, activity.activity_time,
+             activity.activity_name, activity.activity_description,
+             activity.location_id, activity.location_name, activity.location_address,
+             activity.lon, activity.lat,  # POINT는 (경도, 위도) 순서
+             activity.estimated_duration_minutes, activity.estimated_cost,
+             activity.activity_category_id)
+            for daily, activity in activities
+        ])
+        for (daily, activity), activity_id in zip(activities, activity_ids):
+            activity.itinerary_id = daily.itinerary_id
+            activity.activity_id = activity_id
+    
+    @_db_timed("load_route")
+    def load_route(self, route_id: int) -> tuple:
+        """
+        저장된 루트 조회
+        
+        Parameters:
+        - route_id: recommended_routes의 route_id
+        
+        Returns:
+        - (Route, RoutePreference)
+        """
+        cursor = self._cursor()
+        
+        cursor.execute("""
+            SELECT r.route_id, r.preference_id, r.route_name, r.route_description,
+                   r.total_estimated_cost, r.difficulty_level, r.generated_at, r.is_active,
+                   r.ai_model, r.ai_version,
+                   p.user_id, p.start_date, p.end_date, p.theme_id, p.schedule_type,
+                   p.travelers_count, p.preferred_language, p.transport_mode, p.created_at,
+                   p.anchor_lat, p.anchor_lon, p.radius_km,
+                   p.bbox_min_lat, p.bbox_min_lon, p.bbox_max_lat, p.bbox_max_lon
+            FROM recommended_routes r
+            JOIN route_preferences p ON p.preference_id = r.preference_id
+            WHERE r.route_id = %s
+        """, (route_id,))
+        rows = self._rows_as_dicts(cursor)
+        if not rows:
+            raise Exception(f"루트를 찾을 수 없습니다: {route_id}")
+        row = rows[0]
+        
+        preference = RoutePreference(
+            preference_id=row["preference_id"],
+            user_id=row["user_id"],
+            start_date=row["start_date"],
+            end_date=row["end_date"],
+            theme_id=row["theme_id"],
+            schedule_type=row["schedule_type"],
+            travelers_count=row["travelers_count"],
+            preferred_language=row["preferred_language"],
+            transport_mode=row["transport_mode"],
+            created_at=row["created_at"],
+            anchor_lat=self._to_float(row["anchor_lat"]),
+            anchor_lon=self._to_float(row["anchor_lon"]),
+            radius_km=self._to_float(row["radius_km"]),
+            bbox=tuple(self._to_float(row[c]) for c in
+                       ("bbox_min_lat", "bbox_min_lon", "bbox_max_lat", "bbox_max_lon"))
+            if row["bbox_min_lat"] is not None else None
+        )
+        route = Route(
+            route_id=row["route_id"],
+            preference_id=row["preference_id"],
+            route_name=row["route_name"],
+            route_description=row["route_description"],
+            total_estimated_cost=float(row["total_estimated_cost"]) if row["total_estimated_cost"] is not None else None,
+            difficulty_level=row["difficulty_level"],
+            generated_at=row["generated_at"],
+            is_active=bool(row["is_active"]),
+            ai_model=row["ai_model"],
+            ai_version=row["ai_version"]
+        )
+        
+        cursor.execute("""
+            SELECT itinerary_id, route_id, day_number, day_date, day_description
+            FROM route_itinerary
+            WHERE route_id = %s
+            ORDER BY day_number
+        """, (route_id,))
+        dailies = {
+            r["itinerary_id"]: DailyItinerary(
+                itinerary_id=r["itinerary_id"],
+                route_id=r["route_id"],
+                day_number=r["day_number"],
+                day_date=r["day_date"],
+                day_description=r["day_description"]
+            )
+            for r in self._rows_as_dicts(cursor)
+        }
+        
+        # POINT는 (경도, 위도) 순서로 저장 (save_routes 참고)
+        cursor.execute("""
+            SELECT a.activity_id, a.itinerary_id, a.activity_order, a.activity_time,
+                   a.activity_name, a.activity_description, a.location_id,
+                   a.location_name, a.location_address,
+                   ST_X(a.coordinates) AS lon, ST_Y(a.coordinates) AS lat,
+                   a.estimated_duration_minutes, a.estimated_cost, a.activity_category_id
+            FROM itinerary_activities a
+            JOIN route_itinerary i ON i.itinerary_id = a.itinerary_id
+            WHERE i.route_id = %s
+            ORDER BY i.day_number, a.activity_order
+        """, (route_id,))
+        for r in self._rows_as_dicts(cursor):
+            dailies[r["itinerary_id"]].activities.append(Activity(
+                activity_id=r["activity_id"],
+                activity_name=r["activity_name"],
+                lat=float(r["lat"]),
+                lon=float(r["lon"]),
+                itinerary_id=r["itinerary_id"],
+                activity_order=r["activity_order"],
+                activity_time=self._to_time(r["activity_time"]),
+                activity_description=r["activity_description"],
+                location_id=r["location_id"],
+                location_name=r["location_name"],
+                location_address=r["location_address"],
+                estimated_duration_minutes=r["estimated_duration_minutes"] or 120,
+                estimated_cost=float(r["estimated_cost"]) if r["estimated_cost"] is not None else None,
+                activity_category_id=r["activity_category_id"]
+            ))
+        
+        for daily in dailies.values():
+            daily.total_estimated_cost = round(sum(a.estimated_cost or 0.0 for a in daily.activities), 2)
+        route.itinerary = list(dailies.values())
+        return route, preference
+    
+    @_db_timed("update_itinerary_day")
+    def update_itinerary_day(self, old_daily: DailyItinerary, new_daily: DailyItinerary,
+                             route: Optional[Route] = None):
+        """
+        하루 일정 변경분만 DB 반영
+        
+        - 빠진 활동: DELETE
+        - 순서/시간이 바뀐 활동: UPDATE
+        - 새 활동: 다중 행 INSERT
+        - 일정 설명, (route가 있으면) 루트 총 비용: UPDATE
+        
+        Parameters:
+        - old_daily: DB에 저장된 기존 일정
+        - new_daily: 새 일정 (기존 활동은 activity_id 유지)
+        - route: 총 비용을 갱신할 루트
+        """
+        cursor = self._cursor()
+        
+        try:
+            old = {a.activity_id: a for a in old_daily.activities if a.activity_id is not None}
+            kept = {a.activity_id for a in new_daily.activities if a.activity_id in old}
+            
+            deleted = [activity_id for activity_id in old if activity_id not in kept]
+            if deleted:
+                cursor.execute(
+                    "DELETE FROM itinerary_activities WHERE activity_id IN ("
+                    + ", ".join(["%s"] * len(deleted)) + ")",
+                    deleted
+                )
+            
+            changed = [
+                a for a in new_daily.activities
+                if a.activity_id in old and (
+                    a.activity_order != old[a.activity_id].activity_order or
+                    a.activity_time != old[a.activity_id].activity_time
+                )
+            ]
+            if changed:
+                cursor.executemany("""
+                    UPDATE itinerary_activities
+                    SET activity_order = %s, activity_time = %s
+                    WHERE activity_id = %s
+                """, [(a.activity_order, a.activity_time, a.activity_id) for a in changed])
+            
+            added = [a for a in new_daily.activities if a.activity_id not in old]
+            activity_ids = self._bulk_insert(cursor, """
+                INSERT INTO itinerary_activities 
+                (itinerary_id, activity_order, activity_time, activity_name,
+                 activity_description, location_id, location_name, location_address,
+                 coordinates, estimated_duration_minutes, estimated_cost, activity_category_id)
+                VALUES """, "(%s, %s, %s, %s, %s, %s, %s, %s, POINT(%s, %s), %s, %s, %s)", [
+                (new_daily.itinerary_id, a.activity_order, a.activity_time,
+                 a.activity_name, a.activity_description,
+                 a.location_id, a.location_name, a.location_address,
+                 a.lon, a.lat,  # POINT는 (경도, 위도) 순서
+                 a.estimated_duration_minutes, a.estimated_cost, a.activity_category_id)
+                for a in added
+            ])
+            for activity, activity_id in zip(added, activity_ids):
+                activity.itinerary_id = new_daily.itinerary_id
+                activity.activity_id = activity_id
+            
+            if new_daily.day_description != old_daily.day_description:
+                cursor.execute(
+                    "UPDATE route_itinerary SET day_description = %s WHERE itinerary_id = %s",
+                    (new_daily.day_description, new_daily.itinerary_id)
+                )
+            if route is not None:
+                cursor.execute(
+                    "UPDATE recommended_routes SET total_estimated_cost = %s WHERE route_id = %s",
+                    (route.total_estimated_cost, route.route_id)
+                )
+            
+            self.conn.commit()
+            
+        except Exception as e:
+            self.conn.rollback()
+            raise Exception(f"일정 저장 실패: {str(e)}")
+    
+    @staticmethod
+    def _rows_as_dicts(cursor) -> List[dict]:
+        """DictCursor/기본 cursor 모두 dict 리스트로 변환"""
+        rows = cursor.fetchall()
+        if rows and not isinstance(rows[0], dict):
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in rows]
+        return list(rows)
+    
+    @staticmethod
+    def _to_float(value) -> Optional[float]:
+        """MySQL DECIMAL (Decimal) -> float"""
+        return float(value) if value is not None else None
+    
+    @staticmethod
+    def _to_time(value) -> Optional[datetime.time]:
+        """MySQL TIME (드라이버에 따라 timedelta) -> datetime.time"""
+        if value is None or isinstance(value, datetime.time):
+            return value
+        seconds = int(value.total_seconds())
+        return datetime.time(seconds // 3600 % 24, seconds // 60 % 60, seconds % 60)
+    
+    def _bulk_insert(self, cursor, insert_sql: str, row_placeholder: str, rows: list) -> List[int]:
+        """
+        다중 행 INSERT 실행 후 각 행의 auto increment ID 반환
+        
+        Parameters:
+        - insert_sql: "INSERT INTO ... VALUES " 까지의 SQL
+        - row_placeholder: 한 행의 값 자리 "(%s, %s, ...)"
+        - rows: 행별 값 튜플 리스트
+        """
+        ids = []
+        if not rows:
+            return ids
+        
+        step = self._auto_increment_step(cursor)
+        for start in range(0, len(rows), self.BULK_INSERT_CHUNK):
+            chunk = rows[start:start + self.BULK_INSERT_CHUNK]
+            cursor.execute(
+                insert_sql + ", ".join([row_placeholder] * len(chunk)),
+                [value for row in chunk for value in row]
+            )
+            first_id = cursor.lastrowid
+            ids.extend(first_id + k * step for k in range(len(chunk)))
+        return ids
+    
+    def _auto_increment_step(self, cursor) -> int:
+        """세션의 auto_increment_increment (연결당 1회 조회)"""
+        step = getattr(self, "_auto_increment_increment", None)
+        if step is None:
+            cursor.execute("SELECT @@auto_increment_increment AS step")
+            row = cursor.fetchone()
+            step = int(row["step"] if isinstance(row, dict) else row[0])
+            self._auto_increment_increment = step
+        return step
+
+
+# ==================== TravelRecommendationSystem 클래스 ====================
+
+class TravelRecommendationSystem:
+    """여행 일정 추천 시스템"""
+    
+    # prepared_catalog 재사용 기간(초)과 최대 보관 수
+    CATALOG_MEMO_SECONDS = 300
+    CATALOG_MEMO_SIZE = 8
+    
+    def __init__(self, 
+                 db_connector: DatabaseConnector,
+                 candidate_mode: str = "full",
+                 candidate_radius_minutes: float = 60,
+                 candidate_k: int = 50,
+                 local_search_budget_ms: float = 0,
+                 travel_time_providers: Optional[dict] = None,
+                 day_clustering: str = "none",
+                 route_cache: Optional[RouteResultCache] = None,
+                 theme_category_weights: Optional[dict] = None,
+                 popularity_weight: float = 3.0,
+                 metrics: Optional[MetricsRegistry] = None,
+                 solver: str = "greedy",
+                 solver_budget_ms: float = 50,
+                 beam_width: int = 8,
+                 catalog_snapshot: Optional[CatalogSnapshot] = None,
+                 day_workers: int = 0,
+                 route_templates: Optional[RouteTemplateStore] = None,
+                 personalization_weight: float = 2.0):
+        """
+        Parameters:
+        - db_connector: DatabaseConnector 객체
+        - candidate_mode: 다음 활동 후보 탐색 방식
+            "full" (남은 활동 전체 탐색) or "spatial" (공간 인덱스로 근접 후보만 탐색)
+        - candidate_radius_minutes: spatial 모드 탐색 반경 (이동 시간, 분)
+        - candidate_k: spatial 모드에서 한 단계에 비교할 최대 후보 수
+        - local_search_budget_ms: 하루 일정당 2-opt/Or-opt 개선 시간 한도 (0이면 사용 안 함)
+        - travel_time_providers: transport_mode -> TravelTimeProvider
+            (없으면 TRANSPORT_PROFILES 속도 모델, 일부만 주면 나머지는 기본값)
+        - day_clustering: 날짜별 후보 분할 방식
+            "none" (매일 남은 전체 후보), "kmeans" (용량 제한 k-means), "sweep" (각도 분할)
+        - route_cache: 루트 결과 캐시 (없으면 매번 최적화)
+        - theme_category_weights: {theme_id: {카테고리: 가중치}} 테마별 매칭 가중치
+            (없는 테마는 DB 테마 규칙(catalog_source="db"), 그것도 없으면 모든 카테고리 가중치 1)
+        - popularity_weight: 리뷰/평점 인기도(0~1)를 priority_score에 더할 때의 가중치
+            (기본 3.0 = 카테고리 한 개 일치와 같은 크기, 0이면 사용 안 함)
+        - metrics: 루트 생성 단계별 소요 시간/카운터를 기록할 지표 모음 (없으면 METRICS)
+        - solver: 하루 일정 최적화 방식 (요청별로 바꿀 수 있음, Route.ai_model에 기록)
+            "greedy" (점수-거리 그리디), "beam" (빔 서치 오리엔티어링, 제한 시간 초과시 그리디)
+        - solver_budget_ms: beam 방식의 하루당 제한 시간 (ms)
+        - beam_width: beam 방식의 빔 너비 (단계마다 남기는 부분 일정 수)
+        - catalog_snapshot: 매핑된 카탈로그 스냅샷 (있으면 API/DB 대신 사용)
+            테마 후보는 스냅샷에 기록된 테마 규칙으로 고르고, 규칙이 없는 테마는
+            theme_category_weights에 일치하는 장소만 쓴다 (둘 다 없으면 예외)
+        - day_workers: 날짜별 최적화를 동시에 실행할 프로세스 수 (0, 1이면 순차 실행)
+            날짜별 후보 그룹이 서로 겹치지 않을 때(day_clustering 사용)만 병렬로 실행하며,
+            결과는 순차 실행과 같다 (제한 시간이 있는 beam/지역 탐색은 시간 초과 여부에 따라 다를 수 있음)
+        - route_templates: 사전 생성 루트 템플릿 (signature가 같으면 solver와 무관하게 우선 사용,
+            개인화 요청(저장된 선호 벡터가 있는 사용자)에는 사용하지 않음)
+        - personalization_weight: 사용자 선호 점수(설문/평가 기반 선호 벡터 내적)를 priority_score에
+            더할 때의 가중치 (0이면 사용 안 함, DB 연결이 선호 벡터를 지원할 때만 적용)
+        """
+        if candidate_mode not in ("full", "spatial"):
+            raise ValueError(f"지원하지 않는 candidate_mode: {candidate_mode}")
+        if day_clustering not in ("none", "kmeans", "sweep"):
+            raise ValueError(f"지원하지 않는 day_clustering: {day_clustering}")
+        if solver not in AI_MODELS:
+            raise ValueError(f"지원하지 않는 solver: {solver}")
+        
+        self.db = db_connector
+        self.candidate_mode = candidate_mode
+        self.candidate_radius_minutes = candidate_radius_minutes
+        self.candidate_k = candidate_k
+        self.local_search_budget_ms = local_search_budget_ms
+        self.travel_time_providers = {**default_travel_time_providers(), **(travel_time_providers or {})}
+        self.day_clustering = day_clustering
+        self.route_cache = route_cache
+        self.theme_category_weights = dict(theme_category_weights or {})
+        self.popularity_weight = popularity_weight
+        self.metrics = metrics if metrics is not None else METRICS
+        self.solver = solver
+        self.solver_budget_ms = solver_budget_ms
+        self.beam_width = beam_width
+        self.catalog_snapshot = catalog_snapshot
+        self.day_workers = day_workers
+        self.route_templates = route_templates
+        self.personalization_weight = personalization_weight
+        self._prepared = OrderedDict()  # prepared_catalog 캐시
+        self._day_pool = None           # 날짜별 병렬 최적화 프로세스 풀 (처음 쓸 때 생성)
+    
+    def close(self):
+        """날짜별 병렬 최적화 프로세스 풀 종료"""
+        if self._day_pool is not None:
+            self._day_pool.shutdown(cancel_futures=True)
+            self._day_pool = None
+    
+    @contextlib.contextmanager
+    def _route_trace(self, name: str, route: Route):
+        """
+        활성 trace가 없으면 새로 만들어 등록하고, 끝나면 route.trace/로그/지표에 기록
+        
+        (이미 활성 trace가 있으면 그 trace에 이어서 기록)
+        """
+        if _CURRENT_TRACE.get() is not None:
+            yield current_trace()
+            return
+        
+        trace = RouteTrace(name)
+        token = _CURRENT_TRACE.set(trace)
+        try:
+            yield trace
+        finally:
+            _CURRENT_TRACE.reset(token)
+        self._record_trace(route, trace)
+    
+    def _traced_days(self, name: str, route: Route, days):
+        """
+        날짜별 생성기(days)를 trace 아래에서 실행하는 생성기
+        
+        ContextVar는 하루 일정을 만드는 동안(next 호출 한 번)만 설정하고 yield 전에 되돌린다.
+        yield를 넘어 설정해 두면 호출자 코드나 번갈아 진행 중인 다른 루트 생성기에
+        trace가 섞이기 때문이다. 중간에 닫힌 스트림도 그때까지의 요약을 남긴다.
+        (이미 활성 trace가 있으면 그 trace에 이어서 기록)
+        """
+        outer = _CURRENT_TRACE.get()
+        trace = outer if outer is not None else RouteTrace(name)
+        try:
+            while True:
+                token = _CURRENT_TRACE.set(trace)
+                try:
+                    daily = next(days)
+                except StopIteration:
+                    return
+                finally:
+                    _CURRENT_TRACE.reset(token)
+                yield daily
+        except GeneratorExit:
+            days.close()
+            trace.count("abandoned_streams")
+            raise
+        finally:
+            if outer is None:
+                self._record_trace(route, trace)
+    
+    def _record_trace(self, route: Route, trace: RouteTrace):
+        """trace 요약을 route.trace, 지표, 로그에 기록"""
+        route.trace = trace.summary()
+        self.metrics.record(route.trace)
+        logger.info(
+            "%s %.1fms 단계=%s 카운터=%s",
+            trace.name, route.trace["total_ms"], route.trace["phases_ms"], route.trace["counters"]
+        )
+    
+    def travel_time_provider(self, transport_mode: str) -> TravelTimeProvider:
+        """이동수단별 이동 시간 계산기 (모르는 이동수단은 public 사용)"""
+        return self.travel_time_providers.get(transport_mode, self.travel_time_providers["public"])
+    
+    def candidate_radius_km(self, transport_mode: str = "public") -> float:
+        """spatial 모드 탐색 반경 (이동 시간 -> km 환산)"""
+        return self.travel_time_provider(transport_mode).reach_km(self.candidate_radius_minutes / 60)
+    
+    def calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        """두 지점 간 거리 계산 (Haversine formula, km)"""
+        R = EARTH_RADIUS_KM
+        
+        dlat = math.radians(lat2 - lat1)
+        dlon = math.radians(lon2 - lon1)
+        a = (math.sin(dlat / 2) ** 2 + 
+             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
+             math.sin(dlon / 2) ** 2)
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        
+        return R * c
+    
+    def calculate_match_score(self, activity: Activity, theme_categories) -> float:
+        """
+        활동과 테마 카테고리 매칭 점수 계산 (단건용, 카탈로그 전체는 ActivityTable.match_scores)
+        
+        Parameters:
+        - theme_categories: 테마 카테고리 리스트 또는 {카테고리: 가중치}
+        """
+        if not isinstance(theme_categories, dict):
+            theme_categories = dict.fromkeys(theme_categories, 1.0)
+        matched = [
+            theme_categories[cat] for cat in set(activity.categories)
+            if theme_categories.get(cat, 0) != 0
+        ]
+        return sum(matched) * 2 + len(matched)
+    
+    def build_distance_matrix(self, activities) -> DistanceMatrix:
+        """
+        활동 간 거리 행렬 생성 (Haversine, km)
+        
+        루트 생성시 한 번만 만들고, 일별 최적화에서는 인덱스로 조회한다.
+        """
+        if isinstance(activities, ActivityTable):
+            return DistanceMatrix(activities.lat, activities.lon)
+        return DistanceMatrix.from_activities(activities)
+    
+    @staticmethod
+    def _schedule_window(schedule_type: str, target_count: int) -> tuple:
+        """schedule_type별 하루 활동 시간(max_hours)과 목표 방문 수"""
+        if schedule_type == "packed":
+            return 14, min(6, target_count + 1)  # 더 많은 시간
+        return 10, min(4, target_count)  # 여유있게
+    
+    @staticmethod
+    def _hours_to_time(hours: float) -> datetime.time:
+        """9.5 -> 09:30 (하루를 넘는 시각은 ValueError)"""
+        if not 0 <= hours < 24:
+            raise ValueError(f"하루 범위를 벗어난 시각입니다: {hours:.2f}시")
+        hour = int(hours)
+        minute = int((hours - hour) * 60)
+        return datetime.time(hour, minute)
+    
+    def optimize_daily_route(self, 
+                            activities, 
+                            start_time: int = 9,
+                            max_hours: int = 12,
+                            target_count: int = 4,
+                            schedule_type: str = "relaxed",
+                            distance_matrix: Optional[DistanceMatrix] = None,
+                            candidate_indices: Optional[np.ndarray] = None,
+                            spatial_index: Optional[SpatialGridIndex] = None,
+                            transport_mode: str = "public",
+                            pinned_indices: Optional[List[int]] = None) -> tuple:
+        """
+        하루 일정 최적화
+        
+        Parameters:
+        - activities: ActivityTable 또는 Activity 리스트 (리스트는 priority_score로 변환)
+        - schedule_type: "relaxed" (여유) or "packed" (빡빡)
+        - distance_matrix: activities 전체에 대한 거리 행렬 (없으면 새로 계산)
+        - candidate_indices: 오늘 선택 가능한 activities 인덱스 (없으면 전체)
+        - spatial_index: activities 전체에 대한 공간 인덱스
+            (candidate_mode="spatial"일 때 사용, 없으면 새로 생성)
+        - transport_mode: 이동 시간 계산에 쓸 이동수단
+        - pinned_indices: 반드시 포함할 activities 인덱스 (이 순서대로 먼저 배치)
+        
+        Returns:
+        - (selected, total_distance, total_cost): selected는 activity_order/activity_time이
+          기록된 새 Activity 리스트 (입력 카탈로그는 변경하지 않음)
+        """
+        table = activities if isinstance(activities, ActivityTable) else ActivityTable.from_activities(activities)
+        if not len(table):
+            return [], 0.0, 0.0
+        
+        # schedule_type에 따라 시간 조정
+        max_hours, target_count = self._schedule_window(schedule_type, target_count)
+        
+        if distance_matrix is None:
+            distance_matrix = self.build_distance_matrix(table)
+        if candidate_indices is None:
+            candidates = np.arange(len(table))
+        else:
+            candidates = np.asarray(candidate_indices, dtype=np.intp)
+        if candidates.size == 0 and (pinned_indices is None or len(pinned_indices) == 0):
+            return [], 0.0, 0.0
+        
+        # 후보별 점수/소요시간 배열 (candidates 순서 유지)
+        priority = table.score[candidates]
+        durations = table.duration_hours[candidates]
+        available = np.ones(candidates.size, dtype=bool)
+        end_time = start_time + max_hours
+        provider = self.travel_time_provider(transport_mode)
+        
+        # spatial 모드: 카탈로그 인덱스 -> candidates 위치 매핑
+        use_spatial = self.candidate_mode == "spatial"
+        if use_spatial:
+            radius_km = self.candidate_radius_km(transport_mode)
+            if spatial_index is None:
+                spatial_index = SpatialGridIndex(table.lat, table.lon, cell_km=radius_km)
+            position = np.full(len(table), -1, dtype=np.intp)
+            position[candidates] = np.arange(candidates.size)
+        
+        selected = []
+        total_distance = 0.0
+        total_cost = 0.0
+        current_time = start_time
+        
+        if pinned_indices is not None and len(pinned_indices):
+            # 고정 활동: 주어진 순서대로 먼저 배치하고 이어서 그리디 선택
+            pinned = [int(i) for i in pinned_indices]
+            available &= ~np.isin(candidates, pinned)
+            here = None
+            for i in pinned:
+                if here is not None:
+                    distance = float(distance_matrix[here, i])
+                    current_time += float(provider.travel_hours(
+                        distance, table.location_id[here], table.location_id[i]
+                    ))
+                    total_distance += distance
+                if current_time + table.duration_hours[i] > end_time:
+                    raise ValueError(
+                        f"고정한 장소가 하루 일정({start_time}시~{end_time}시)을 넘습니다: "
+                        f"location_id={int(table.location_id[i])}"
+                    )
+                selected.append(table.materialize(
+                    i, activity_order=len(selected) + 1, activity_time=self._hours_to_time(current_time)
+                ))
+                current_time += table.duration_hours[i]
+                total_cost += table.cost[i]
+                here = i
+        else:
+            # 첫 활동 선택
+            first = int(np.argmax(priority))
+            available[first] = False
+            here = candidates[first]
+            selected.append(table.materialize(
+                here, activity_order=1, activity_time=datetime.time(current_time, 0)
+            ))
+            
+            current_time += durations[first]
+            total_cost += table.cost[here]
+        
+        # 다음 활동들 선택
+        trace = current_trace()
+        remaining = int(available.sum())
+        while remaining and len(selected) < target_count and current_time < end_time:
+            trace.count("selection_steps")
+            best = None
+            if use_spatial:
+                # 반경 내 가까운 후보 k개만 비교 (시간 제약은 후보에만 적용)
+                def feasible(idx):
+                    pos = position[idx]
+                    ok = pos >= 0
+                    ok[ok] = available[pos[ok]] & (current_time + durations[pos[ok]] <= end_time)
+                    return ok
+                
+                nearby, nearby_dist = spatial_index.query(
+                    table.lat[here], table.lon[here], radius_km, self.candidate_k, predicate=feasible
+                )
+                trace.count("candidates_evaluated", int(nearby.size))
+                if nearby.size:
+                    pick = int(np.argmax(priority[position[nearby]] * 10 - nearby_dist))
+                    best = int(position[nearby[pick]])
+                    distance = float(nearby_dist[pick])
+            
+            if best is None:
+                # spatial 모드에서 반경 내 후보가 없으면 전체 탐색으로 대체
+                valid = available & (current_time + durations <= end_time)
+                trace.count("candidates_evaluated", int(valid.sum()))
+                
+                if not valid.any():
+                    break
+                
+                # 현재 위치 기준 거리 행 조회 후 점수 최대값 선택
+                dist_row = distance_matrix[here, candidates]
+                scores = np.where(valid, priority * 10 - dist_row, -np.inf)
+                best = int(np.argmax(scores))
+                distance = float(dist_row[best])
+            
+            travel_time = float(provider.travel_hours(
+                distance, table.location_id[here], table.location_id[candidates[best]]
+            ))
+            
+            if current_time + travel_time + durations[best] > end_time:
+                break
+            
+            selected.append(table.materialize(
+                candidates[best],
+                activity_order=len(selected) + 1,
+                activity_time=self._hours_to_time(current_time + travel_time)
+            ))
+            available[best] = False
+            remaining -= 1
+            here = candidates[best]
+            current_time += travel_time + durations[best]
+            total_distance += distance
+            total_cost += table.cost[here]
+        
+        return selected, total_distance, float(total_cost)
+    
+    def solve_daily_orienteering(self,
+                                 activities,
+                                 start_time: int = 9,
+                                 max_hours: int = 12,
+                                 target_count: int = 4,
+                                 schedule_type: str = "relaxed",
+                                 distance_matrix: Optional[DistanceMatrix] = None,
+                                 candidate_indices: Optional[np.ndarray] = None,
+                                 spatial_index: Optional[SpatialGridIndex] = None,
+                                 transport_mode: str = "public",
+                                 pinned_indices: Optional[List[int]] = None,
+                                 time_budget_ms: Optional[float] = None) -> tuple:
+        """
+        하루 일정 최적화 - 빔 서치 오리엔티어링
+        
+        하루 시간 예산(이동 + 체류) 안에서 방문 장소 priority 합을 최대화한다
+        (같으면 이동 거리가 짧은 쪽). 그리디 결과를 먼저 구한 뒤, 빔 서치가 더 좋은 일정을
+        찾으면 교체한다. 제한 시간을 넘기면 그때까지 찾은 일정과 그리디 중 좋은 쪽을 쓴다.
+        고정 활동(pinned_indices)이 있으면 그리디 결과를 그대로 사용한다.
+        
+        Parameters:
+        - optimize_daily_route와 동일
+        - time_budget_ms: 제한 시간 (None이면 solver_budget_ms)
+        
+        Returns:
+        - optimize_daily_route와 동일
+        """
+        greedy = self.optimize_daily_route(
+            activities, start_time=start_time, max_hours=max_hours, target_count=target_count,
+            schedule_type=schedule_type, distance_matrix=distance_matrix,
+            candidate_indices=candidate_indices, spatial_index=spatial_index,
+            transport_mode=transport_mode, pinned_indices=pinned_indices
+        )
+        if not greedy[0] or (pinned_indices is not None and len(pinned_indices)):
+            return greedy
+        
+        budget_ms = self.solver_budget_ms if time_budget_ms is None else time_budget_ms
+        deadline = time.perf_counter() + budget_ms / 1000
+        trace = current_trace()
+        
+        table = activities if isinstance(activities, ActivityTable) else ActivityTable.from_activities(activities)
+        if distance_matrix is None:
+            distance_matrix = self.build_distance_matrix(table)
+        candidates = (np.arange(len(table)) if candidate_indices is None
+                      else np.asarray(candidate_indices, dtype=np.intp))
+        max_hours, target_count = self._schedule_window(schedule_type, target_count)
+        end_time = start_time + max_hours
+        provider = self.travel_time_provider(transport_mode)
+        priority = table.score[candidates]
+        durations = table.duration_hours[candidates]
+        
+        # 상태: (점수 합, 이동 거리, 현재 시각, 방문 경로(candidates 위치))
+        # 빔 순위는 그리디와 같은 기준(priority * 10 - 거리)의 누적값
+        beam = [
+            (float(priority[pos]), 0.0, start_time + float(durations[pos]), (int(pos),))
+            for pos in np.argsort(-priority, kind="stable")[:self.beam_width]
+            if start_time + durations[pos] <= end_time
+        ]
+        if not beam:
+            return greedy
+        best = max(beam, key=lambda state: (state[0], -state[1]))
+        timed_out = False
+        
+        for _ in range(target_count - 1):
+            if time.perf_counter() > deadline:
+                timed_out = True
+                break
+            
+            expanded = {}
+            for score, distance, now, path in beam:
+                here = candidates[path[-1]]
+                dist_row = distance_matrix[here, candidates]
+                arrive = now + provider.travel_hours(
+                    dist_row, table.location_id[here], table.location_id[candidates]
+                )
+                feasible = arrive + durations <= end_time
+                feasible[list(path)] = False
+                trace.count("candidates_evaluated", int(feasible.sum()))
+                if not feasible.any():
+                    continue
+                
+                gain = np.where(feasible, priority * 10 - dist_row, -np.inf)
+                top = np.argsort(-gain, kind="stable")[:self.beam_width]
+                for pos in top[np.isfinite(gain[top])]:
+                    pos = int(pos)
+                    state = (score + float(priority[pos]), distance + float(dist_row[pos]),
+                             float(arrive[pos] + durations[pos]), path + (pos,))
+                    # 같은 장소 집합 + 같은 마지막 장소는 더 좋은 상태 하나만 유지
+                    key = (frozenset(path), pos)
+                    if key not in expanded or \
+                            state[0] * 10 - state[1] > expanded[key][0] * 10 - expanded[key][1]:
+                        expanded[key] = state
+            
+            if not expanded:
+                break
+            beam = sorted(expanded.values(), key=lambda state: state[0] * 10 - state[1],
+                          reverse=True)[:self.beam_width]
+            best = max([best, *beam], key=lambda state: (state[0], -state[1]))
+        
+        if timed_out:
+            trace.count("solver_timeouts")
+        
+        greedy_score = sum(a.priority_score for a in greedy[0])
+        if (best[0], -best[1]) <= (greedy_score, -greedy[1]):
+            return greedy
+        
+        trace.count("solver_improved_days")
+        selected = [table.materialize(candidates[pos]) for pos in best[3]]
+        total_distance = self._stamp_schedule(selected, start_time, transport_mode)
+        total_cost = float(table.cost[candidates[list(best[3])]].sum())
+        return selected, total_distance, total_cost
+    
+    def improve_daily_route(self,
+                            activities: List[Activity],
+                            start_time: int = 9,
+                            schedule_type: str = "relaxed",
+                            time_budget_ms: Optional[float] = None,
+                            transport_mode: str = "public") -> tuple:
         """
+        하루 일정 지역 탐색 개선 (2-opt + Or-opt)
+        
+        그리디 결과의 방문 순서를 바꿔 이동 거리를 줄인다. 방문 장소 집합은 그대로이며,
+        바뀐 순서가 하루 활동 시간(max_hours) 안에 끝나는 경우에만 채택한다.
+        
         Parameters:
-        - db_connection: pymysql.connect() 객체
+        - activities: optimize_daily_route 결과 (방문 순서대로)
+        - start_time: 하루 시작 시각
+        - schedule_type: "relaxed" or "packed" (max_hours 결정)
+        - time_budget_ms: 탐색 시간 한도 (없으면 self.local_search_budget_ms)
+        - transport_mode: 이동 시간 계산에 쓸 이동수단
+        
+        Returns:
+        - (activities, before_distance, after_distance): activity_order/activity_time이
+          다시 계산된 활동 리스트와 개선 전/후 이동 거리(km)
         """
-        self.conn = db_connection
+        if time_budget_ms is None:
+            time_budget_ms = self.local_search_budget_ms
+        
+        n = len(activities)
+        lats = [a.lat for a in activities]
+        lons = [a.lon for a in activities]
+        ids = np.array([a.location_id if a.location_id is not None else -1 for a in activities],
+                       dtype=np.int64)
+        dist = haversine_matrix(lats, lons) if n else np.zeros((0, 0))
+        hours = self.travel_time_provider(transport_mode).travel_hours(dist, ids[:, None], ids[None, :])
+        durations = sum(a.avg_duration_hours for a in activities)
+        max_hours, _ = self._schedule_window(schedule_type, n)
+        
+        def path_length(order):
+            return float(sum(dist[order[k], order[k + 1]] for k in range(len(order) - 1)))
+        
+        def feasible(order):
+            travel = sum(hours[order[k], order[k + 1]] for k in range(len(order) - 1))
+            return durations + travel <= max_hours
+        
+        order = list(range(n))
+        before = best_length = path_length(order)
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        
+        improved = n > 2
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            
+            # 2-opt: 구간 [i, j] 뒤집기
+            for i in range(n - 1):
+                for j in range(i + 1, n):
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    length = path_length(candidate)
+                    if length < best_length - 1e-9 and feasible(candidate):
+                        order, best_length, improved = candidate, length, True
+            
+            # Or-opt: 길이 1~3 구간을 다른 위치로 이동 (정방향/역방향)
+            for seg_len in (1, 2, 3):
+                for i in range(n - seg_len + 1):
+                    segment = order[i:i + seg_len]
+                    rest = order[:i] + order[i + seg_len:]
+                    for pos in range(len(rest) + 1):
+                        for piece in (segment, segment[::-1]):
+                            candidate = rest[:pos] + piece + rest[pos:]
+                            length = path_length(candidate)
+                            if length < best_length - 1e-9 and feasible(candidate):
+                                order, best_length, improved = candidate, length, True
+        
+        # 방문 순서/시간 다시 기록
+        result = [activities[k] for k in order]
+        current_time = start_time
+        for k, activity in enumerate(result):
+            if k > 0:
+                current_time += hours[order[k - 1], order[k]]
+            activity.activity_order = k + 1
+            activity.activity_time = self._hours_to_time(current_time)
+            current_time += activity.avg_duration_hours
+        
+        return result, before, best_length
     
-    def fetch_activities_by_theme(self, theme_id: int, transport_mode: str = "public"):
+    def prepare_catalog(self, theme_id: int, transport_mode: str = "public",
+                        region: Optional[tuple] = None) -> ActivityTable:
         """
-        테마에 맞는 활동/관광지 조회 - API 호출 방식
+        테마 카탈로그 조회 + 매칭 점수 계산 + 점수순 정렬
         
         Parameters:
         - theme_id: trip_themes 테이블의 theme_id
         - transport_mode: 이동수단
+        - region: 여행 지역 (preference_region 결과, None이면 지역 제한 없음)
         
         Returns:
-        - List[Activity]: 조건에 맞는 활동 리스트
+        - ActivityTable: priority_score 내림차순으로 정렬된 카탈로그
+        """
+        trace = current_trace()
+        
+        # 1. 테마에 맞는 활동 가져오기 (스냅샷이 있으면 매핑된 전체 카탈로그)
+        with trace.phase("catalog_fetch"):
+            if self.catalog_snapshot is not None:
+                all_activities = self._snapshot_catalog(theme_id)
+            else:
+                all_activities = self.db.fetch_activities_by_theme(theme_id, transport_mode, region)
+            
+            # 지역 제한: DB/API는 조회 단계에서 이미 줄였고, 스냅샷이나 조건을 무시하는
+            # 소스도 같은 결과가 되도록 좌표로 한 번 더 거른다
+            if region is not None and len(all_activities):
+                if not isinstance(all_activities, ActivityTable):
+                    all_activities = ActivityTable.from_activities(all_activities)
+                inside = region_mask(region, all_activities.lat, all_activities.lon)
+                if not inside.all():
+                    all_activities = all_activities.take(np.flatnonzero(inside))
+        
+        if not len(all_activities):
+            raise Exception("조건에 맞는 활동을 찾을 수 없습니다.")
+        trace.count("catalog_size", len(all_activities))
+        
+        # 2. 매칭 점수 계산 (카테고리 비트마스크로 카탈로그 전체를 한 번에 계산)
+        # 테마별 가중치: 엔진 설정 -> 스냅샷/DB 테마 규칙 순, 모두 없으면 카탈로그의 모든 카테고리를 가중치 1로 사용
+        # (API 카탈로그는 이미 테마로 걸러져 있고, 스냅샷은 _snapshot_catalog에서 테마 후보만 남긴다)
+        # + 카탈로그 조회시 붙여 둔 리뷰/평점 인기도 반영
+        with trace.phase("scoring"):
+            table = (all_activities if isinstance(all_activities, ActivityTable)
+                     else ActivityTable.from_activities(all_activities))
+            weights = self.theme_category_weights.get(theme_id)
+            if weights is None and self.catalog_snapshot is not None:
+                weights = self.catalog_snapshot.theme_weights(theme_id)
+            db_weights = getattr(self.db, "theme_category_weights", None)
+            if weights is None and db_weights is not None:
+                weights = db_weights(theme_id)
+            scores = table.match_scores(weights)
+            table = table.with_scores(scores + self.popularity_weight * table.popularity)
+        
+        # 3. 점수순 정렬 (동점은 원래 순서 유지)
+        with trace.phase("sorting"):
+            return table.take(np.argsort(-table.score, kind="stable"))
+    
+    def _snapshot_catalog(self, theme_id: int) -> ActivityTable:
+        """
+        스냅샷에서 테마 후보 행만 고른 카탈로그
+        
+        스냅샷의 테마 규칙 -> 엔진 theme_category_weights(가중치가 양수인 카테고리/태그 일치) 순.
+        둘 다 없으면 전체 카탈로그를 쓰지 않고 예외를 발생시킨다.
         """
-        # API를 통해 관광지 데이터 가져오기
-        return self._fetch_activities_from_api(theme_id, transport_mode)
+        snapshot = self.catalog_snapshot
+        table = snapshot.table()
+        rows = snapshot.theme_rows(theme_id)
+        if rows is None:
+            weights = self.theme_category_weights.get(theme_id)
+            if not weights:
+                raise Exception(f"카탈로그 스냅샷에 테마 규칙이 없습니다: theme_id={theme_id}")
+            mask = table.category_mask(name for name, weight in weights.items() if weight > 0)
+            rows = np.flatnonzero((table.category_bits & mask).any(axis=1))
+        return table.take(rows)
     
-    def _fetch_activities_from_api(self, theme_id: int, transport_mode: str = "public"):
+    def prepared_catalog(self, theme_id: int, transport_mode: str = "public",
+                         region: Optional[tuple] = None) -> tuple:
         """
-        API를 통해 관광지 데이터 가져오기
+        최근 준비한 카탈로그와 거리 행렬 재사용 (일정 재계획 등 반복 호출용)
         
-        실제 API 엔드포인트에 맞게 수정
+        Returns:
+        - (ActivityTable, DistanceMatrix): CATALOG_MEMO_SECONDS 동안 같은 객체 반환
+          (거리 행렬에 계산해 둔 행도 그대로 재사용된다)
+        """
+        key = (theme_id, transport_mode, region)
+        now = time.monotonic()
+        entry = self._prepared.get(key)
+        if entry is not None and now - entry[2] <= self.CATALOG_MEMO_SECONDS:
+            self._prepared.move_to_end(key)
+            return entry[0], entry[1]
+        
+        table = self.prepare_catalog(theme_id, transport_mode, region)
+        self._prepared[key] = (table, self.build_distance_matrix(table), now)
+        self._prepared.move_to_end(key)
+        while len(self._prepared) > self.CATALOG_MEMO_SIZE:
+            self._prepared.popitem(last=False)
+        return self._prepared[key][0], self._prepared[key][1]
+    
+    def user_preference(self, preference: RoutePreference) -> Optional[tuple]:
+        """
+        개인화에 쓸 사용자 선호 가중치 (DatabaseConnector.user_preference_weights, 조회만 함)
+        
+        Returns:
+        - (weights, digest) 또는 None: 개인화를 쓰지 않거나, DB 연결이 지원하지 않거나,
+          저장된 선호 벡터가 없거나, 조회에 실패한 경우 (이때는 개인화 없이 생성)
+        """
+        if self.personalization_weight == 0 or not preference.user_id:
+            return None
+        lookup = getattr(self.db, "user_preference_weights", None)
+        if lookup is None:
+            return None
+        try:
+            return lookup(preference.user_id)
+        except Exception as e:
+            logger.warning("선호 벡터 조회 실패 (user_id=%s): %s", preference.user_id, e)
+            return None
+    
+    def personalize_catalog(self, table: ActivityTable, personal: tuple,
+                            reorder: bool = True) -> ActivityTable:
+        """
+        카탈로그 점수에 사용자 선호 점수 더하기 (카테고리 행렬 x 선호 가중치 내적 한 번)
         
         Parameters:
-        - theme_id: 테마 ID
-        - transport_mode: 이동수단
+        - table: prepare_catalog 결과 (변경되지 않음)
+        - personal: user_preference 결과
+        - reorder: True면 점수순으로 다시 정렬, False면 행 순서 유지 (거리 행렬 재사용시)
+        """
+        weights, _ = personal
+        trace = current_trace()
+        with trace.phase("personalize"):
+            table = table.with_scores(
+                table.score + self.personalization_weight * table.preference_scores(weights)
+            )
+            if reorder:
+                table = table.take(np.argsort(-table.score, kind="stable"))
+        trace.count("personalized_catalogs")
+        return table
+    
+    def _stamp_schedule(self, activities: List[Activity], start_time: int = 9,
+                        transport_mode: str = "public",
+                        end_time: Optional[float] = None) -> float:
+        """
+        주어진 방문 순서대로 activity_order/activity_time 기록, 총 이동 거리(km) 반환
+        
+        end_time을 주면 그 시각을 넘겨 끝나는 활동이 있을 때 ValueError
+        """
+        provider = self.travel_time_provider(transport_mode)
+        total_distance = 0.0
+        current_time = start_time
+        previous = None
+        for k, activity in enumerate(activities):
+            if previous is not None:
+                distance = self.calculate_distance(previous.lat, previous.lon, activity.lat, activity.lon)
+                current_time += float(provider.travel_hours(
+                    distance,
+                    previous.location_id if previous.location_id is not None else -1,
+                    activity.location_id if activity.location_id is not None else -1
+                ))
+                total_distance += distance
+            if end_time is not None and current_time + activity.avg_duration_hours > end_time:
+                raise ValueError(
+                    f"지정한 순서로는 하루 일정({start_time}시~{end_time}시)을 넘습니다: "
+                    f"location_id={activity.location_id}"
+                )
+            activity.activity_order = k + 1
+            activity.activity_time = self._hours_to_time(current_time)
+            current_time += activity.avg_duration_hours
+            previous = activity
+        return total_distance
+    
+    def replan_itinerary_day(self,
+                             route: Route,
+                             preference: RoutePreference,
+                             day_number: int,
+                             remove: Optional[List[int]] = None,
+                             pin: Optional[List[int]] = None,
+                             reorder: Optional[List[int]] = None) -> DailyItinerary:
+        """
+        하루 일정만 다시 계획 (다른 날짜는 그대로)
+        
+        Parameters:
+        - route: 기존 루트 (해당 날짜의 DailyItinerary가 교체됨)
+        - preference: 루트의 RoutePreference
+        - day_number: 다시 계획할 날짜 (1부터)
+        - remove: 제외할 location_id 리스트 (이 날짜 후보에서도 제외)
+        - pin: 유지할 location_id 리스트 (현재 순서대로 먼저 배치 후 나머지를 채움)
+        - reorder: 지정한 location_id 순서로 그대로 배치 (최적화 없이 시간만 다시 계산)
+          (pin/reorder가 하루 일정 시간을 넘으면 ValueError, 이때 route는 바뀌지 않음)
         
         Returns:
-        - List[Activity]: 활동 리스트
+        - DailyItinerary: 새 일정 (변경 전 활동의 activity_id는 유지)
         """
-        import requests
+        daily = next((d for d in route.itinerary if d.day_number == day_number), None)
+        if daily is None:
+            raise ValueError(f"{day_number}일차 일정이 없습니다.")
         
-        activities = []
+        removed = set(remove or [])
+        current = [a for a in daily.activities if a.location_id not in removed]
         
-        try:
-            # 팀 자체 백엔드 API 호출
-            
-            # API 엔드포인트 설정 (팀 API 주소로 수정)
-            api_url = "http://your-backend-api.com/api/locations"
+        if reorder is not None:
+            # 사용자가 지정한 순서 그대로 (지정하지 않은 활동은 뒤에 유지)
+            # 기존 일정의 Activity는 그대로 두고 복사본에 순서/시간을 매긴다
+            # (변경분 비교(update_itinerary_day)와 실패시 기존 루트 보존을 위해)
+            rank = {location_id: k for k, location_id in enumerate(reorder)}
+            activities = sorted((copy.copy(a) for a in current),
+                                key=lambda a: rank.get(a.location_id, len(rank)))
+            max_hours, _ = self._schedule_window(preference.schedule_type, len(activities))
+            distance = self._stamp_schedule(activities, 9, preference.transport_mode, 9 + max_hours)
+        else:
+            table, distance_matrix = self.prepared_catalog(
+                preference.theme_id, preference.transport_mode, preference_region(preference)
+            )
+            personal = self.user_preference(preference)
+            if personal is not None:
+                # 거리 행렬은 행 순서 기준이므로 정렬하지 않고 점수만 바꾼다
+                table = self.personalize_catalog(table, personal, reorder=False)
             
-            # 요청 파라미터
-            params = {
-                'theme_id': theme_id,
-                'transport_mode': transport_mode,
-                'limit': 100
+            # 다른 날짜에서 이미 사용한 장소 + 제외 장소는 후보에서 뺀다
+            used_elsewhere = {
+                a.location_id for d in route.itinerary if d.day_number != day_number
+                for a in d.activities if a.location_id
             }
+            pin = list(pin or [])
+            in_day = [a.location_id for a in current]
+            pinned_ids = ([location_id for location_id in in_day if location_id in pin] +
+                          [location_id for location_id in pin if location_id not in in_day])
+            row_of = {int(location_id): i for i, location_id in enumerate(table.location_id)}
+            missing = [location_id for location_id in pinned_ids if location_id not in row_of]
+            if missing:
+                raise ValueError(f"카탈로그에 없는 장소는 고정할 수 없습니다: {missing}")
             
-            # 헤더 (인증 토큰이 필요한 경우)
-            headers = {
-                'Authorization': 'Bearer YOUR_API_TOKEN',  # 필요시
-                'Content-Type': 'application/json'
-            }
+            excluded = list(used_elsewhere | removed | set(pinned_ids))
+            candidates = np.flatnonzero(~np.isin(table.location_id, excluded))
+            activities_per_day = max(3, min(5, len(table) // max(1, len(route.itinerary))))
             
-            # API 호출
-            response = requests.get(api_url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()  # HTTP 에러 체크
-            
-            data = response.json()
-            
-            # 응답 데이터 파싱 (API 응답 구조에 맞게 수정)
-            
-            if data.get('success') and data.get('data'):
-                for item in data['data']:
-                    activities.append(Activity(
-                        location_id=item.get('id'),
-                        activity_name=item.get('name', ''),
-                        lat=float(item.get('latitude', 0)),
-                        lon=float(item.get('longitude', 0)),
-                        activity_description=item.get('description'),
-                        location_name=item.get('name'),
-                        location_address=item.get('address'),
-                        estimated_duration_minutes=item.get('duration', 120),
-                        estimated_cost=float(item.get('cost', 0)) if item.get('cost') else None,
-                        activity_category_id=item.get('category_id'),
-                        categories=[item.get('category_name')] if item.get('category_name') else []
-                    ))
+            # 기존 루트를 만든 방식(route.ai_model)으로 다시 계획
+            solver = next((name for name, model in AI_MODELS.items() if model == route.ai_model),
+                          self.solver)
+            activities, distance, _ = self._daily_solver(solver)(
+                table,
+                start_time=9,
+                max_hours=12,
+                target_count=activities_per_day,
+                schedule_type=preference.schedule_type,
+                distance_matrix=distance_matrix,
+                candidate_indices=candidates,
+                transport_mode=preference.transport_mode,
+                pinned_indices=[row_of[location_id] for location_id in pinned_ids]
+            )
+            if activities and self.local_search_budget_ms > 0:
+                activities, _, distance = self.improve_daily_route(
+                    activities,
+                    start_time=9,
+                    schedule_type=preference.schedule_type,
+                    transport_mode=preference.transport_mode
+                )
             
-        except requests.exceptions.RequestException as e:
-            print(f"API 호출 실패: {e}")
-            # API 실패시 폴백: DB에서 캐시된 데이터 조회 또는 빈 리스트 반환
-            activities = self._fetch_cached_activities(theme_id)
+            # 기존에 있던 장소는 기존 행(activity_id)을 이어서 사용
+            existing = {a.location_id: a for a in daily.activities if a.location_id}
+            for activity in activities:
+                previous = existing.get(activity.location_id)
+                if previous is not None:
+                    activity.activity_id = previous.activity_id
+                    activity.itinerary_id = previous.itinerary_id
         
-        except Exception as e:
-            print(f"데이터 처리 실패: {e}")
-            activities = []
+        cost = sum(a.estimated_cost or 0.0 for a in activities)
+        new_daily = DailyItinerary(
+            itinerary_id=daily.itinerary_id,
+            route_id=daily.route_id,
+            day_number=daily.day_number,
+            day_date=daily.day_date,
+            day_description=f"Day {daily.day_number}: {len(activities)}개 장소 방문",
+            activities=activities,
+            total_distance=round(distance, 2),
+            total_estimated_cost=round(cost, 2)
+        )
+        route.itinerary[route.itinerary.index(daily)] = new_daily
+        route.total_estimated_cost = round(sum(d.total_estimated_cost for d in route.itinerary), 2)
+        return new_daily
+    
+    def replan_day(self,
+                   route_id: int,
+                   day_number: int,
+                   remove: Optional[List[int]] = None,
+                   pin: Optional[List[int]] = None,
+                   reorder: Optional[List[int]] = None) -> Route:
+        """
+        저장된 루트의 하루 일정 재계획 + 바뀐 행만 DB 반영
         
-        return activities
-
-    def save_route(self, route: Route, preference: RoutePreference):
+        Parameters:
+        - route_id: recommended_routes의 route_id
+        - day_number, remove, pin, reorder: replan_itinerary_day 참고
+        
+        Returns:
+        - Route: 갱신된 루트
         """
-        생성된 루트를 DB에 저장
+        route, preference = self.db.load_route(route_id)
+        old_daily = next((d for d in route.itinerary if d.day_number == day_number), None)
+        new_daily = self.replan_itinerary_day(route, preference, day_number, remove, pin, reorder)
+        self.db.update_itinerary_day(old_daily, new_daily, route)
+        return route
+    
+    def generate_route(self, preference: RoutePreference, solver: Optional[str] = None) -> Route:
+        """
+        사용자 선호도에 맞는 전체 루트 생성
         
         Parameters:
-        - route: Route 객체
         - preference: RoutePreference 객체
+        - solver: 이번 요청의 일정 최적화 방식 (None이면 엔진 기본값)
         
         Returns:
-        - route_id: 저장된 route의 ID
+        - Route: 생성된 루트 객체
         """
-        cursor = self.conn.cursor()
-        
-        try:
-            # 1. route_preferences 저장 (이미 있다면 스킵)
-            if preference.preference_id is None:
-                cursor.execute("""
-                    INSERT INTO route_preferences 
-                    (user_id, start_date, end_date, theme_id, schedule_type, 
-                     travelers_count, preferred_language, transport_mode)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    preference.user_id, preference.start_date, preference.end_date,
-                    preference.theme_id, preference.schedule_type,
-                    preference.travelers_count, preference.preferred_language,
-                    preference.transport_mode
-                ))
-                preference.preference_id = cursor.lastrowid
-            
-            # 2. recommended_routes 저장
-            cursor.execute("""
-                INSERT INTO recommended_routes 
-                (preference_id, route_name, route_description, total_estimated_cost,
-                 difficulty_level, ai_model, ai_version, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                preference.preference_id, route.route_name, route.route_description,
-                route.total_estimated_cost, route.difficulty_level,
-                route.ai_model, route.ai_version, route.is_active
-            ))
-            route.route_id = cursor.lastrowid
-            
-            # 3. route_itinerary 저장 (각 날짜별)
-            for daily in route.itinerary:
-                cursor.execute("""
-                    INSERT INTO route_itinerary 
-                    (route_id, day_number, day_date, day_description)
-                    VALUES (%s, %s, %s, %s)
-                """, (
-                    route.route_id, daily.day_number, daily.day_date, daily.day_description
-                ))
-                daily.itinerary_id = cursor.lastrowid
-                
-                # 4. itinerary_activities 저장 (각 활동별)
-                for activity in daily.activities:
-                    cursor.execute("""
-                        INSERT INTO itinerary_activities 
-                        (itinerary_id, activity_order, activity_time, activity_name,
-                         activity_description, location_id, location_name, location_address,
-                         coordinates, estimated_duration_minutes, estimated_cost, activity_category_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, POINT(%s, %s), %s, %s, %s)
-                    """, (
-                        daily.itinerary_id, activity.activity_order, activity.activity_time,
-                        activity.activity_name, activity.activity_description,
-                        activity.location_id, activity.location_name, activity.location_address,
-                        activity.lon, activity.lat,  # POINT는 (경도, 위도) 순서
-                        activity.estimated_duration_minutes, activity.estimated_cost,
-                        activity.activity_category_id
-                    ))
-                    activity.activity_id = cursor.lastrowid
-            
-            self.conn.commit()
-            return route.route_id
-            
-        except Exception as e:
-            self.conn.rollback()
-            raise Exception(f"루트 저장 실패: {str(e)}")
-
-
-# ==================== TravelRecommendationSystem 클래스 ====================
-
-class TravelRecommendationSystem:
-    """여행 일정 추천 시스템"""
-    
-    def __init__(self, db_connector: DatabaseConnector):
-        self.db = db_connector
+        route = self.new_route(preference)
+        for _ in self.iter_route_days(preference, route, solver=solver):
+            pass
+        return route
     
-    def calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """두 지점 간 거리 계산 (Haversine formula, km)"""
-        R = 6371
+    def iter_route_days(self, preference: RoutePreference, route: Route,
+                        all_activities: Optional[ActivityTable] = None,
+                        solver: Optional[str] = None):
+        """
+        루트를 날짜 순서대로 생성하며 하루 일정이 끝날 때마다 반환 (generate_route의 스트리밍 버전)
         
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = (math.sin(dlat / 2) ** 2 + 
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-             math.sin(dlon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        반환된 일정은 route.itinerary에 추가되고 route.total_estimated_cost도 함께 갱신되므로,
+        호출자는 Day 1을 먼저 보여주거나 저장하면서 나머지 날짜를 기다릴 수 있다.
         
-        return R * c
+        Parameters:
+        - preference: RoutePreference 객체
+        - route: new_route(preference)로 만든 빈 루트
+        - all_activities: 준비된 카탈로그 (None이면 조회 + 사용자 선호 반영, 루트 템플릿/캐시 사용)
+        - solver: 일정 최적화 방식 (None이면 엔진 기본값, route.ai_model에 기록)
+        
+        Yields:
+        - DailyItinerary: 완성된 하루 일정
+        """
+        solver = self._resolve_solver(solver)
+        route.ai_model = AI_MODELS[solver]
+        yield from self._traced_days(
+            "generate_route", route, self._route_days(preference, route, all_activities, solver)
+        )
     
-    def calculate_match_score(self, activity: Activity, theme_categories: List[str]) -> float:
-        """활동과 테마 카테고리 매칭 점수 계산"""
-        matched = sum(1 for cat in theme_categories if cat in activity.categories)
-        category_diversity = len(set(activity.categories) & set(theme_categories))
-        return matched * 2 + category_diversity
+    def _route_days(self, preference: RoutePreference, route: Route,
+                    all_activities: Optional[ActivityTable], solver: str):
+        """iter_route_days 본문 (_traced_days가 활성화한 trace 아래에서 실행)"""
+        trace = current_trace()
+        # 카탈로그를 직접 받은 경우는 루트 템플릿/캐시를 쓰지 않는다
+        use_cache = all_activities is None and (
+            self.route_cache is not None or self.route_templates is not None
+        )
+        personal = None
+        if all_activities is None:
+            all_activities = self.prepare_catalog(
+                preference.theme_id, preference.transport_mode, preference_region(preference)
+            )
+            personal = self.user_preference(preference)
+        if not use_cache:
+            if personal is not None:
+                all_activities = self.personalize_catalog(all_activities, personal)
+            yield from self._iter_days(preference, route, all_activities, solver)
+            return
+        
+        # 같은 signature + 같은 카탈로그 버전 (+ 같은 선호 벡터)이면
+        # 사전 생성 템플릿 -> 캐시된 루트 순으로 사용
+        with trace.phase("route_cache"):
+            catalog_version = all_activities.fingerprint()
+            cached = self._cached_route(preference, catalog_version, solver, personal)
+        if cached is None:
+            trace.count("route_cache_misses")
+            if personal is not None:
+                all_activities = self.personalize_catalog(all_activities, personal)
+            yield from self._iter_days(preference, route, all_activities, solver)
+            if self.route_cache is not None:
+                with trace.phase("route_cache"):
+                    self.route_cache.put(preference, catalog_version, route,
+                                         self._route_variant(solver, personal))
+            return
+        
+        # 템플릿은 더 비싼 최적화 설정으로 만든 것이므로 만든 방식을 그대로 기록
+        route.ai_model = cached.ai_model
+        trace.count("route_cache_hits")
+        total_route_cost = 0.0
+        for daily in cached.itinerary:
+            route.itinerary.append(daily)
+            total_route_cost += daily.total_estimated_cost
+            route.total_estimated_cost = round(total_route_cost, 2)
+            yield daily
+        route.total_estimated_cost = cached.total_estimated_cost
     
-    def optimize_daily_route(self, 
-                            activities: List[Activity], 
-                            start_time: int = 9,
-                            max_hours: int = 12,
-                            target_count: int = 4,
-                            schedule_type: str = "relaxed") -> tuple:
+    def generate_routes(self, 
+                        preferences: List[RoutePreference], 
+                        max_workers: Optional[int] = None,
+                        solver: Optional[str] = None) -> List[Optional[Route]]:
         """
-        하루 일정 최적화
+        여러 사용자의 루트 일괄 생성
+        
+        (theme_id, transport_mode, 여행 지역)별로 카탈로그를 한 번만 조회/점수 계산하고,
+        사용자별 최적화는 프로세스 풀에 나눠 실행한다. 카탈로그(ActivityTable)는
+        읽기 전용이므로 모든 작업이 같은 카탈로그를 공유해도 변경되지 않는다.
         
         Parameters:
-        - schedule_type: "relaxed" (여유) or "packed" (빡빡)
+        - preferences: RoutePreference 리스트
+        - max_workers: 프로세스 수 (None이면 CPU 수, 1이면 현재 프로세스에서 실행)
+        - solver: 일정 최적화 방식 (None이면 엔진 기본값)
+        
+        Returns:
+        - List[Optional[Route]]: preferences와 같은 순서의 루트 리스트
+          (카탈로그가 비어 생성할 수 없는 항목은 None)
         """
-        if not activities:
-            return [], 0.0, 0.0
+        solver = self._resolve_solver(solver)
         
-        # schedule_type에 따라 시간 조정
-        if schedule_type == "packed":
-            max_hours = 14  # 더 많은 시간
-            target_count = min(6, target_count + 1)
-        else:
-            max_hours = 10  # 여유있게
-            target_count = min(4, target_count)
+        # 1. (theme_id, transport_mode, 여행 지역)별 그룹화
+        groups = {}
+        keys = []
+        for i, preference in enumerate(preferences):
+            key = (preference.theme_id, preference.transport_mode, preference_region(preference))
+            keys.append(key)
+            groups.setdefault(key, []).append(i)
         
-        selected = []
-        available = activities.copy()
-        total_distance = 0.0
-        total_cost = 0.0
-        current_time = start_time
+        # 2. 그룹별 카탈로그 1회 조회
+        catalogs = {}
+        for (theme_id, transport_mode, region), members in groups.items():
+            try:
+                catalogs[(theme_id, transport_mode, region)] = self.prepare_catalog(
+                    theme_id, transport_mode, region
+                )
+            except Exception as e:
+                logger.warning(
+                    "카탈로그 준비 실패 (theme_id=%s, transport_mode=%s, region=%s, %d건): %s",
+                    theme_id, transport_mode, region, len(members), e
+                )
         
-        # 첫 활동 선택
-        first = max(available, key=lambda a: a.priority_score)
-        available.remove(first)
-        first.activity_order = 1
-        first.activity_time = datetime.time(current_time, 0)
-        selected.append(first)
+        routes = [None] * len(preferences)
+        jobs = []
+        versions = {key: catalog.fingerprint() for key, catalog in catalogs.items()} \
+            if self.route_cache is not None or self.route_templates is not None else {}
+        personals = [None] * len(preferences)
+        for key, members in groups.items():
+            if key not in catalogs:
+                continue
+            for i in members:
+                personals[i] = self.user_preference(preferences[i])
+                if key in versions:
+                    routes[i] = self._cached_route(preferences[i], versions[key], solver, personals[i])
+                if routes[i] is None:
+                    catalog = catalogs[key]
+                    if personals[i] is not None:
+                        catalog = self.personalize_catalog(catalog, personals[i])
+                    jobs.append((i, preferences[i], catalog))
         
-        current_lat, current_lon = first.lat, first.lon
-        current_time += first.avg_duration_hours
-        if first.estimated_cost:
-            total_cost += first.estimated_cost
+        # 3. 사용자별 최적화 (캐시에 없는 것만)
+        if max_workers == 1 or len(jobs) <= 1:
+            for i, preference, catalog in jobs:
+                routes[i] = self.build_route(preference, catalog, solver)
+        else:
+            settings = self._engine_settings()
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    pool.submit(_build_route_worker, settings, preference, catalog, solver): i
+                    for i, preference, catalog in jobs
+                }
+                for future, i in futures.items():
+                    routes[i] = future.result()
+                    # 워커 프로세스의 지표는 이 프로세스로 돌아오지 않으므로 trace로 반영
+                    if routes[i].trace is not None:
+                        self.metrics.record(routes[i].trace)
         
-        # 다음 활동들 선택
-        order = 2
-        while available and len(selected) < target_count and current_time < start_time + max_hours:
-            valid = [
-                a for a in available 
-                if current_time + a.avg_duration_hours <= start_time + max_hours
-            ]
-            
-            if not valid:
-                break
-            
-            def selection_score(a):
-                dist = self.calculate_distance(current_lat, current_lon, a.lat, a.lon)
-                return a.priority_score * 10 - dist
-            
-            next_activity = max(valid, key=selection_score)
-            
-            distance = self.calculate_distance(current_lat, current_lon, 
-                                              next_activity.lat, next_activity.lon)
-            travel_time = distance / 30
-            
-            if current_time + travel_time + next_activity.avg_duration_hours > start_time + max_hours:
-                break
-            
-            next_activity.activity_order = order
-            hour = int(current_time + travel_time)
-            minute = int((current_time + travel_time - hour) * 60)
-            next_activity.activity_time = datetime.time(hour, minute)
-            
-            selected.append(next_activity)
-            available.remove(next_activity)
-            current_lat, current_lon = next_activity.lat, next_activity.lon
-            current_time += travel_time + next_activity.avg_duration_hours
-            total_distance += distance
-            
-            if next_activity.estimated_cost:
-                total_cost += next_activity.estimated_cost
-            
-            order += 1
+        if self.route_cache is not None:
+            for i, preference, catalog in jobs:
+                self.route_cache.put(preference, versions[keys[i]], routes[i],
+                                     self._route_variant(solver, personals[i]))
         
-        return selected, total_distance, total_cost
+        return routes
     
-    def generate_route(self, preference: RoutePreference) -> Route:
+    def _engine_settings(self) -> dict:
+        """워커 프로세스에서 같은 설정의 엔진을 만들기 위한 설정값"""
+        return {
+            "candidate_mode": self.candidate_mode,
+            "candidate_radius_minutes": self.candidate_radius_minutes,
+            "candidate_k": self.candidate_k,
+            "local_search_budget_ms": self.local_search_budget_ms,
+            "travel_time_providers": self.travel_time_providers,
+            "day_clustering": self.day_clustering,
+            "theme_category_weights": self.theme_category_weights,
+            "popularity_weight": self.popularity_weight,
+            "solver": self.solver,
+            "solver_budget_ms": self.solver_budget_ms,
+            "beam_width": self.beam_width,
+            "catalog_snapshot": self.catalog_snapshot,
+            "day_workers": self.day_workers,
+            "personalization_weight": self.personalization_weight,
+        }
+    
+    def build_route(self, preference: RoutePreference, all_activities: ActivityTable,
+                    solver: Optional[str] = None) -> Route:
         """
-        사용자 선호도에 맞는 전체 루트 생성
+        준비된 카탈로그로 루트 생성 (카탈로그 조회 없음)
         
         Parameters:
         - preference: RoutePreference 객체
+        - all_activities: prepare_catalog 결과 (변경되지 않음)
+        - solver: 일정 최적화 방식 (None이면 엔진 기본값)
         
         Returns:
         - Route: 생성된 루트 객체
         """
+        solver = self._resolve_solver(solver)
+        route = self.new_route(preference)
+        route.ai_model = AI_MODELS[solver]
+        with self._route_trace("build_route", route):
+            for _ in self._iter_days(preference, route, all_activities, solver):
+                pass
+        return route
+    
+    def _resolve_solver(self, solver: Optional[str] = None) -> str:
+        """요청별 solver (None이면 엔진 기본값)"""
+        solver = self.solver if solver is None else solver
+        if solver not in AI_MODELS:
+            raise ValueError(f"지원하지 않는 solver: {solver}")
+        return solver
+    
+    @staticmethod
+    def _route_variant(solver: str, personal: Optional[tuple] = None) -> tuple:
+        """루트 결과 캐시 variant (solver + 개인화시 선호 벡터 digest)"""
+        return (solver,) if personal is None else (solver, personal[1])
+    
+    def _cached_route(self, preference: RoutePreference, catalog_version: str,
+                      solver: str, personal: Optional[tuple] = None) -> Optional[Route]:
+        """
+        사전 생성 템플릿 -> 루트 결과 캐시 순으로 조회 (없으면 None)
         
-        # 1. 테마에 맞는 활동 가져오기
-        all_activities = self.db.fetch_activities_by_theme(
-            preference.theme_id, 
-            preference.transport_mode
-        )
-        
-        if not all_activities:
-            raise Exception("조건에 맞는 활동을 찾을 수 없습니다.")
-        
-        # 2. 매칭 점수 계산 (테마 카테고리는 별도 조회 필요)
-        # 간단히 하기 위해 모든 활동의 카테고리를 사용
-        all_categories = list(set(cat for act in all_activities for cat in act.categories))
+        catalog_version은 개인화 전 카탈로그 버전이다. 템플릿은 개인화 없이 만든 것이므로
+        개인화 요청(personal)에는 쓰지 않는다.
+        """
+        route = None
+        if self.route_templates is not None and personal is None:
+            route = self.route_templates.get(preference, catalog_version)
+            if route is not None:
+                current_trace().count("route_template_hits")
+        elif self.route_templates is not None:
+            current_trace().count("route_template_skips_personalized")
+        if route is None and self.route_cache is not None:
+            route = self.route_cache.get(preference, catalog_version,
+                                         self._route_variant(solver, personal))
+        return route
+    
+    def prewarm_templates(self, signatures: List[dict], store: RouteTemplateStore,
+                          reference_date: Optional[datetime.date] = None,
+                          solver: Optional[str] = None) -> int:
+        """
+        자주 요청되는 signature의 루트를 미리 생성해 템플릿으로 저장 (야간 배치 작업용)
         
-        for activity in all_activities:
-            activity.priority_score = self.calculate_match_score(activity, all_categories)
+        이 엔진의 설정(solver, solver_budget_ms, beam_width, local_search_budget_ms 등)으로
+        생성하므로, 배치용 엔진은 가장 비싼 최적화 설정으로 만든다.
         
-        # 3. 점수순 정렬
-        all_activities.sort(key=lambda a: a.priority_score, reverse=True)
+        Parameters:
+        - signatures: DatabaseConnector.fetch_popular_signatures() 결과
+        - store: 템플릿을 저장할 RouteTemplateStore
+        - reference_date: 템플릿 시작일 (없으면 오늘, 사용할 때 요청 날짜로 옮겨진다)
+        - solver: 일정 최적화 방식 (None이면 엔진 기본값)
         
-        # 4. 여행 일수 계산
+        Returns:
+        - int: 생성한 템플릿 수 (카탈로그가 비어 실패한 signature는 제외)
+        """
+        start = reference_date or datetime.date.today()
+        created = 0
+        for signature in signatures:
+            preference = RoutePreference(
+                start_date=start,
+                end_date=start + datetime.timedelta(days=signature["num_days"] - 1),
+                theme_id=signature["theme_id"],
+                schedule_type=signature["schedule_type"],
+                transport_mode=signature["transport_mode"],
+            )
+            try:
+                catalog, _ = self.prepared_catalog(preference.theme_id, preference.transport_mode)
+                route = self.build_route(preference, catalog, solver)
+            except Exception as e:
+                logger.warning("루트 템플릿 생성 실패 %s: %s", route_signature(preference), e)
+                continue
+            store.put(preference, catalog.fingerprint(), route, signature.get("demand", 0))
+            created += 1
+        return created
+    
+    def _daily_solver(self, solver: str):
+        """solver 이름 -> 하루 일정 최적화 함수 (optimize_daily_route와 같은 인자)"""
+        if solver == "beam":
+            return self.solve_daily_orienteering
+        return self.optimize_daily_route
+    
+    def new_route(self, preference: RoutePreference) -> Route:
+        """일정이 비어 있는 루트 객체 생성"""
         num_days = (preference.end_date - preference.start_date).days + 1
-        
-        # 5. 하루 방문 수 계산
-        activities_per_day = max(3, min(5, len(all_activities) // num_days))
-        
-        # 6. 루트 객체 생성
-        route = Route(
+        return Route(
             preference_id=preference.preference_id,
             route_name=f"{preference.start_date} ~ {preference.end_date} 여행",
             route_description=f"{num_days}일간의 맞춤형 여행 일정",
             difficulty_level="easy" if preference.schedule_type == "relaxed" else "moderate"
         )
+    
+    def _iter_days(self, preference: RoutePreference, route: Route, all_activities: ActivityTable,
+                   solver: str = "greedy"):
+        """build_route / iter_route_days 공통: 날짜별 최적화 후 일정 반환"""
+        # 4. 여행 일수 계산
+        num_days = (preference.end_date - preference.start_date).days + 1
+        
+        # 5. 하루 방문 수 계산
+        activities_per_day = max(3, min(5, len(all_activities) // num_days))
+        
+        # 6. 루트 총 비용 초기화
+        route.total_estimated_cost = 0.0
+        trace = current_trace()
+        
+        # 7. 거리 행렬 1회 계산 (일별 최적화는 인덱스 조회만 수행)
+        with trace.phase("index_build"):
+            distance_matrix = self.build_distance_matrix(all_activities)
+            location_ids = all_activities.location_id
+            spatial_index = None
+            if self.candidate_mode == "spatial":
+                spatial_index = SpatialGridIndex(
+                    all_activities.lat, all_activities.lon,
+                    cell_km=self.candidate_radius_km(preference.transport_mode)
+                )
         
-        # 7. 각 날짜별 일정 생성
+        # 8. 지역 분할 (날짜별 후보 그룹, 사용 안 하면 None)
+        day_groups = None
+        if self.day_clustering != "none":
+            with trace.phase("day_clustering"):
+                day_groups = cluster_day_groups(
+                    all_activities.lat, all_activities.lon, num_days,
+                    method=self.day_clustering, scores=all_activities.score
+                )
+        
+        # 9. 각 날짜별 일정 생성
+        optimize = self._daily_solver(solver)
         used_activities = set()
         total_route_cost = 0.0
         
-        for day in range(num_days):
-            current_date = preference.start_date + datetime.timedelta(days=day)
-            
-            available = [a for a in all_activities if a.location_id not in used_activities]
-            
-            if not available:
-                available = all_activities.copy()
-                used_activities.clear()
-            
-            # 하루 일정 최적화
-            daily_activities, distance, cost = self.optimize_daily_route(
-                available,
+        # 날짜별 후보가 서로 겹치지 않으면 전체 날짜를 프로세스 풀에서 동시에 최적화
+        # (각 날짜의 후보가 앞 날짜 결과와 무관하므로 순차 실행과 결과가 같다)
+        parallel = None
+        if self.day_workers > 1 and self._independent_days(day_groups, location_ids, num_days):
+            parallel = self._submit_days(preference, all_activities, day_groups[:num_days],
+                                         solver, activities_per_day)
+        
+        try:
+            for day in range(num_days):
+                current_date = preference.start_date + datetime.timedelta(days=day)
+                
+                if parallel is not None:
+                    with trace.phase("optimize"):
+                        daily_activities, distance, cost, initial_distance, counters = \
+                            parallel[1][day].result()
+                    for name, value in counters.items():
+                        trace.count(name, value)
+                else:
+                    unused = ~np.isin(location_ids, list(used_activities))
+                    available = np.empty(0, dtype=np.intp)
+                    if day_groups is not None and day < len(day_groups):
+                        group = day_groups[day]
+                        available = group[unused[group]]
+                    if available.size == 0:
+                        available = np.flatnonzero(unused)
+                    
+                    if available.size == 0:
+                        available = np.arange(len(all_activities))
+                        used_activities.clear()
+                        if spatial_index is not None:
+                            spatial_index.restore_all()
+                    
+                    daily_activities, distance, cost, initial_distance = self._optimize_day(
+                        optimize, all_activities, preference, day, available, activities_per_day,
+                        distance_matrix, spatial_index
+                    )
+                trace.count("days")
+                
+                if daily_activities:
+                    for act in daily_activities:
+                        if act.location_id:
+                            used_activities.add(act.location_id)
+                    
+                    # 사용된 장소는 공간 인덱스에서 삭제해 이후 날짜 탐색에서 제외
+                    if spatial_index is not None:
+                        spatial_index.remove(np.isin(location_ids, list(used_activities)))
+                    
+                    daily = DailyItinerary(
+                        route_id=route.route_id,
+                        day_number=day + 1,
+                        day_date=current_date,
+                        day_description=f"Day {day + 1}: {len(daily_activities)}개 장소 방문",
+                        activities=daily_activities,
+                        total_distance=round(distance, 2),
+                        total_estimated_cost=round(cost, 2),
+                        initial_distance=round(initial_distance, 2) if initial_distance is not None else None
+                    )
+                    
+                    route.itinerary.append(daily)
+                    total_route_cost += cost
+                    route.total_estimated_cost = round(total_route_cost, 2)
+                    yield daily
+        finally:
+            if parallel is not None:
+                shared, futures = parallel
+                for future in futures:
+                    future.cancel()
+                shared.close()
+        
+        if self.local_search_budget_ms > 0:
+            logger.info(
+                "루트 지역 탐색 결과: %.2fkm -> %.2fkm",
+                sum(d.initial_distance or 0.0 for d in route.itinerary),
+                sum(d.total_distance for d in route.itinerary)
+            )
+    
+    def _optimize_day(self, optimize, all_activities: ActivityTable, preference: RoutePreference,
+                      day: int, available: np.ndarray, activities_per_day: int,
+                      distance_matrix: DistanceMatrix,
+                      spatial_index: Optional[SpatialGridIndex]) -> tuple:
+        """
+        하루 일정 최적화 + 지역 탐색 (순차 실행과 날짜 병렬 워커 공통)
+        
+        Returns:
+        - (activities, distance, cost, initial_distance): initial_distance는 지역 탐색을
+          적용했을 때만 값이 있다
+        """
+        trace = current_trace()
+        with trace.phase("optimize"):
+            daily_activities, distance, cost = optimize(
+                all_activities,
                 start_time=9,
                 max_hours=12,
                 target_count=activities_per_day,
-                schedule_type=preference.schedule_type
+                schedule_type=preference.schedule_type,
+                distance_matrix=distance_matrix,
+                candidate_indices=available,
+                spatial_index=spatial_index,
+                transport_mode=preference.transport_mode
             )
-            
-            if daily_activities:
-                for act in daily_activities:
-                    if act.location_id:
-                        used_activities.add(act.location_id)
-                
-                daily = DailyItinerary(
-                    route_id=route.route_id,
-                    day_number=day + 1,
-                    day_date=current_date,
-                    day_description=f"Day {day + 1}: {len(daily_activities)}개 장소 방문",
-                    activities=daily_activities,
-                    total_distance=round(distance, 2),
-                    total_estimated_cost=round(cost, 2)
+        
+        initial_distance = None
+        if daily_activities and self.local_search_budget_ms > 0:
+            with trace.phase("local_search"):
+                daily_activities, initial_distance, distance = self.improve_daily_route(
+                    daily_activities,
+                    start_time=9,
+                    schedule_type=preference.schedule_type,
+                    transport_mode=preference.transport_mode
                 )
-                
-                route.itinerary.append(daily)
-                total_route_cost += cost
+            logger.info(
+                "Day %d 지역 탐색: %.2fkm -> %.2fkm",
+                day + 1, initial_distance, distance
+            )
+        return daily_activities, distance, cost, initial_distance
+    
+    @staticmethod
+    def _independent_days(day_groups: Optional[List[np.ndarray]], location_ids: np.ndarray,
+                          num_days: int) -> bool:
+        """
+        날짜별 후보 그룹이 서로 겹치지 않아 날짜 순서와 무관하게 최적화할 수 있는지
+        
+        그룹이 비었거나 같은 장소가 여러 그룹에 있으면 앞 날짜 결과에 따라 후보가 바뀌므로 False
+        """
+        if day_groups is None or len(day_groups) < num_days:
+            return False
+        groups = day_groups[:num_days]
+        if any(group.size == 0 for group in groups):
+            return False
+        ids = location_ids[np.concatenate(groups)]
+        ids = ids[ids > 0]  # location_id가 없는 행은 사용 장소로 기록되지 않음
+        return np.unique(ids).size == ids.size
+    
+    def _submit_days(self, preference: RoutePreference, all_activities: ActivityTable,
+                     day_groups: List[np.ndarray], solver: str, activities_per_day: int) -> tuple:
+        """
+        전체 날짜 최적화를 프로세스 풀에 제출
         
-        route.total_estimated_cost = round(total_route_cost, 2)
+        카탈로그 배열은 공유 메모리로 한 번만 올리고, 각 작업에는 그날 후보의 Activity 행만 보낸다.
         
-        return route
+        Returns:
+        - (SharedActivityTable, futures): futures는 날짜 순서, 다 쓰면 SharedActivityTable.close()
+        """
+        if self._day_pool is None:
+            self._day_pool = ProcessPoolExecutor(max_workers=self.day_workers)
+        
+        shared = SharedActivityTable(all_activities)
+        settings = self._engine_settings()
+        try:
+            futures = [
+                self._day_pool.submit(
+                    _optimize_day_worker, settings, shared.handle,
+                    {int(i): all_activities.rows[i] for i in group},
+                    preference, day, group, solver, activities_per_day
+                )
+                for day, group in enumerate(day_groups)
+            ]
+        except BaseException:
+            shared.close()
+            raise
+        return shared, futures
+
+
+def _build_route_worker(settings: dict, preference: RoutePreference,
+                        catalog: ActivityTable, solver: Optional[str] = None) -> Route:
+    """generate_routes 프로세스 풀 작업 (DB 연결 없이 최적화만 수행)"""
+    # 이미 프로세스 풀 안이므로 날짜별 병렬화는 하지 않는다
+    system = TravelRecommendationSystem(None, **{**settings, "day_workers": 0})
+    return system.build_route(preference, catalog, solver)
+
+
+def _optimize_day_worker(settings: dict, handle: dict, rows: dict, preference: RoutePreference,
+                         day: int, available: np.ndarray, solver: str,
+                         activities_per_day: int) -> tuple:
+    """
+    날짜별 병렬 최적화 프로세스 풀 작업 (공유 메모리 카탈로그로 하루 일정 최적화)
+    
+    공유 카탈로그는 작업마다 열고 끝나면 바로 닫는다. 워커 프로세스는 루트가 끝난 뒤에도
+    살아 있으므로 매핑을 남겨 두면 부모가 unlink한 블록과 거리 행렬 캐시가 계속 메모리에 남는다.
+    (거리 행렬은 방문한 행만 계산하고 날짜별 후보는 서로 겹치지 않아 재사용 이득도 거의 없다)
+    """
+    system = TravelRecommendationSystem(None, **{**settings, "day_workers": 0})
+    shm, table = SharedActivityTable.attach(handle, rows)
+    trace = RouteTrace("optimize_day")
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        spatial_index = SpatialGridIndex(
+            table.lat, table.lon, cell_km=system.candidate_radius_km(preference.transport_mode)
+        ) if system.candidate_mode == "spatial" else None
+        result = system._optimize_day(
+            system._daily_solver(solver), table, preference, day, available, activities_per_day,
+            system.build_distance_matrix(table), spatial_index
+        )
+    finally:
+        _CURRENT_TRACE.reset(token)
+        # 공유 메모리를 가리키는 배열을 먼저 놓아야 close()가 BufferError 없이 매핑을 해제한다
+        table = spatial_index = None
+        shm.close()
+    return (*result, trace.counters)
 
 
 # ==================== 사용 예시 ====================
@@ -0,0 +1,259 @@
+"""
+카탈로그(관광지) API 공용 비동기 클라이언트
+
+연결 풀, 동시 요청 수 제한, 재시도/헤징, 페이지네이션을 담당한다.
+DatabaseConnector가 API 방식 테마 카탈로그를 조회할 때 사용한다.
+"""
+
+import asyncio
+import os
+import random
+import threading
+from typing import List, Optional
+
+from route_metrics import METRICS, MetricsRegistry
+
+
+# ==================== 카탈로그 API 클라이언트 ====================
+
+# 팀 자체 백엔드 API 주소/토큰 (환경 변수로 변경)
+CATALOG_API_URL = os.getenv("CATALOG_API_URL", "http://your-backend-api.com")
+CATALOG_API_TOKEN = os.getenv("CATALOG_API_TOKEN", "YOUR_API_TOKEN")
+
+
+class CatalogApiError(Exception):
+    """카탈로그 API 호출 실패 (재시도 후에도 실패했거나 재시도 대상이 아닌 오류)"""
+
+
+class _RetryableApiError(Exception):
+    """재시도할 수 있는 오류 (연결 오류, 시간 초과, 429/5xx)"""
+
+
+class CatalogApiClient:
+    """
+    카탈로그(관광지) API 공용 비동기 클라이언트 (httpx)
+    
+    - 연결 풀/keep-alive: 프로세스 안의 DatabaseConnector들이 같은 클라이언트를 공유
+    - 동시 요청 수 제한: max_concurrency
+    - 재시도: 연결 오류/시간 초과/429/5xx는 지수 백오프(+jitter)로 retries회까지
+    - 제한 시간: 시도별 attempt_timeout, 페이지 전체 조회 total_timeout
+    - 헤징: hedge_after초 안에 응답이 없으면 같은 요청을 하나 더 보내 먼저 온 응답 사용
+    - 페이지네이션: offset/limit으로 page_size씩 조회 (응답에 total이 있으면 나머지를 동시에)
+    
+    I/O는 모두 클라이언트 전용 이벤트 루프 스레드에서 실행되므로 동기 코드(fetch_locations)와
+    비동기 코드(afetch_locations) 어디서든 같은 연결 풀을 쓴다. 테스트에서는 base_url을 로컬
+    스텁 서버로 주거나 transport=httpx.MockTransport(...)를 넘긴다.
+    """
+    
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    
+    def __init__(self,
+                 base_url: str = CATALOG_API_URL,
+                 path: str = "/api/locations",
+                 token: Optional[str] = CATALOG_API_TOKEN,
+                 page_size: int = 100,
+                 max_pages: int = 100,
+                 max_connections: int = 20,
+                 max_concurrency: int = 8,
+                 attempt_timeout: float = 3.0,
+                 total_timeout: float = 10.0,
+                 retries: int = 3,
+                 backoff_base: float = 0.2,
+                 backoff_max: float = 2.0,
+                 hedge_after: Optional[float] = None,
+                 transport=None,
+                 metrics: Optional[MetricsRegistry] = None):
+        self.base_url = base_url
+        self.path = path
+        self.token = token
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.attempt_timeout = attempt_timeout
+        self.total_timeout = total_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.transport = transport
+        self.metrics = metrics if metrics is not None else METRICS
+        
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+    
+    def fetch_locations(self, params: dict) -> List[dict]:
+        """
+        전체 페이지 조회 (동기, 호출 스레드는 결과를 기다리기만 함)
+        
+        Parameters:
+        - params: 쿼리 파라미터 (offset/limit은 클라이언트가 채움)
+        
+        Returns:
+        - List[dict]: 모든 페이지의 data 항목
+        """
+        future = asyncio.run_coroutine_threadsafe(self._fetch_with_deadline(params), self._ensure_loop())
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+    
+    async def afetch_locations(self, params: dict) -> List[dict]:
+        """fetch_locations의 비동기 버전 (FastAPI 핸들러 등에서 사용)"""
+        future = asyncio.run_coroutine_threadsafe(self._fetch_with_deadline(params), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+    
+    def close(self):
+        """연결 풀과 이벤트 루프 종료"""
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = self._semaphore = None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+    
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """전용 이벤트 루프 스레드 시작 (최초 1회)"""
+        with self._lock:
+            if self._loop is None:
+                import httpx
+                
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="catalog-api-loop", daemon=True).start()
+                headers = {"Content-Type": "application/json"}
+                if self.token:
+                    headers["Authorization"] = f"Bearer {self.token}"
+                
+                async def create():
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    return httpx.AsyncClient(
+                        base_url=self.base_url,
+                        headers=headers,
+                        timeout=self.attempt_timeout,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_connections),
+                        transport=self.transport,
+                    )
+                
+                self._client = asyncio.run_coroutine_threadsafe(create(), loop).result()
+                self._loop = loop
+            return self._loop
+    
+    async def _fetch_with_deadline(self, params: dict) -> List[dict]:
+        try:
+            return await asyncio.wait_for(self._fetch_all(params), self.total_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.increment("catalog_api_failures")
+            raise CatalogApiError(f"카탈로그 API 제한 시간 초과 ({self.total_timeout}s)")
+    
+    async def _fetch_all(self, params: dict) -> List[dict]:
+        """페이지 전체 조회"""
+        first = await self._get_page(params, 0)
+        items = list(first.get("data") or [])
+        
+        total = first.get("total")
+        if isinstance(total, int) and total > len(items):
+            # 전체 개수를 알면 나머지 페이지를 동시에 (동시 요청 수는 semaphore로 제한)
+            last = min(total, self.page_size * self.max_pages)
+            pages = await asyncio.gather(*(
+                self._get_page(params, offset) for offset in range(self.page_size, last, self.page_size)
+            ))
+            for page in pages:
+                items.extend(page.get("data") or [])
+            return items
+        
+        # 전체 개수를 모르면 꽉 찬 페이지가 오는 동안 순서대로
+        page, count = first, 1
+        while len(page.get("data") or []) >= self.page_size and count < self.max_pages:
+            page = await self._get_page(params, len(items))
+            items.extend(page.get("data") or [])
+            count += 1
+        return items
+    
+    async def _get_page(self, params: dict, offset: int) -> dict:
+        """한 페이지 조회 (재시도 포함)"""
+        params = {**params, "offset": offset, "limit": self.page_size}
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.metrics.increment("catalog_api_retries")
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                data = await self._hedged(params)
+            except _RetryableApiError as e:
+                error = e
+                continue
+            if not data.get("success"):
+                raise CatalogApiError(f"카탈로그 API 오류 응답: {data.get('message')}")
+            return data
+        
+        self.metrics.increment("catalog_api_failures")
+        raise CatalogApiError(f"카탈로그 API 호출 실패 ({self.retries + 1}회 시도): {error}")
+    
+    async def _hedged(self, params: dict) -> dict:
+        """hedge_after초 안에 응답이 없으면 같은 요청을 하나 더 보내 먼저 성공한 응답 사용"""
+        if not self.hedge_after:
+            return await self._attempt(params)
+        
+        first = asyncio.ensure_future(self._attempt(params))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+        if done:
+            return first.result()
+        
+        self.metrics.increment("catalog_api_hedges")
+        pending = {first, asyncio.ensure_future(self._attempt(params))}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+    
+    async def _attempt(self, params: dict) -> dict:
+        """요청 1회 (attempt_timeout 제한)"""
+        import httpx
+        
+        self.metrics.increment("catalog_api_requests")
+        try:
+            async with self._semaphore:
+                response = await asyncio.wait_for(
+                    self._client.get(self.path, params=params), self.attempt_timeout
+                )
+        except (httpx.TransportError, asyncio.TimeoutError) as e:
+            raise _RetryableApiError(f"{type(e).__name__}: {e}")
+        
+        if response.status_code in self.RETRY_STATUS:
+            raise _RetryableApiError(f"HTTP {response.status_code}")
+        if response.is_error:
+            raise CatalogApiError(f"HTTP {response.status_code}: {response.text[:200]}")
+        # 프록시/게이트웨이의 HTML 오류 페이지, 끊긴 본문 등은 일시적 오류로 보고 재시도
+        try:
+            data = response.json()
+        except ValueError:
+            raise _RetryableApiError(f"JSON이 아닌 응답: {response.text[:200]!r}")
+        if not isinstance(data, dict):
+            raise CatalogApiError(f"예상하지 못한 응답 형식: {response.text[:200]}")
+        return data
+
+
+_default_catalog_client = None
+_default_catalog_client_lock = threading.Lock()
+
+
+def default_catalog_client() -> CatalogApiClient:
+    """프로세스 공용 카탈로그 API 클라이언트 (최초 호출시 생성)"""
+    global _default_catalog_client
+    with _default_catalog_client_lock:
+        if _default_catalog_client is None:
+            _default_catalog_client = CatalogApiClient()
+        return _default_catalog_client
@@ -0,0 +1,346 @@
+"""
+카탈로그 바이너리 스냅샷
+
+버전별 .npy 컬럼 파일 + 문자열 테이블 + manifest(테마 규칙 포함)로 기록하고,
+읽을 때는 메모리 매핑해 ActivityTable을 바로 만든다 (catalog_snapshot_export.py로 생성).
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from route_models import Activity, ActivityTable
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== 카탈로그 바이너리 스냅샷 ====================
+
+CATALOG_SNAPSHOT_FORMAT = 2  # 2: manifest에 테마 규칙(themes) 포함
+
+# 스냅샷 컬럼 (파일 이름 = 컬럼 이름 + ".npy")
+CATALOG_SNAPSHOT_COLUMNS = (
+    "location_id", "lat", "lon", "duration_hours", "cost", "popularity",
+    "category_id", "name", "address",
+    "category_codes", "category_offsets", "category_bits",
+    "strings", "string_offsets",
+)
+
+
+class CatalogSnapshot:
+    """
+    루트 엔진용 카탈로그 컬럼형 스냅샷 (버전별 디렉터리의 .npy 파일 + 문자열 테이블)
+    
+    디렉터리 구조:
+        <directory>/CURRENT               현재 버전 이름
+        <directory>/<version>/manifest.json
+        <directory>/<version>/<컬럼>.npy
+    
+    open()은 모든 컬럼을 np.load(mmap_mode="r")로 매핑만 하므로 시작 시간이 카탈로그
+    크기와 거의 무관하고, 같은 파일을 여는 워커 프로세스들은 OS 페이지 캐시의 한 사본을
+    공유한다. 문자열(이름/주소/카테고리/태그)은 UTF-8 바이트 배열 + 오프셋으로 저장하고
+    일정에 선택된 행만 Activity로 만들 때 디코딩한다.
+    
+    카테고리 CSR에는 장소 카테고리(location_categories)와 태그(location_tag_map)가 함께
+    들어가므로, 테마 가중치(theme_category_weights)에 태그 이름도 쓸 수 있다.
+    
+    스냅샷은 전체 카탈로그이므로 테마 규칙(trip_theme_categories/trip_theme_tags)을 이름 기준으로
+    manifest에 함께 기록하고, theme_rows()가 ThemeLocationIndex와 같은 규칙으로 테마 후보를 고른다.
+    """
+    
+    def __init__(self, path, manifest: dict, columns: dict):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.columns = columns
+        self._strings = bytes(columns["strings"])
+        self._string_offsets = columns["string_offsets"]
+        self.category_names = [self.string(i) for i in manifest["category_name_ids"]]
+        # theme_id -> {"categories": {이름: 가중치}, "tags": {이름: [가중치, 필수]}}
+        self.themes = {int(theme_id): rule for theme_id, rule in manifest.get("themes", {}).items()}
+        self._table = None
+        self._theme_rows = {}
+    
+    def __len__(self) -> int:
+        return self.columns["location_id"].size
+    
+    def __reduce__(self):
+        # 프로세스 풀로 넘길 때는 경로만 보내고 받는 쪽에서 다시 매핑한다
+        return (CatalogSnapshot.open_version, (str(self.path),))
+    
+    @classmethod
+    def open(cls, directory: str = "cache/catalog_snapshot") -> "CatalogSnapshot":
+        """
+        현재 버전 스냅샷 매핑
+        
+        Parameters:
+        - directory: 스냅샷 루트 디렉터리
+        
+        Returns:
+        - CatalogSnapshot: 스냅샷 (없거나 형식이 다르면 예외 발생)
+        """
+        directory = Path(directory)
+        version = (directory / "CURRENT").read_text(encoding="utf-8").strip()
+        return cls.open_version(directory / version)
+    
+    @classmethod
+    def open_version(cls, path) -> "CatalogSnapshot":
+        """특정 버전 디렉터리 매핑"""
+        path = Path(path)
+        manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+        if manifest.get("format") != CATALOG_SNAPSHOT_FORMAT:
+            raise Exception(f"지원하지 않는 카탈로그 스냅샷 형식: {manifest.get('format')}")
+        columns = {
+            name: np.load(path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+            for name in CATALOG_SNAPSHOT_COLUMNS
+        }
+        return cls(path, manifest, columns)
+    
+    @classmethod
+    def write(cls, directory: str, locations: List[dict], tags: dict, keep: int = 3,
+              themes: Optional[dict] = None) -> "CatalogSnapshot":
+        """
+        카탈로그 스냅샷 기록 (새 버전 디렉터리 작성 후 CURRENT 교체)
+        
+        버전 이름은 내용 해시이므로 카탈로그가 바뀌지 않았으면 기존 버전을 그대로 쓴다.
+        이미 매핑 중인 프로세스가 있을 수 있으므로 이전 버전은 keep개까지 남겨 둔다.
+        
+        Parameters:
+        - directory: 스냅샷 루트 디렉터리
+        - locations: 장소 행 리스트 (location_id, name, address, latitude, longitude,
+            category_id, category_name, popularity_score, 선택: duration_minutes, cost)
+        - tags: location_id -> 태그 이름 리스트
+        - keep: 남겨 둘 버전 수
+        - themes: theme_id -> {"categories": {이름: 가중치}, "tags": {이름: (가중치, 필수)}}
+        
+        Returns:
+        - CatalogSnapshot: 기록한 스냅샷 (매핑된 상태)
+        """
+        n = len(locations)
+        string_ids = {}
+        
+        def intern(text) -> int:
+            return string_ids.setdefault(text or "", len(string_ids))
+        
+        category_code_of = {}
+        codes = []
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        for i, row in enumerate(locations):
+            names = [row["category_name"]] if row.get("category_name") else []
+            names += [tag for tag in tags.get(row["location_id"], []) if tag not in names]
+            for name in names:
+                codes.append(category_code_of.setdefault(name, len(category_code_of)))
+            offsets[i + 1] = len(codes)
+        category_codes = np.asarray(codes, dtype=np.int32)
+        
+        columns = {
+            "location_id": np.fromiter((row["location_id"] for row in locations), dtype=np.int64, count=n),
+            "lat": np.fromiter((float(row["latitude"]) for row in locations), dtype=np.float64, count=n),
+            "lon": np.fromiter((float(row["longitude"]) for row in locations), dtype=np.float64, count=n),
+            "duration_hours": np.fromiter((row.get("duration_minutes") or 120 for row in locations),
+                                          dtype=np.float64, count=n) / 60,
+            "cost": np.fromiter((float(row.get("cost") or 0) for row in locations), dtype=np.float64, count=n),
+            "popularity": np.fromiter((row.get("popularity_score", 0.0) for row in locations),
+                                      dtype=np.float64, count=n),
+            "category_id": np.fromiter((row.get("category_id") or -1 for row in locations),
+                                       dtype=np.int64, count=n),
+            "name": np.fromiter((intern(row.get("name")) for row in locations), dtype=np.int32, count=n),
+            "address": np.fromiter((intern(row.get("address")) for row in locations), dtype=np.int32, count=n),
+            "category_codes": category_codes,
+            "category_offsets": offsets,
+            "category_bits": ActivityTable._category_bits(category_codes, offsets, len(category_code_of)),
+        }
+        category_name_ids = [intern(name) for name in category_code_of]
+        
+        encoded = [text.encode("utf-8") for text in string_ids]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=string_offsets[1:])
+        columns["strings"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        columns["string_offsets"] = string_offsets
+        
+        themes = {
+            str(theme_id): {
+                "categories": {name: float(w) for name, w in rule.get("categories", {}).items()},
+                "tags": {name: [float(w), bool(req)] for name, (w, req) in rule.get("tags", {}).items()},
+            }
+            for theme_id, rule in (themes or {}).items()
+        }
+        
+        digest = hashlib.sha1()
+        for name in CATALOG_SNAPSHOT_COLUMNS:
+            digest.update(name.encode("utf-8"))
+            digest.update(np.ascontiguousarray(columns[name]).tobytes())
+        digest.update(json.dumps(themes, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        version = digest.hexdigest()[:16]
+        
+        directory = Path(directory)
+        path = directory / version
+        if not (path / "manifest.json").exists():
+            tmp = directory / f".{version}.{os.getpid()}.tmp"
+            tmp.mkdir(parents=True, exist_ok=True)
+            for name in CATALOG_SNAPSHOT_COLUMNS:
+                np.save(tmp / f"{name}.npy", columns[name], allow_pickle=False)
+            manifest = {
+                "format": CATALOG_SNAPSHOT_FORMAT,
+                "version": version,
+                "rows": n,
+                "category_name_ids": category_name_ids,
+                "themes": themes,
+                "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            (tmp / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                # 다른 프로세스가 같은 버전을 먼저 기록함
+                for child in tmp.iterdir():
+                    child.unlink()
+                tmp.rmdir()
+        
+        current = directory / "CURRENT.tmp"
+        current.write_text(version, encoding="utf-8")
+        os.replace(current, directory / "CURRENT")
+        cls._prune(directory, version, keep)
+        return cls.open_version(path)
+    
+    @staticmethod
+    def _prune(directory: Path, current: str, keep: int):
+        """오래된 버전 삭제 (현재 버전 포함 keep개 유지)"""
+        versions = sorted(
+            (p for p in directory.iterdir() if p.is_dir() and (p / "manifest.json").exists()
+             and p.name != current),
+            key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        for path in versions[max(0, keep - 1):]:
+            try:
+                for child in path.iterdir():
+                    child.unlink()
+                path.rmdir()
+            except OSError as e:
+                logger.warning("카탈로그 스냅샷 정리 실패 %s: %s", path, e)
+    
+    def string(self, i: int) -> str:
+        """문자열 테이블 i번 항목"""
+        start, end = self._string_offsets[i], self._string_offsets[i + 1]
+        return self._strings[start:end].decode("utf-8")
+    
+    def categories(self, i: int) -> List[str]:
+        """i번 장소의 카테고리 + 태그 이름"""
+        offsets = self.columns["category_offsets"]
+        codes = self.columns["category_codes"][offsets[i]:offsets[i + 1]]
+        return [self.category_names[c] for c in codes]
+    
+    def activity(self, i: int) -> Activity:
+        """i번 장소 -> Activity (카탈로그 단계, 일정 정보 없음)"""
+        columns = self.columns
+        name = self.string(columns["name"][i]) or None
+        category_id = int(columns["category_id"][i])
+        cost = float(columns["cost"][i])
+        return Activity(
+            location_id=int(columns["location_id"][i]),
+            activity_name=name or "",
+            lat=float(columns["lat"][i]),
+            lon=float(columns["lon"][i]),
+            location_name=name,
+            location_address=self.string(columns["address"][i]) or None,
+            estimated_duration_minutes=int(round(columns["duration_hours"][i] * 60)),
+            estimated_cost=cost if cost else None,
+            activity_category_id=category_id if category_id >= 0 else None,
+            popularity_score=float(columns["popularity"][i]),
+            categories=self.categories(i),
+        )
+    
+    def activities(self) -> List[Activity]:
+        """전체 카탈로그 -> Activity 리스트 (DatabaseConnector 호환용, 느림)"""
+        return [self.activity(i) for i in range(len(self))]
+    
+    def theme_rows(self, theme_id: int) -> Optional[np.ndarray]:
+        """
+        테마에 맞는 행 번호 (오름차순, 스냅샷에 테마 규칙이 없으면 None)
+        
+        ThemeLocationIndex.lookup과 같은 규칙:
+            (테마 카테고리 ∪ 선택 태그) ∩ 필수 태그들
+        """
+        rows = self._theme_rows.get(theme_id)
+        if rows is not None:
+            return rows
+        rule = self.themes.get(theme_id)
+        if rule is None:
+            return None
+        
+        table = self.table()
+        optional = list(rule["categories"])
+        optional += [name for name, (_, required) in rule["tags"].items() if not required]
+        required = [name for name, (_, req) in rule["tags"].items() if req]
+        
+        keep = None
+        if optional:
+            keep = (table.category_bits & table.category_mask(optional)).any(axis=1)
+        for name in required:
+            hit = (table.category_bits & table.category_mask([name])).any(axis=1)
+            keep = hit if keep is None else keep & hit
+        rows = np.flatnonzero(keep) if keep is not None else np.empty(0, dtype=np.intp)
+        rows.flags.writeable = False
+        self._theme_rows[theme_id] = rows
+        return rows
+    
+    def theme_weights(self, theme_id: int) -> Optional[dict]:
+        """테마 매칭 가중치 {카테고리/태그 이름: 가중치} (스냅샷에 테마 규칙이 없으면 None)"""
+        rule = self.themes.get(theme_id)
+        if rule is None:
+            return None
+        weights = dict(rule["categories"])
+        for name, (weight, _) in rule["tags"].items():
+            weights[name] = max(weights.get(name, 0.0), weight)
+        return weights
+    
+    def table(self) -> ActivityTable:
+        """
+        전체 카탈로그 ActivityTable (배열은 매핑된 파일을 그대로 사용, 복사 없음)
+        
+        Activity 행은 materialize()로 선택될 때만 만든다.
+        """
+        if self._table is None:
+            columns = self.columns
+            n = len(self)
+            self._table = ActivityTable(
+                rows=SnapshotRows(self, np.arange(n)),
+                lat=columns["lat"],
+                lon=columns["lon"],
+                duration_hours=columns["duration_hours"],
+                cost=columns["cost"],
+                score=np.zeros(n, dtype=np.float64),
+                location_id=columns["location_id"],
+                category_codes=columns["category_codes"],
+                category_offsets=columns["category_offsets"],
+                category_names=self.category_names,
+                category_bits=columns["category_bits"],
+                popularity=columns["popularity"],
+            )
+        return self._table
+
+
+class SnapshotRows:
+    """ActivityTable.rows 대신 쓰는 지연 행 목록 (접근할 때 스냅샷에서 Activity 생성)"""
+    
+    def __init__(self, snapshot: CatalogSnapshot, index: np.ndarray):
+        self.snapshot = snapshot
+        self.index = index
+    
+    def __len__(self) -> int:
+        return self.index.size
+    
+    def __getitem__(self, i) -> Activity:
+        return self.snapshot.activity(int(self.index[i]))
+    
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+    
+    def take(self, indices) -> "SnapshotRows":
+        return SnapshotRows(self.snapshot, self.index[indices])
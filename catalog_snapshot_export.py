@@ -0,0 +1,49 @@
+"""
+루트 엔진용 카탈로그 스냅샷 내보내기
+
+locations + location_categories + location_tag_map (+ location_review_features)를
+버전별 .npy 컬럼 파일과 문자열 테이블로, 테마 규칙(trip_theme_categories/trip_theme_tags)은
+manifest에 기록한다. route_api는 CATALOG_SNAPSHOT_DIR의
+현재 버전을 시작할 때 메모리 매핑하므로, 카탈로그가 바뀔 때(또는 주기적으로) 실행한다.
+
+사용 예:
+    python catalog_snapshot_export.py --directory cache/catalog_snapshot --language en
+"""
+
+import argparse
+import os
+import time
+
+import pymysql
+
+from AP_algorithm import DatabaseConnector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카탈로그 스냅샷 내보내기")
+    parser.add_argument("--directory", default=os.getenv("CATALOG_SNAPSHOT_DIR", "cache/catalog_snapshot"))
+    parser.add_argument("--language", choices=["ko", "en"], default="en")
+    args = parser.parse_args()
+
+    conn = pymysql.connect(
+        host=os.getenv("DB_HOST", "localhost"),
+        user=os.getenv("DB_USER", "root"),
+        password=os.getenv("DB_PASSWORD", ""),
+        database=os.getenv("DB_NAME", "ktrip"),
+        charset="utf8mb4",
+        cursorclass=pymysql.cursors.DictCursor,
+    )
+    try:
+        t0 = time.perf_counter()
+        snapshot = DatabaseConnector(conn).export_catalog_snapshot(args.directory, args.language)
+        print(
+            f"스냅샷 저장: {snapshot.path} (version={snapshot.version}, rows={len(snapshot)}, "
+            f"categories={len(snapshot.category_names)}, themes={len(snapshot.themes)}, "
+            f"{time.perf_counter() - t0:.2f}s)"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+-- 기존 DB 마이그레이션 (ktrip_schema.sql로 새로 만든 DB에는 적용하지 않음)
+-- 위에서부터 순서대로 한 번씩 적용
+
+-- 1. 여행 지역 (route_preferences) ------------------------------------------
+-- 루트 저장/조회(_insert_route_headers, load_route)가 이 컬럼을 사용
+ALTER TABLE route_preferences
+    ADD COLUMN anchor_lat DECIMAL(10,7) DEFAULT NULL AFTER schedule_type,
+    ADD COLUMN anchor_lon DECIMAL(10,7) DEFAULT NULL AFTER anchor_lat,
+    ADD COLUMN radius_km DECIMAL(7,3) DEFAULT NULL AFTER anchor_lon,
+    ADD COLUMN bbox_min_lat DECIMAL(10,7) DEFAULT NULL AFTER radius_km,
+    ADD COLUMN bbox_min_lon DECIMAL(10,7) DEFAULT NULL AFTER bbox_min_lat,
+    ADD COLUMN bbox_max_lat DECIMAL(10,7) DEFAULT NULL AFTER bbox_min_lon,
+    ADD COLUMN bbox_max_lon DECIMAL(10,7) DEFAULT NULL AFTER bbox_max_lat;
+
+-- 2. locations.coordinates SRID 4326 ----------------------------------------
+-- SRID가 없는 컬럼의 SPATIAL INDEX는 MySQL 8 옵티마이저가 사용하지 않는다.
+-- 저장된 값은 POINT(경도, 위도)이고 ST_SRID(g, 4326)는 좌표를 바꾸지 않고 SRID만 붙인다.
+-- 이후 locations INSERT는 ST_SRID(POINT(경도, 위도), 4326) 사용
+ALTER TABLE locations DROP INDEX idx_coordinates;
+UPDATE locations SET coordinates = ST_SRID(coordinates, 4326);
+ALTER TABLE locations MODIFY coordinates POINT NOT NULL SRID 4326;
+ALTER TABLE locations ADD SPATIAL INDEX idx_coordinates (coordinates);
+
+-- 3. review_likes.updated_at ------------------------------------------------
+-- 좋아요 취소(is_deleted = TRUE)도 리뷰 특징 증분 갱신(refresh_location_features) 대상이 되도록
+-- 기존 행은 liked_at으로 채운다 (컬럼을 직접 지정한 UPDATE는 ON UPDATE가 적용되지 않음)
+ALTER TABLE review_likes
+    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP AFTER is_deleted;
+UPDATE review_likes SET updated_at = liked_at;
+CREATE INDEX idx_review_likes_updated ON review_likes(updated_at);
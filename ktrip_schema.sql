@@ -224,7 +224,8 @@ CREATE TABLE locations (
     -- 좌표
     latitude     DECIMAL(10,7) NOT NULL,
     longitude    DECIMAL(10,7) NOT NULL,
-    coordinates  POINT NOT NULL,
+    -- POINT(경도, 위도), SRID 4326 (SRID가 없으면 MySQL 8이 공간 인덱스를 쓰지 않음)
+    coordinates  POINT NOT NULL SRID 4326,
     location_category_id INT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     SPATIAL INDEX idx_coordinates (coordinates),
@@ -353,6 +354,8 @@ CREATE TABLE review_likes (
     user_id BIGINT UNSIGNED NULL,
     liked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     is_deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    -- 좋아요/취소(is_deleted) 변경 시각 (루트 엔진 리뷰 특징 증분 갱신용)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
       FOREIGN KEY (review_id) REFERENCES reviews(review_id) ON DELETE SET NULL,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
     UNIQUE KEY unique_user_review_like (review_id, user_id),
@@ -402,6 +405,24 @@ CREATE TABLE review_translations (
     INDEX idx_trans_lang (language)
 );
 
+-- 루트 엔진용 장소별 리뷰/인기도 집계 (DatabaseConnector.refresh_location_features로 갱신)
+CREATE TABLE location_review_features (
+    location_id INT PRIMARY KEY,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum DECIMAL(12, 1) NOT NULL DEFAULT 0,
+    like_count INT NOT NULL DEFAULT 0,
+    external_rating DECIMAL(3, 2) NULL,
+    external_review_count INT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL,
+    FOREIGN KEY (location_id) REFERENCES locations(location_id) ON DELETE CASCADE,
+    INDEX idx_review_features_refreshed (refreshed_at)
+);
+
+-- 증분 갱신시 변경된 장소 탐색용
+CREATE INDEX idx_reviews_updated ON reviews(updated_at);
+CREATE INDEX idx_review_likes_updated ON review_likes(updated_at);
+CREATE INDEX idx_api_synced ON location_api_sources(synced_at);
+
 CREATE TABLE trip_themes (
     theme_id INT PRIMARY KEY AUTO_INCREMENT,
     theme_name VARCHAR(50) NOT NULL UNIQUE,
@@ -409,6 +430,46 @@ CREATE TABLE trip_themes (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 테마 -> 장소 카테고리/태그 매칭 규칙 (루트 엔진 테마 역색인, 매칭 가중치)
+-- 테마 후보 = (카테고리 ∪ 선택 태그) ∩ 필수 태그(is_required)
+CREATE TABLE trip_theme_categories (
+    theme_id INT NOT NULL,
+    category_id INT NOT NULL,
+    weight DECIMAL(4,2) NOT NULL DEFAULT 1.00,
+    PRIMARY KEY (theme_id, category_id),
+    FOREIGN KEY (theme_id) REFERENCES trip_themes(theme_id) ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES location_categories(category_id) ON DELETE CASCADE
+);
+
+CREATE TABLE trip_theme_tags (
+    theme_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    weight DECIMAL(4,2) NOT NULL DEFAULT 1.00,
+    is_required BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (theme_id, tag_id),
+    FOREIGN KEY (theme_id) REFERENCES trip_themes(theme_id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES location_tags(tag_id) ON DELETE CASCADE
+);
+
+-- 설문 선택지 -> 장소 카테고리/태그 선호 가중치 (사용자 선호 벡터 계산용, 음수 = 비선호)
+CREATE TABLE survey_option_categories (
+    option_id BIGINT UNSIGNED NOT NULL,
+    category_id INT NOT NULL,
+    weight DECIMAL(4,2) NOT NULL DEFAULT 1.00,
+    PRIMARY KEY (option_id, category_id),
+    FOREIGN KEY (option_id) REFERENCES survey_options(id) ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES location_categories(category_id) ON DELETE CASCADE
+);
+
+CREATE TABLE survey_option_tags (
+    option_id BIGINT UNSIGNED NOT NULL,
+    tag_id INT NOT NULL,
+    weight DECIMAL(4,2) NOT NULL DEFAULT 1.00,
+    PRIMARY KEY (option_id, tag_id),
+    FOREIGN KEY (option_id) REFERENCES survey_options(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES location_tags(tag_id) ON DELETE CASCADE
+);
+
 CREATE TABLE route_preferences (
     preference_id INT PRIMARY KEY AUTO_INCREMENT,
     user_id BIGINT UNSIGNED NOT NULL,
@@ -420,6 +481,14 @@ travelers_count SMALLINT UNSIGNED NOT NULL DEFAULT 1,
     end_date DATE NOT NULL,
     theme_id INT NOT NULL,
     schedule_type ENUM('relaxed', 'packed') NOT NULL,
+    -- 여행 지역 (선택): 기준점 + 반경 또는 경계 상자, 둘 다 없으면 테마 전체
+    anchor_lat DECIMAL(10,7) DEFAULT NULL,
+    anchor_lon DECIMAL(10,7) DEFAULT NULL,
+    radius_km DECIMAL(7,3) DEFAULT NULL,
+    bbox_min_lat DECIMAL(10,7) DEFAULT NULL,
+    bbox_min_lon DECIMAL(10,7) DEFAULT NULL,
+    bbox_max_lat DECIMAL(10,7) DEFAULT NULL,
+    bbox_max_lon DECIMAL(10,7) DEFAULT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (theme_id) REFERENCES trip_themes(theme_id)
@@ -509,14 +578,46 @@ CREATE TABLE route_ratings (
     UNIQUE KEY unique_rating (saved_route_id, user_id)
 );
 
+-- 사용자 선호 벡터 (설문 + 루트 평가에서 계산, 루트 개인화 점수용)
+-- 벡터 = int32 특징 코드 배열(카테고리 id*2, 태그 id*2+1) + float32 가중치 배열 (little endian)
+-- last_answer_id/last_rating_id 이후의 설문 변경/평가만 증분 반영
+CREATE TABLE user_preference_vectors (
+    user_id BIGINT UNSIGNED PRIMARY KEY,
+    survey_vector BLOB NOT NULL,
+    rating_vector BLOB NOT NULL,
+    last_answer_id BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    last_rating_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- 자주 요청되는 signature(테마/이동수단/일정 강도/일수)의 사전 생성 루트 (야간 배치)
+CREATE TABLE route_templates (
+    template_id INT PRIMARY KEY AUTO_INCREMENT,
+    theme_id INT NOT NULL,
+    transport_mode ENUM('walk', 'public', 'taxi', 'car') NOT NULL,
+    schedule_type ENUM('relaxed', 'packed') NOT NULL,
+    num_days SMALLINT UNSIGNED NOT NULL,
+    catalog_version VARCHAR(64) NOT NULL,
+    start_date DATE NOT NULL,
+    route_json JSON NOT NULL,
+    demand_count INT NOT NULL DEFAULT 0,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (theme_id) REFERENCES trip_themes(theme_id) ON DELETE CASCADE,
+    UNIQUE KEY uq_route_template (theme_id, transport_mode, schedule_type, num_days),
+    INDEX idx_route_templates_generated (generated_at)
+);
+
 CREATE INDEX idx_route_preferences_user ON route_preferences(user_id);
 CREATE INDEX idx_route_preferences_dates ON route_preferences(start_date, end_date);
+CREATE INDEX idx_route_preferences_created ON route_preferences(created_at);
 CREATE INDEX idx_recommended_routes_preference ON recommended_routes(preference_id);
 CREATE INDEX idx_route_itinerary_route ON route_itinerary(route_id);
 CREATE INDEX idx_user_saved_routes_user ON user_saved_routes(user_id);
 CREATE INDEX idx_user_saved_routes_status ON user_saved_routes(trip_status);
 CREATE INDEX idx_route_ratings_saved_route ON route_ratings(saved_route_id);
 CREATE INDEX idx_route_ratings_rating_type ON route_ratings(rating_type);
+CREATE INDEX idx_route_ratings_user ON route_ratings(user_id, rating_id);
 CREATE INDEX idx_user_saved_routes_is_public ON user_saved_routes(is_public);
 
 CREATE TABLE board_regions (
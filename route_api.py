@@ -0,0 +1,543 @@
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from enum import Enum
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import pymysql
+
+from AP_algorithm import (
+    AI_MODELS,
+    ActivityCatalogCache,
+    RouteResultCache,
+    RouteTemplateStore,
+    preference_region,
+)
+from catalog_api_client import default_catalog_client
+from route_engine import CATALOG_SOURCE, build_route_system, connect_db, open_catalog_snapshot
+from route_metrics import METRICS
+from route_models import RoutePreference
+from theme_index import ThemeLocationIndex
+from user_preference import UserPreferenceStore
+
+# ================== 로깅 설정 ==================
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger("route-api")
+
+# ================== 작업 큐 설정 ==================
+# 루트 생성(카탈로그 조회 + 최적화)은 HTTP 워커가 아닌 전용 워커 풀에서 실행한다.
+# 실행 중 + 대기 중 작업이 ROUTE_MAX_PENDING을 넘으면 429로 거절한다.
+ROUTE_WORKERS = int(os.getenv("ROUTE_WORKERS", "4"))
+ROUTE_MAX_PENDING = int(os.getenv("ROUTE_MAX_PENDING", "200"))
+JOB_TTL_SECONDS = int(os.getenv("ROUTE_JOB_TTL_SECONDS", "3600"))
+# 스트리밍 응답 버퍼 (이벤트 수) - 클라이언트가 느리면 워커가 여기서 기다린다
+ROUTE_STREAM_BUFFER = int(os.getenv("ROUTE_STREAM_BUFFER", "16"))
+
+# 워커 스레드들이 공유하는 캐시 (둘 다 스레드 안전)
+catalog_cache = ActivityCatalogCache()
+route_cache = RouteResultCache()
+
+# DB 테마 역색인 (CATALOG_SOURCE="db"일 때 사용, 워커 공유)
+theme_index = ThemeLocationIndex()
+
+# 사용자 선호 벡터(설문 + 루트 평가) 캐시 - 루트 개인화 점수용, 워커 공유
+user_preferences = UserPreferenceStore()
+
+# 야간 배치(route_prewarm.py)로 만든 인기 루트 템플릿 (시작시 DB에서 불러옴)
+route_templates = RouteTemplateStore()
+
+# 카탈로그 스냅샷 (CATALOG_SNAPSHOT_DIR, 있으면 API/DB 조회 대신 메모리 매핑해 사용)
+catalog_snapshot = open_catalog_snapshot()
+
+executor = ThreadPoolExecutor(max_workers=ROUTE_WORKERS, thread_name_prefix="route-worker")
+_worker_state = threading.local()
+
+
+def get_route_system():
+    """
+    워커 스레드 전용 DB 연결 + TravelRecommendationSystem
+
+    pymysql 연결은 스레드 간 공유할 수 없으므로 스레드마다 하나씩 만들고,
+    카탈로그/루트 캐시는 모든 워커가 공유한다. 엔진 구성은 야간 템플릿 생성(route_prewarm)과
+    같아야 템플릿의 카탈로그 버전이 일치하므로 route_engine.build_route_system을 쓴다.
+    """
+    conn = getattr(_worker_state, "conn", None)
+    if conn is not None:
+        try:
+            conn.ping(reconnect=True)
+        except pymysql.MySQLError as e:
+            logger.warning(f"DB reconnect failed: {str(e)}")
+            conn = None
+
+    if conn is None:
+        conn = connect_db()
+        _worker_state.conn = conn
+        _worker_state.db, _worker_state.system = build_route_system(
+            conn, catalog_snapshot,
+            catalog_cache=catalog_cache, theme_index=theme_index, user_preferences=user_preferences,
+            route_cache=route_cache, route_templates=route_templates
+        )
+
+    return _worker_state.db, _worker_state.system
+
+
+# ================== ENUM / 모델 ==================
+class ScheduleType(str, Enum):
+    relaxed = "relaxed"
+    packed = "packed"
+
+
+class TransportMode(str, Enum):
+    walk = "walk"
+    public = "public"
+    taxi = "taxi"
+    car = "car"
+
+
+class Solver(str, Enum):
+    greedy = "greedy"  # 빠름
+    beam = "beam"      # 느리지만 더 좋은 일정 (제한 시간 초과시 greedy 결과)
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+    cancelled = "cancelled"  # 스트리밍 중 클라이언트 연결 종료
+
+
+class StreamFormat(str, Enum):
+    ndjson = "ndjson"
+    sse = "sse"
+
+
+class RouteRequest(BaseModel):
+    user_id: int
+    start_date: date
+    end_date: date
+    theme_id: int
+    schedule_type: ScheduleType = ScheduleType.relaxed
+    travelers_count: int = Field(1, ge=1)
+    preferred_language: str = "en"
+    transport_mode: TransportMode = TransportMode.public
+    solver: Solver = Solver.greedy
+    save: bool = True  # 생성된 루트를 DB에 저장할지 여부
+    # 여행 지역 (선택): 기준점 + 반경 또는 [min_lat, min_lon, max_lat, max_lon]
+    anchor_lat: Optional[float] = Field(None, ge=-90, le=90)
+    anchor_lon: Optional[float] = Field(None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(None, gt=0, le=500)
+    bbox: Optional[List[float]] = None
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    status: JobStatus
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    route_id: Optional[int] = None
+    error: Optional[str] = None
+    queue_position: Optional[int] = None
+
+
+# ================== 작업 저장소 ==================
+class RouteJob:
+    def __init__(self, request: RouteRequest):
+        self.job_id = uuid.uuid4().hex
+        self.request = request
+        self.status = JobStatus.queued
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.route = None
+        self.route_id = None
+        self.error = None
+
+
+class RouteJobCancelled(Exception):
+    """스트리밍 클라이언트가 연결을 끊어 작업을 중단함"""
+
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _active_jobs():
+    return [j for j in _jobs.values() if j.status in (JobStatus.queued, JobStatus.running)]
+
+
+def _purge_expired_jobs():
+    """완료 후 JOB_TTL_SECONDS가 지난 작업 제거 (_jobs_lock 안에서 호출)"""
+    deadline = time.time() - JOB_TTL_SECONDS
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job.finished_at is not None and job.finished_at.timestamp() < deadline
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def _job_info(job: RouteJob) -> JobInfo:
+    position = None
+    if job.status == JobStatus.queued:
+        queued = sorted(
+            (j for j in _jobs.values() if j.status == JobStatus.queued),
+            key=lambda j: j.created_at
+        )
+        position = next(i for i, j in enumerate(queued) if j is job) + 1
+    return JobInfo(
+        job_id=job.job_id,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        route_id=job.route_id,
+        error=job.error,
+        queue_position=position,
+    )
+
+
+def run_route_job(job: RouteJob, emit=None, cancelled: Optional[threading.Event] = None):
+    """
+    워커 스레드에서 루트 생성 (+ 저장)
+
+    emit(event, data)가 주어지면 하루 일정이 완성될 때마다 전달하고,
+    저장도 루트 → 날짜 순으로 점진적으로 수행한다. cancelled가 설정되면 다음 날짜로
+    넘어가기 전에 중단한다. 중간에 실패/중단되면 일부만 저장된 루트는 삭제한다.
+    """
+    with _jobs_lock:
+        job.status = JobStatus.running
+        job.started_at = datetime.now()
+
+    db = None
+    route_id = None
+    try:
+        db, system = get_route_system()
+        request = job.request
+        preference = _request_preference(request)
+
+        if emit is None:
+            route = system.generate_route(preference, solver=request.solver.value)
+            route_id = db.save_route(route, preference) if request.save else None
+        else:
+            route = system.new_route(preference)
+            # 헤더 저장 전에 기록 (템플릿/캐시 사용시 save_itinerary_day가 만든 방식으로 갱신)
+            route.ai_model = AI_MODELS[request.solver.value]
+            route_id = db.save_route_header(route, preference) if request.save else None
+            header = dataclasses.asdict(route)
+            header.pop("itinerary")
+            emit("route", {"job_id": job.job_id, **header})
+            days = system.iter_route_days(preference, route, solver=request.solver.value)
+            try:
+                for daily in days:
+                    if request.save:
+                        db.save_itinerary_day(route, daily)
+                    emit("day", dataclasses.asdict(daily))
+                    if cancelled is not None and cancelled.is_set():
+                        raise RouteJobCancelled("client disconnected")
+            finally:
+                days.close()
+
+        with _jobs_lock:
+            job.route = route
+            job.route_id = route_id
+            job.status = JobStatus.done
+            job.finished_at = datetime.now()
+        logger.info(f"Route job {job.job_id} done (route_id={route_id})")
+
+        if emit is not None:
+            emit("done", {
+                "job_id": job.job_id,
+                "route_id": route_id,
+                "ai_model": route.ai_model,  # 템플릿/캐시 사용시 route 이벤트와 다를 수 있음
+                "total_estimated_cost": route.total_estimated_cost,
+                "days": len(route.itinerary),
+            })
+
+    except Exception as e:
+        stopped = isinstance(e, RouteJobCancelled)
+        if stopped:
+            logger.info(f"Route job {job.job_id} cancelled")
+        else:
+            logger.error(f"Route job {job.job_id} failed: {str(e)}")
+        # 스트리밍 저장 중이던 루트는 일부 날짜만 남으므로 삭제 (실패하면 route_id를 알려 준다)
+        if emit is not None and route_id is not None:
+            try:
+                db.delete_route(route_id)
+                route_id = None
+            except Exception as delete_error:
+                logger.error(f"Partial route {route_id} not deleted: {str(delete_error)}")
+        with _jobs_lock:
+            job.route_id = route_id
+            job.error = str(e)
+            job.status = JobStatus.cancelled if stopped else JobStatus.failed
+            job.finished_at = datetime.now()
+        if emit is not None and not stopped:
+            try:
+                emit("error", {"job_id": job.job_id, "route_id": route_id, "detail": str(e)})
+            except RouteJobCancelled:
+                pass
+
+
+def _request_preference(request: RouteRequest) -> RoutePreference:
+    """요청 -> 엔진 선호도"""
+    return RoutePreference(
+        user_id=request.user_id,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        theme_id=request.theme_id,
+        schedule_type=request.schedule_type.value,
+        travelers_count=request.travelers_count,
+        preferred_language=request.preferred_language,
+        transport_mode=request.transport_mode.value,
+        anchor_lat=request.anchor_lat,
+        anchor_lon=request.anchor_lon,
+        radius_km=request.radius_km,
+        bbox=tuple(request.bbox) if request.bbox is not None else None,
+    )
+
+
+def _enqueue_job(request: RouteRequest) -> RouteJob:
+    """작업 등록 (대기 한도를 넘으면 429)"""
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    try:
+        preference_region(_request_preference(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = RouteJob(request)
+    with _jobs_lock:
+        _purge_expired_jobs()
+        if len(_active_jobs()) >= ROUTE_MAX_PENDING:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many route jobs in queue",
+                headers={"Retry-After": "10"},
+            )
+        _jobs[job.job_id] = job
+    return job
+
+
+def _format_event(event: str, data, fmt: StreamFormat) -> str:
+    data = jsonable_encoder(data)
+    if fmt == StreamFormat.sse:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+
+# ================== 시작/종료 ==================
+def load_route_templates() -> int:
+    """route_templates 테이블 -> 공유 템플릿 저장소 (워커 스레드에서 실행)"""
+    db, _ = get_route_system()
+    return db.load_route_templates(route_templates)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"🚀 Route API Starting... (workers={ROUTE_WORKERS}, max_pending={ROUTE_MAX_PENDING})")
+    if catalog_snapshot is not None:
+        logger.info(f"Catalog snapshot {catalog_snapshot.version} mapped ({len(catalog_snapshot)} locations)")
+    try:
+        count = await asyncio.get_running_loop().run_in_executor(executor, load_route_templates)
+        logger.info(f"Route templates loaded: {count}")
+    except Exception as e:
+        logger.warning(f"Route templates unavailable: {str(e)}")
+
+    yield
+
+    executor.shutdown(wait=False, cancel_futures=True)
+    default_catalog_client().close()
+
+
+# ================== FastAPI 앱 ==================
+app = FastAPI(title="Route API", version="1.0.0", lifespan=lifespan)
+
+# CORS 설정
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[
+        "http://localhost:3000",
+        "http://localhost:5173",
+        "http://localhost:8080",
+    ],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+# ================== 건강 체크 ==================
+@app.get("/route-api/health")
+async def health_check():
+    with _jobs_lock:
+        active = _active_jobs()
+        return {
+            "status": "healthy",
+            "running": sum(1 for j in active if j.status == JobStatus.running),
+            "queued": sum(1 for j in active if j.status == JobStatus.queued),
+            "catalog_cache": catalog_cache.stats(),
+            "route_cache": route_cache.stats(),
+            "route_templates": route_templates.stats(),
+            "theme_index": theme_index.stats() if CATALOG_SOURCE == "db" else None,
+            "user_preferences": user_preferences.stats(),
+        }
+
+
+@app.post("/route-api/templates/reload")
+async def reload_route_templates():
+    """야간 배치 후 템플릿 다시 불러오기"""
+    try:
+        count = await asyncio.get_running_loop().run_in_executor(executor, load_route_templates)
+    except Exception as e:
+        logger.error(f"Route template reload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="템플릿을 불러오지 못했습니다.")
+    return {"success": True, "templates": count}
+
+
+def refresh_user_preference(user_id: int, full: bool = False) -> int:
+    """선호 벡터 증분 갱신/저장 + 캐시 교체 (워커 스레드에서 실행), 반영된 특징 수 반환"""
+    db, _ = get_route_system()
+    personal = db.refresh_user_preference(user_id, full=full)
+    return len(personal[0]) if personal is not None else 0
+
+
+@app.post("/route-api/users/{user_id}/preferences/refresh")
+async def refresh_user_preferences(user_id: int, full: bool = False):
+    """
+    설문 제출/루트 평가 후 호출하면 다음 루트 생성부터 바로 반영
+
+    루트 생성은 저장된 선호 벡터를 읽기만 하므로, 벡터 계산/저장은 여기와
+    야간 배치(user_preference_refresh.py)에서만 한다. 평가를 바꾼 경우 full=true.
+    """
+    try:
+        features = await asyncio.get_running_loop().run_in_executor(
+            executor, refresh_user_preference, user_id, full
+        )
+    except Exception as e:
+        logger.error(f"User preference refresh failed ({user_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail="선호 벡터를 갱신하지 못했습니다.")
+    return {"success": True, "user_id": user_id, "features": features}
+
+
+# ================== 지표 ==================
+@app.get("/route-api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """루트 엔진/DB 단계별 소요 시간과 카운터 (Prometheus 텍스트 형식)"""
+    return METRICS.export_prometheus()
+
+
+# ================== 루트 생성 작업 ==================
+@app.post("/routes/jobs", status_code=202, response_model=JobInfo)
+async def create_route_job(request: RouteRequest):
+    job = _enqueue_job(request)
+    with _jobs_lock:
+        info = _job_info(job)
+
+    executor.submit(run_route_job, job)
+    return info
+
+
+@app.post("/routes/stream")
+async def stream_route(request: RouteRequest, http_request: Request,
+                       format: StreamFormat = StreamFormat.ndjson):
+    """
+    하루 일정이 완성될 때마다 전송 (NDJSON 또는 Server-Sent Events)
+
+    이벤트 순서: route(루트 정보) → day(날짜별) ... → done (실패 시 error)
+    생성은 작업 큐 워커에서 실행되고, 같은 job_id로 상태/결과 조회도 가능하다.
+    클라이언트가 연결을 끊으면 워커는 다음 날짜로 넘어가기 전에 멈추고 저장 중이던 루트를 지운다.
+    """
+    job = _enqueue_job(request)
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue(maxsize=ROUTE_STREAM_BUFFER)
+    cancelled = threading.Event()
+
+    def emit(event, data):
+        # 버퍼가 차 있으면 워커 스레드가 기다린다 (연결이 끊기면 중단)
+        future = asyncio.run_coroutine_threadsafe(events.put((event, data)), loop)
+        while True:
+            try:
+                return future.result(timeout=1.0)
+            except FutureTimeoutError:
+                if cancelled.is_set():
+                    future.cancel()
+                    raise RouteJobCancelled("client disconnected")
+
+    executor.submit(run_route_job, job, emit, cancelled)
+
+    async def body():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(events.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    if await http_request.is_disconnected():
+                        return
+                    continue
+                yield _format_event(event, data, format)
+                if event in ("done", "error"):
+                    return
+        finally:
+            # 정상 종료 후에는 효과 없음, 연결 종료(CancelledError/GeneratorExit)면 워커 중단
+            cancelled.set()
+
+    media_type = "text/event-stream" if format == StreamFormat.sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/routes/jobs/{job_id}", response_model=JobInfo)
+async def get_route_job(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return _job_info(job)
+
+
+@app.get("/routes/jobs/{job_id}/result")
+async def get_route_job_result(job_id: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job.status == JobStatus.failed:
+            raise HTTPException(status_code=500, detail=job.error)
+        if job.status == JobStatus.cancelled:
+            raise HTTPException(status_code=410, detail="Job cancelled")
+        if job.status != JobStatus.done:
+            return JSONResponse(
+                status_code=202,
+                content=jsonable_encoder(_job_info(job)),
+                headers={"Retry-After": "1"},
+            )
+        route = job.route
+
+    return {
+        "job_id": job_id,
+        "route_id": job.route_id,
+        "route": jsonable_encoder(dataclasses.asdict(route)),
+    }
+
+
+# ================== UVICORN ==================
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8003)
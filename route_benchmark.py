@@ -0,0 +1,239 @@
+"""
+루트 엔진(TravelRecommendationSystem) 벤치마크
+
+합성 카탈로그(서울/부산/제주 좌표 군집)로 generate_route를 반복 실행하고
+지연 시간 분위수, 최대 메모리, 루트 품질(총 이동거리, 하루 방문 수, 유휴 시간)을
+JSON으로 기록한다. 옵티마이저 버전 간 결과 파일을 비교해 회귀를 확인한다.
+
+사용 예:
+    python route_benchmark.py --sizes 100 2000 10000 --days 1 3 7 14 --output bench.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import random
+import time
+import tracemalloc
+from typing import List
+
+import numpy as np
+
+from AP_algorithm import TravelRecommendationSystem
+from route_models import Activity, RoutePreference
+
+
+# ==================== 합성 카탈로그 ====================
+
+# 지역별 군집 중심 (위도, 경도, 반경 km) - 실제 관광 밀집 지역 근사
+REGIONS = {
+    "seoul": [
+        (37.5796, 126.9770, 1.5),   # 경복궁/광화문
+        (37.5636, 126.9822, 1.0),   # 명동
+        (37.5512, 126.9882, 1.0),   # 남산
+        (37.5563, 126.9236, 1.5),   # 홍대
+        (37.5270, 127.0405, 2.0),   # 강남/압구정
+        (37.5112, 127.0981, 1.5),   # 잠실
+        (37.5826, 127.0016, 1.0),   # 대학로
+    ],
+    "busan": [
+        (35.1587, 129.1604, 1.5),   # 해운대
+        (35.1532, 129.1187, 1.0),   # 광안리
+        (35.0979, 129.0306, 1.0),   # 남포동/자갈치
+        (35.0975, 129.0105, 1.0),   # 감천문화마을
+        (35.1880, 129.2233, 2.0),   # 기장
+    ],
+    "jeju": [
+        (33.4996, 126.5312, 3.0),   # 제주시
+        (33.2541, 126.5601, 3.0),   # 서귀포
+        (33.4584, 126.9425, 2.0),   # 성산일출봉
+        (33.3617, 126.5292, 4.0),   # 한라산
+        (33.2394, 126.4125, 2.5),   # 중문
+    ],
+}
+
+CATEGORIES = ["palace", "kpop", "food", "market", "museum", "park", "cafe",
+              "shopping", "beach", "temple", "night_view", "hiking"]
+
+
+def make_catalog(size: int, region: str = "seoul", seed: int = 0) -> List[Activity]:
+    """
+    합성 활동 카탈로그 생성
+
+    Parameters:
+    - size: 활동 수
+    - region: "seoul", "busan", "jeju" 또는 "korea" (세 지역 혼합)
+    - seed: 난수 시드
+    """
+    rng = random.Random(seed)
+    clusters = (
+        [c for clusters in REGIONS.values() for c in clusters]
+        if region == "korea" else REGIONS[region]
+    )
+
+    activities = []
+    for i in range(size):
+        lat, lon, radius_km = rng.choice(clusters)
+        sigma_deg = radius_km / 111.0
+        activities.append(Activity(
+            location_id=i + 1,
+            activity_name=f"{region}-{i + 1}",
+            lat=rng.gauss(lat, sigma_deg),
+            lon=rng.gauss(lon, sigma_deg * 1.25),
+            location_name=f"{region}-{i + 1}",
+            estimated_duration_minutes=rng.choice([45, 60, 90, 120, 150, 180]),
+            estimated_cost=rng.choice([None, 0.0, 5000.0, 12000.0, 30000.0]),
+            activity_category_id=None,
+            categories=rng.sample(CATEGORIES, rng.randint(1, 3)),
+        ))
+    return activities
+
+
+class StubDatabaseConnector:
+    """고정 카탈로그를 돌려주는 DatabaseConnector 대체 (네트워크/DB 없음)"""
+
+    def __init__(self, activities: List[Activity]):
+        self.activities = activities
+
+    def fetch_activities_by_theme(self, theme_id: int, transport_mode: str = "public",
+                                  region=None):
+        # 지역 제한은 엔진(prepare_catalog)이 좌표로 거른다
+        return list(self.activities)
+
+
+# ==================== 측정 ====================
+
+def route_quality(system: TravelRecommendationSystem, route, preference: RoutePreference,
+                  start_time: int = 9) -> dict:
+    """총 이동거리, 하루 방문 수, 유휴 시간(하루 활동 시간 중 일정이 없는 시간), priority 합"""
+    max_hours, _ = system._schedule_window(preference.schedule_type, 0)
+    idle_hours = []
+    for daily in route.itinerary:
+        last = daily.activities[-1] if daily.activities else None
+        if last is None:
+            idle_hours.append(float(max_hours))
+            continue
+        end = last.activity_time.hour + last.activity_time.minute / 60 + last.avg_duration_hours
+        idle_hours.append(max(0.0, start_time + max_hours - end))
+
+    per_day = [len(d.activities) for d in route.itinerary]
+    return {
+        "total_distance_km": round(sum(d.total_distance for d in route.itinerary), 3),
+        "activities_per_day": round(float(np.mean(per_day)), 3) if per_day else 0.0,
+        "total_activities": int(sum(per_day)),
+        "total_priority": round(sum(a.priority_score for d in route.itinerary for a in d.activities), 3),
+        "idle_hours_per_day": round(float(np.mean(idle_hours)), 3) if idle_hours else 0.0,
+        "planned_days": len(route.itinerary),
+    }
+
+
+def run_case(size: int, days: int, args) -> dict:
+    """카탈로그 크기 x 여행 일수 한 조합 측정"""
+    catalog = make_catalog(size, args.region, args.seed)
+    system = TravelRecommendationSystem(
+        StubDatabaseConnector(catalog),
+        candidate_mode=args.candidate_mode,
+        candidate_radius_minutes=args.candidate_radius_minutes,
+        candidate_k=args.candidate_k,
+        local_search_budget_ms=args.local_search_ms,
+        day_clustering=args.day_clustering,
+        solver=args.solver,
+        solver_budget_ms=args.solver_budget_ms,
+        beam_width=args.beam_width,
+        day_workers=args.day_workers,
+    )
+    start = datetime.date(2025, 1, 1)
+    preference = RoutePreference(
+        user_id=1,
+        start_date=start,
+        end_date=start + datetime.timedelta(days=days - 1),
+        theme_id=1,
+        schedule_type=args.schedule_type,
+        transport_mode=args.transport_mode,
+    )
+
+    # 지연 시간 (워밍업 1회 제외)
+    system.generate_route(preference)
+    latencies = []
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        route = system.generate_route(preference)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    # 최대 메모리 (tracemalloc은 느려지므로 별도 1회)
+    tracemalloc.start()
+    system.generate_route(preference)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    system.close()
+
+    latencies = np.array(latencies)
+    return {
+        "catalog_size": size,
+        "days": days,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p90": round(float(np.percentile(latencies, 90)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+            "mean": round(float(latencies.mean()), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+        "peak_memory_mb": round(peak / 1024 / 1024, 3),
+        "quality": route_quality(system, route, preference),
+        "trace": route.trace,  # 마지막 반복의 단계별 소요 시간/카운터
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TravelRecommendationSystem 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 3, 7, 14])
+    parser.add_argument("--region", choices=[*REGIONS, "korea"], default="seoul")
+    parser.add_argument("--schedule-type", choices=["relaxed", "packed"], default="relaxed")
+    parser.add_argument("--transport-mode", choices=["walk", "public", "taxi", "car"], default="public")
+    parser.add_argument("--candidate-mode", choices=["full", "spatial"], default="full")
+    parser.add_argument("--candidate-radius-minutes", type=float, default=60)
+    parser.add_argument("--candidate-k", type=int, default=50)
+    parser.add_argument("--local-search-ms", type=float, default=0)
+    parser.add_argument("--day-clustering", choices=["none", "kmeans", "sweep"], default="none")
+    parser.add_argument("--solver", choices=["greedy", "beam"], default="greedy")
+    parser.add_argument("--solver-budget-ms", type=float, default=50, help="beam 하루당 제한 시간")
+    parser.add_argument("--beam-width", type=int, default=8)
+    parser.add_argument("--day-workers", type=int, default=0, help="날짜별 병렬 최적화 프로세스 수")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="결과 구분용 이름 (예: 옵티마이저 버전)")
+    parser.add_argument("--output", default="route_benchmark.json")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        for days in args.days:
+            case = run_case(size, days, args)
+            results.append(case)
+            print(
+                f"size={size:>6} days={days:>2} "
+                f"p50={case['latency_ms']['p50']:>9.2f}ms p99={case['latency_ms']['p99']:>9.2f}ms "
+                f"peak={case['peak_memory_mb']:>7.2f}MB "
+                f"dist={case['quality']['total_distance_km']:>8.2f}km "
+                f"acts/day={case['quality']['activities_per_day']:.2f} "
+                f"priority={case['quality']['total_priority']:.1f} "
+                f"idle/day={case['quality']['idle_hours_per_day']:.2f}h"
+            )
+
+    report = {
+        "label": args.label,
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "label")},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
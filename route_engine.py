@@ -0,0 +1,99 @@
+"""
+루트 엔진 구성 (route_api, route_prewarm 공용)
+
+사전 생성 템플릿은 카탈로그 버전(점수 계산까지 끝난 카탈로그의 fingerprint)이 요청 시점과
+같을 때만 쓰인다. 카탈로그 조회 방식(CATALOG_SOURCE), 카탈로그 스냅샷(CATALOG_SNAPSHOT_DIR),
+점수 설정이 API 엔진과 야간 배치 엔진에서 하나라도 다르면 모든 템플릿이 버전 불일치로
+버려지므로, 두 곳 모두 여기서 DB 연결과 엔진을 만든다.
+"""
+
+import logging
+import os
+from typing import Optional
+
+import pymysql
+
+from AP_algorithm import (
+    ActivityCatalogCache,
+    DatabaseConnector,
+    TravelRecommendationSystem,
+)
+from catalog_snapshot import CatalogSnapshot
+from theme_index import ThemeLocationIndex
+from user_preference import UserPreferenceStore
+
+logger = logging.getLogger(__name__)
+
+# ================== DB 설정 ==================
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "ktrip"),
+    "charset": "utf8mb4",
+}
+
+# ================== 카탈로그 설정 ==================
+# 테마 카탈로그 조회 방식: "api" (팀 백엔드 API) 또는 "db" (DB 테마 역색인)
+CATALOG_SOURCE = os.getenv("CATALOG_SOURCE", "api")
+# 카탈로그 스냅샷 (catalog_snapshot_export.py로 생성, 있으면 API/DB 조회 대신 메모리 매핑해 사용)
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", "")
+
+# 카탈로그 버전에 영향을 주는 엔진 설정 (호출자별로 바꾸지 않는다)
+SCORING_SETTINGS = ("theme_category_weights", "popularity_weight")
+
+
+def connect_db():
+    """DictCursor를 쓰는 pymysql 연결"""
+    return pymysql.connect(**DB_CONFIG, cursorclass=pymysql.cursors.DictCursor)
+
+
+def open_catalog_snapshot(directory: str = CATALOG_SNAPSHOT_DIR) -> Optional[CatalogSnapshot]:
+    """
+    카탈로그 스냅샷 열기 (디렉터리를 지정하지 않았거나 열 수 없으면 None)
+
+    테마 규칙이 없는 스냅샷은 모든 테마에 전체 카탈로그를 쓰게 되므로 예외를 낸다.
+    """
+    if not directory:
+        return None
+    try:
+        snapshot = CatalogSnapshot.open(directory)
+    except Exception as e:
+        logger.warning(f"Catalog snapshot unavailable ({directory}): {str(e)}")
+        return None
+    if not snapshot.themes:
+        raise RuntimeError(
+            f"Catalog snapshot {snapshot.path} has no theme rules; "
+            "re-export it with catalog_snapshot_export.py"
+        )
+    return snapshot
+
+
+def build_route_system(conn,
+                       catalog_snapshot: Optional[CatalogSnapshot] = None,
+                       catalog_cache: Optional[ActivityCatalogCache] = None,
+                       theme_index: Optional[ThemeLocationIndex] = None,
+                       user_preferences: Optional[UserPreferenceStore] = None,
+                       **engine_settings) -> tuple:
+    """
+    DB 연결 -> (DatabaseConnector, TravelRecommendationSystem)
+
+    카탈로그 조회 방식과 점수 설정은 여기서 정하고, 호출자는 최적화 설정(solver,
+    solver_budget_ms 등)과 공유 캐시만 넘긴다.
+
+    Parameters:
+    - conn: pymysql 연결
+    - catalog_snapshot: open_catalog_snapshot() 결과 (None이면 CATALOG_SOURCE로 조회)
+    - catalog_cache, theme_index, user_preferences: 여러 연결이 공유할 캐시 (없으면 새로 생성)
+    - engine_settings: TravelRecommendationSystem 최적화 설정 (SCORING_SETTINGS는 ValueError)
+    """
+    overridden = [name for name in SCORING_SETTINGS if name in engine_settings]
+    if overridden:
+        raise ValueError(f"카탈로그 버전이 달라지는 설정은 바꿀 수 없습니다: {overridden}")
+    db = DatabaseConnector(
+        conn, catalog_cache=catalog_cache,
+        catalog_source=CATALOG_SOURCE, theme_index=theme_index,
+        user_preferences=user_preferences
+    )
+    system = TravelRecommendationSystem(db, catalog_snapshot=catalog_snapshot, **engine_settings)
+    return db, system
@@ -0,0 +1,183 @@
+"""
+루트 생성 성능 계측
+
+RouteTrace(루트 한 번의 단계별 소요 시간/카운터)와 프로세스 단위 MetricsRegistry,
+DB 왕복 수를 세는 cursor 래퍼
+"""
+
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+
+
+# ==================== 성능 계측 ====================
+
+class RouteTrace:
+    """
+    루트 생성 한 번의 단계별 소요 시간과 카운터
+    
+    엔진이 루트 생성 시작시 현재 컨텍스트에 등록하고, 엔진/DatabaseConnector는
+    current_trace()로 찾아 기록한다. 끝나면 요약을 Route.trace, 로그, MetricsRegistry에 남긴다.
+    """
+    
+    def __init__(self, name: str = "route"):
+        self.name = name
+        self.phases = {}    # 단계 -> 누적 초
+        self.counters = {}  # 이름 -> 누적 값
+        self._started = time.perf_counter()
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """with 블록 소요 시간을 name 단계에 누적"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+    
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "phases_ms": {k: round(v * 1000, 3) for k, v in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class _NullTrace(RouteTrace):
+    """활성 trace가 없을 때 쓰는 빈 구현 (기록하지 않음)"""
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        yield
+    
+    def count(self, name: str, value: int = 1):
+        pass
+
+
+_NULL_TRACE = _NullTrace()
+_CURRENT_TRACE = contextvars.ContextVar("route_trace", default=None)
+
+
+def current_trace() -> RouteTrace:
+    """현재 컨텍스트의 RouteTrace (없으면 아무것도 기록하지 않는 객체)"""
+    trace = _CURRENT_TRACE.get()
+    return trace if trace is not None else _NULL_TRACE
+
+
+class MetricsRegistry:
+    """
+    프로세스 단위 지표 모음
+    
+    - 타이머: 이름별 횟수/합계/최대 (초)
+    - 카운터: 이름별 누적 값
+    
+    snapshot()은 dict, export_prometheus()는 Prometheus 텍스트 형식으로 내보낸다.
+    """
+    
+    def __init__(self, prefix: str = "ktrip"):
+        self.prefix = prefix
+        self._timers = {}    # name -> [count, sum, max]
+        self._counters = {}  # name -> value
+        self._lock = threading.Lock()
+    
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            timer = self._timers.setdefault(name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+    
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        """with 블록 소요 시간 기록"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    def record(self, summary: dict):
+        """RouteTrace.summary() 반영 (단계는 {name}_{phase} 타이머, 카운터는 {name}_{counter})"""
+        name = summary["name"]
+        self.observe(name, summary["total_ms"] / 1000)
+        for phase, ms in summary["phases_ms"].items():
+            self.observe(f"{name}_{phase}", ms / 1000)
+        for counter, value in summary["counters"].items():
+            self.increment(f"{name}_{counter}", value)
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "timers": {
+                    name: {"count": c, "sum_seconds": round(total, 6), "max_seconds": round(peak, 6)}
+                    for name, (c, total, peak) in self._timers.items()
+                },
+                "counters": dict(self._counters),
+            }
+    
+    def export_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (c, total, peak) in sorted(self._timers.items()):
+                metric = f"{self.prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                lines.append(f"{metric}_count {c}")
+                lines.append(f"{metric}_sum {total:.6f}")
+                lines.append(f"# TYPE {metric}_max gauge")
+                lines.append(f"{metric}_max {peak:.6f}")
+            for name, value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+
+# 기본 지표 모음 (엔진/DatabaseConnector에 따로 주지 않으면 사용)
+METRICS = MetricsRegistry()
+
+
+def _db_timed(name: str):
+    """DatabaseConnector 메서드 소요 시간을 지표(db_{name})와 현재 trace 단계(name)로 기록"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(f"db_{name}"), current_trace().phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _TracedCursor:
+    """DB cursor 래퍼: execute/executemany 호출(왕복) 수를 trace와 지표에 기록"""
+    
+    def __init__(self, cursor, metrics: MetricsRegistry):
+        self._cursor = cursor
+        self._metrics = metrics
+    
+    def execute(self, *args, **kwargs):
+        current_trace().count("db_round_trips")
+        self._metrics.increment("db_round_trips")
+        return self._cursor.execute(*args, **kwargs)
+    
+    def executemany(self, *args, **kwargs):
+        current_trace().count("db_round_trips")
+        self._metrics.increment("db_round_trips")
+        return self._cursor.executemany(*args, **kwargs)
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
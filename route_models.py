@@ -0,0 +1,421 @@
+"""
+루트 엔진 데이터 모델
+
+- 리뷰/인기도 특징: popularity_score
+- 데이터 클래스: RoutePreference, Activity, DailyItinerary, Route (DB 테이블과 1:1)
+- 옵티마이저용 컬럼형 카탈로그: ActivityTable, SharedActivityTable
+"""
+
+import copy
+import datetime
+import hashlib
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+
+# ==================== 리뷰/인기도 특징 ====================
+
+# 베이지안 평균용 사전 평점/가중치 (리뷰가 적은 장소의 평점을 전체 평균 쪽으로 보정)
+RATING_PRIOR = 3.5
+RATING_PRIOR_WEIGHT = 10
+# 리뷰+좋아요 수가 이 값이면 규모 점수 1.0 (로그 스케일)
+POPULARITY_VOLUME_SATURATION = 10000
+
+
+def popularity_score(review_count: int = 0,
+                     rating_sum: float = 0.0,
+                     like_count: int = 0,
+                     external_rating: Optional[float] = None,
+                     external_review_count: int = 0) -> float:
+    """
+    location_review_features 한 행 -> 인기도 점수 (0~1)
+    
+    - 평점: 자체 리뷰와 외부(API) 평점을 리뷰 수로 가중한 베이지안 평균 (1~5 -> 0~1)
+    - 규모: log(리뷰 수 + 외부 리뷰 수 + 좋아요 수) / log(POPULARITY_VOLUME_SATURATION)
+    - 인기도 = 0.7 * 평점 + 0.3 * 규모
+    """
+    external_count = external_review_count if external_rating is not None else 0
+    rating_total = float(rating_sum) + float(external_rating or 0.0) * external_count
+    count = review_count + external_count
+    rating = (rating_total + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (count + RATING_PRIOR_WEIGHT)
+    rating_part = min(1.0, max(0.0, (rating - 1.0) / 4.0))
+    
+    volume = count + like_count
+    volume_part = min(1.0, math.log1p(volume) / math.log1p(POPULARITY_VOLUME_SATURATION))
+    return round(0.7 * rating_part + 0.3 * volume_part, 6)
+
+
+# ==================== 데이터 클래스 정의 ====================
+
+@dataclass
+class RoutePreference:
+    """사용자의 여행 선호도 (route_preferences 테이블)"""
+    preference_id: Optional[int] = None
+    user_id: int = 0
+    start_date: Optional[datetime.date] = None
+    end_date: Optional[datetime.date] = None
+    theme_id: int = 0
+    schedule_type: str = "relaxed"  # relaxed or packed
+    travelers_count: int = 1
+    preferred_language: str = "en"
+    transport_mode: str = "public"  # walk, public, taxi, car
+    created_at: Optional[datetime.datetime] = None
+    # 여행 지역 (선택): 기준점 + 반경(km) 또는 경계 상자 (min_lat, min_lon, max_lat, max_lon)
+    anchor_lat: Optional[float] = None
+    anchor_lon: Optional[float] = None
+    radius_km: Optional[float] = None
+    bbox: Optional[tuple] = None
+
+
+@dataclass(slots=True)
+class Activity:
+    """
+    일정에 포함될 활동/관광지 (itinerary_activities 테이블)
+    
+    옵티마이저는 ActivityTable(컬럼형)로 계산하고, 선택된 결과만 Activity로 만든다.
+    """
+    # 기본 정보
+    activity_id: Optional[int] = None
+    activity_name: str = ""
+    lat: float = 0.0
+    lon: float = 0.0
+    
+    # 일정 관련
+    itinerary_id: Optional[int] = None
+    activity_order: int = 0
+    activity_time: Optional[datetime.time] = None
+    activity_description: Optional[str] = None
+    
+    # 위치 정보
+    location_id: Optional[int] = None  # locations 테이블 FK
+    location_name: Optional[str] = None
+    location_address: Optional[str] = None
+    
+    # 비용 및 시간
+    estimated_duration_minutes: int = 120  # 기본 2시간
+    estimated_cost: Optional[float] = None
+    
+    # 카테고리
+    activity_category_id: Optional[int] = None
+    
+    # 알고리즘용 추가 필드
+    priority_score: float = 0.0
+    popularity_score: float = 0.0  # 리뷰/평점 기반 인기도 0~1 (location_review_features)
+    categories: List[str] = field(default_factory=list)  # 알고리즘 계산용
+    
+    @property
+    def avg_duration_hours(self) -> float:
+        """시간 단위로 변환"""
+        return self.estimated_duration_minutes / 60
+
+
+@dataclass
+class DailyItinerary:
+    """일일 일정 (route_itinerary 테이블)"""
+    itinerary_id: Optional[int] = None
+    route_id: Optional[int] = None
+    day_number: int = 1
+    day_date: datetime.date = None
+    day_description: Optional[str] = None
+    
+    # 활동 리스트
+    activities: List[Activity] = field(default_factory=list)
+    
+    # 계산 값
+    total_distance: float = 0.0
+    total_estimated_cost: float = 0.0
+    initial_distance: Optional[float] = None  # 지역 탐색(2-opt/Or-opt) 적용 전 거리
+
+
+@dataclass
+class Route:
+    """전체 여행 루트 (recommended_routes 테이블)"""
+    route_id: Optional[int] = None
+    preference_id: Optional[int] = None
+    route_name: str = ""
+    route_description: Optional[str] = None
+    total_estimated_cost: Optional[float] = None
+    difficulty_level: str = "easy"  # easy, moderate, challenging
+    generated_at: Optional[datetime.datetime] = None
+    is_active: bool = True
+    ai_model: str = "custom_greedy_algorithm"
+    ai_version: str = "1.0"
+    
+    # 일정 리스트
+    itinerary: List[DailyItinerary] = field(default_factory=list)
+    
+    # 생성 과정 계측 (RouteTrace.summary(), DB 저장 안 함)
+    trace: Optional[dict] = None
+
+
+# ==================== 옵티마이저용 컬럼형 카탈로그 ====================
+
+class ActivityTable:
+    """
+    루트 엔진 작업용 활동 카탈로그 (struct-of-arrays)
+    
+    좌표/소요시간/비용/점수는 NumPy 배열, 카테고리는 정수 코드(CSR 형식)로 보관한다.
+    배열은 읽기 전용이고 원본 Activity도 수정하지 않으므로, 같은 테이블을 여러 루트
+    생성에서 동시에 써도 안전하다. 일정에 선택된 행만 materialize()로 Activity를 만든다.
+    """
+    
+    def __init__(self, rows, lat, lon, duration_hours, cost, score, location_id,
+                 category_codes, category_offsets, category_names, category_bits=None,
+                 popularity=None):
+        self.rows = rows                          # 원본 Activity (materialize용, 수정 금지) 또는 SnapshotRows
+        self.lat = lat                            # float64
+        self.lon = lon                            # float64
+        self.duration_hours = duration_hours      # float64
+        self.cost = cost                          # float64 (비용 없음 = 0)
+        self.score = score                        # float64 (priority_score)
+        self.location_id = location_id            # int64 (없음 = -1)
+        if popularity is None:
+            popularity = np.zeros(lat.size, dtype=np.float64)
+        self.popularity = popularity              # float64 (리뷰/평점 기반 인기도 0~1)
+        self.category_codes = category_codes      # int32, 행 i의 코드는 [offsets[i], offsets[i+1])
+        self.category_offsets = category_offsets  # int64, 길이 n + 1
+        self.category_names = category_names      # 코드 -> 카테고리 이름
+        if category_bits is None:
+            category_bits = self._category_bits(category_codes, category_offsets, len(category_names))
+        self.category_bits = category_bits        # uint64 (n, words), 코드 c = words[c // 64]의 c % 64번 비트
+        self._category_matrix = None              # (n, 카테고리 수) 0/1 행렬, 처음 쓸 때 생성
+        for array in (lat, lon, duration_hours, cost, score, location_id, popularity,
+                      category_codes, category_offsets, category_bits):
+            array.flags.writeable = False
+    
+    @classmethod
+    def from_activities(cls, activities: List[Activity], scores=None) -> "ActivityTable":
+        """
+        Activity 리스트 -> 테이블 변환
+        
+        Parameters:
+        - activities: 활동 리스트
+        - scores: 행별 점수 (없으면 각 Activity의 priority_score 사용)
+        """
+        n = len(activities)
+        code_of = {}
+        codes = []
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        for i, a in enumerate(activities):
+            for cat in a.categories:
+                codes.append(code_of.setdefault(cat, len(code_of)))
+            offsets[i + 1] = len(codes)
+        
+        if scores is None:
+            scores = [a.priority_score for a in activities]
+        
+        return cls(
+            rows=tuple(activities),
+            lat=np.fromiter((a.lat for a in activities), dtype=np.float64, count=n),
+            lon=np.fromiter((a.lon for a in activities), dtype=np.float64, count=n),
+            duration_hours=np.fromiter((a.avg_duration_hours for a in activities),
+                                       dtype=np.float64, count=n),
+            cost=np.fromiter((a.estimated_cost or 0.0 for a in activities),
+                             dtype=np.float64, count=n),
+            score=np.asarray(scores, dtype=np.float64).copy(),
+            location_id=np.fromiter(
+                (a.location_id if a.location_id is not None else -1 for a in activities),
+                dtype=np.int64, count=n
+            ),
+            category_codes=np.asarray(codes, dtype=np.int32),
+            category_offsets=offsets,
+            category_names=list(code_of),
+            popularity=np.fromiter((a.popularity_score for a in activities),
+                                   dtype=np.float64, count=n),
+        )
+    
+    def __len__(self) -> int:
+        return self.lat.size
+    
+    def take(self, indices) -> "ActivityTable":
+        """행 부분집합/재정렬 (예: 점수순 정렬)"""
+        indices = np.asarray(indices, dtype=np.intp)
+        starts = self.category_offsets[indices]
+        ends = self.category_offsets[indices + 1]
+        offsets = np.zeros(indices.size + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=offsets[1:])
+        codes = (np.concatenate([self.category_codes[a:b] for a, b in zip(starts, ends)])
+                 if indices.size else np.empty(0, dtype=np.int32))
+        return ActivityTable(
+            rows=(self.rows.take(indices) if hasattr(self.rows, "take")  # 지연 행 목록 (SnapshotRows)
+                  else tuple(self.rows[i] for i in indices)),
+            lat=self.lat[indices],
+            lon=self.lon[indices],
+            duration_hours=self.duration_hours[indices],
+            cost=self.cost[indices],
+            score=self.score[indices],
+            location_id=self.location_id[indices],
+            category_codes=codes.astype(np.int32, copy=False),
+            category_offsets=offsets,
+            category_names=self.category_names,
+            category_bits=self.category_bits[indices],
+            popularity=self.popularity[indices],
+        )
+    
+    def with_scores(self, scores) -> "ActivityTable":
+        """점수만 바꾼 테이블 (나머지 배열은 공유)"""
+        table = copy.copy(self)
+        table.score = np.asarray(scores, dtype=np.float64).copy()
+        table.score.flags.writeable = False
+        return table
+    
+    @staticmethod
+    def _category_bits(codes, offsets, num_categories: int) -> np.ndarray:
+        """CSR 카테고리 코드 -> 행별 비트마스크 (중복 카테고리는 한 번만)"""
+        n = offsets.size - 1
+        bits = np.zeros((n, max(1, -(-num_categories // 64))), dtype=np.uint64)
+        rows = np.repeat(np.arange(n), np.diff(offsets))
+        codes = np.asarray(codes, dtype=np.int64)
+        np.bitwise_or.at(
+            bits, (rows, codes // 64),
+            np.left_shift(np.uint64(1), (codes % 64).astype(np.uint64))
+        )
+        return bits
+    
+    def category_mask(self, categories) -> np.ndarray:
+        """카테고리 이름 목록 -> 비트마스크 (카탈로그에 없는 이름은 무시)"""
+        code_of = {name: code for code, name in enumerate(self.category_names)}
+        mask = np.zeros(self.category_bits.shape[1], dtype=np.uint64)
+        for name in categories:
+            code = code_of.get(name)
+            if code is not None:
+                mask[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        return mask
+    
+    def match_scores(self, weights: Optional[dict] = None) -> np.ndarray:
+        """
+        테마 카테고리 매칭 점수 일괄 계산 (calculate_match_score와 같은 식)
+        
+        점수 = 일치 카테고리 가중치 합 * 2 + 일치 카테고리 수
+        
+        Parameters:
+        - weights: {카테고리: 가중치} (None이면 카탈로그의 모든 카테고리, 가중치 1)
+        
+        Returns:
+        - np.ndarray: 행별 점수 (float64)
+        """
+        num_categories = len(self.category_names)
+        if weights is None:
+            w = np.ones(num_categories)
+        else:
+            w = np.array([weights.get(name, 0.0) for name in self.category_names], dtype=np.float64)
+        theme_mask = self.category_mask(
+            name for name, weight in zip(self.category_names, w) if weight != 0
+        )
+        
+        hits = (self.category_bits & theme_mask).astype("<u8", copy=False)
+        matched = np.unpackbits(hits.view(np.uint8), axis=1, bitorder="little")[:, :num_categories]
+        return (matched @ w) * 2 + matched.sum(axis=1)
+    
+    def category_matrix(self) -> np.ndarray:
+        """행별 카테고리 포함 여부 (n, 카테고리 수) float32 행렬 (읽기 전용, 한 번만 생성)"""
+        if self._category_matrix is None:
+            num_categories = len(self.category_names)
+            bits = self.category_bits.astype("<u8", copy=False)
+            matrix = np.unpackbits(bits.view(np.uint8), axis=1, bitorder="little")[:, :num_categories]
+            matrix = matrix.astype(np.float32)
+            matrix.flags.writeable = False
+            self._category_matrix = matrix
+        return self._category_matrix
+    
+    def preference_scores(self, weights: dict) -> np.ndarray:
+        """
+        사용자 선호 점수 일괄 계산 (카테고리 행렬 x 선호 가중치 벡터 내적 한 번)
+        
+        Parameters:
+        - weights: {카테고리/태그 이름: 가중치} (음수 가능, 카탈로그에 없는 이름은 무시)
+        
+        Returns:
+        - np.ndarray: 행별 점수 (float64)
+        """
+        w = np.array([weights.get(name, 0.0) for name in self.category_names], dtype=np.float32)
+        return (self.category_matrix() @ w).astype(np.float64)
+    
+    def fingerprint(self) -> str:
+        """
+        카탈로그 버전 해시 (위치/좌표/소요시간/비용/점수/카테고리 기준)
+        
+        카탈로그 내용이 바뀌면 값이 달라지므로 루트 결과 캐시 무효화에 사용한다.
+        """
+        digest = hashlib.sha1()
+        for array in (self.location_id, self.lat, self.lon, self.duration_hours, self.cost,
+                      self.score, self.popularity, self.category_codes, self.category_offsets):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update("\x1f".join(self.category_names).encode("utf-8"))
+        return digest.hexdigest()
+    
+    def materialize(self, i: int, **changes) -> Activity:
+        """
+        i번 행을 새 Activity로 생성 (원본 행은 변경하지 않음)
+        
+        Parameters:
+        - changes: 덮어쓸 필드 (activity_order, activity_time 등)
+        """
+        activity = copy.copy(self.rows[i])
+        activity.priority_score = float(self.score[i])
+        for name, value in changes.items():
+            setattr(activity, name, value)
+        return activity
+
+
+class SharedActivityTable:
+    """
+    ActivityTable 배열을 공유 메모리 한 블록에 올려 워커 프로세스와 공유
+    
+    워커에는 handle(블록 이름 + 배열 위치)만 피클로 보내고, 워커는 attach()로 같은 메모리를
+    복사 없이 읽기 전용 배열로 연다. 원본 Activity 행(rows)은 공유하지 않으므로 워커가
+    materialize할 수 있는 행만 따로 넘긴다. 다 쓰면 만든 쪽에서 close()로 해제한다.
+    """
+    
+    ARRAYS = ("lat", "lon", "duration_hours", "cost", "score", "location_id", "popularity",
+              "category_codes", "category_offsets", "category_bits")
+    
+    def __init__(self, table: ActivityTable):
+        from multiprocessing import shared_memory
+        
+        # 배열별 위치 계산 (64바이트 정렬)
+        layout = []
+        size = 0
+        for name in self.ARRAYS:
+            array = getattr(table, name)
+            layout.append((name, array.dtype.str, array.shape, size))
+            size += -(-array.nbytes // 64) * 64
+        
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 64))
+        for name, dtype, shape, offset in layout:
+            np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)[...] = getattr(table, name)
+        
+        self.handle = {
+            "name": self.shm.name,
+            "layout": layout,
+            "category_names": list(table.category_names),
+        }
+    
+    def close(self):
+        """공유 메모리 해제 (이미 연 워커는 자기 매핑을 닫을 때까지 계속 읽을 수 있음)"""
+        self.shm.close()
+        self.shm.unlink()
+    
+    @staticmethod
+    def attach(handle: dict, rows) -> tuple:
+        """
+        워커 쪽: 공유 메모리 블록을 ActivityTable로 열기
+        
+        Parameters:
+        - handle: SharedActivityTable.handle
+        - rows: 인덱스 -> Activity (materialize할 행만 있어도 됨)
+        
+        Returns:
+        - (SharedMemory, ActivityTable): 테이블을 다 쓴 뒤 SharedMemory.close() 호출
+        """
+        from multiprocessing import shared_memory
+        
+        shm = shared_memory.SharedMemory(name=handle["name"])
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, dtype, shape, offset in handle["layout"]
+        }
+        return shm, ActivityTable(rows=rows, category_names=handle["category_names"], **arrays)
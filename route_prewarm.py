@@ -0,0 +1,70 @@
+"""
+인기 루트 템플릿 사전 생성 (야간 배치)
+
+route_preferences에서 최근/다가오는 수요가 많은 signature(테마, 이동수단, 일정 강도,
+여행 일수)를 찾아 가장 비싼 최적화 설정으로 루트를 미리 만들고 route_templates에 저장한다.
+route_api는 시작할 때(또는 /route-api/templates/reload 호출시) 템플릿을 불러와 같은
+signature 요청에 최적화 없이 바로 돌려준다.
+
+템플릿의 카탈로그 버전이 요청 시점 카탈로그와 같아야 사용되므로, 엔진은 route_api와
+같은 route_engine.build_route_system으로 만들고 같은 환경 변수(CATALOG_SOURCE,
+CATALOG_SNAPSHOT_DIR, DB_*)로 실행한다. 버전이 달라 쓰이지 못한 템플릿은 route_api
+로그("루트 템플릿 ... 사용 안 함")와 /route-api/health의 route_templates.stale로 확인한다.
+
+템플릿은 개인화 없이 만든 것이므로 저장된 선호 벡터가 있는 사용자(설문 응답 또는 루트
+평가가 있는 로그인 사용자 대부분)의 요청에는 쓰이지 않는다 (지표 route_template_skips_personalized).
+
+사용 예 (cron):
+    0 3 * * * python route_prewarm.py --limit 50 --solver-budget-ms 2000 --beam-width 32
+"""
+
+import argparse
+import time
+
+from AP_algorithm import RouteTemplateStore
+from route_engine import CATALOG_SOURCE, build_route_system, connect_db, open_catalog_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인기 루트 템플릿 사전 생성")
+    parser.add_argument("--lookback-days", type=int, default=90, help="최근 생성된 선호도 기간")
+    parser.add_argument("--horizon-days", type=int, default=30, help="다가오는 출발일 기간 (연휴 수요)")
+    parser.add_argument("--limit", type=int, default=50, help="최대 템플릿 수")
+    parser.add_argument("--min-count", type=int, default=2, help="최소 요청 수")
+    parser.add_argument("--solver", choices=["greedy", "beam"], default="beam")
+    parser.add_argument("--solver-budget-ms", type=float, default=2000)
+    parser.add_argument("--beam-width", type=int, default=32)
+    parser.add_argument("--local-search-ms", type=float, default=500)
+    parser.add_argument("--day-clustering", choices=["none", "kmeans", "sweep"], default="none")
+    args = parser.parse_args()
+
+    catalog_snapshot = open_catalog_snapshot()
+    conn = connect_db()
+    try:
+        db, system = build_route_system(
+            conn, catalog_snapshot,
+            local_search_budget_ms=args.local_search_ms,
+            day_clustering=args.day_clustering,
+            solver=args.solver,
+            solver_budget_ms=args.solver_budget_ms,
+            beam_width=args.beam_width,
+        )
+
+        t0 = time.perf_counter()
+        signatures = db.fetch_popular_signatures(
+            args.lookback_days, args.horizon_days, args.limit, args.min_count
+        )
+        store = RouteTemplateStore()
+        created = system.prewarm_templates(signatures, store)
+        saved = db.save_route_templates(store)
+        source = f"snapshot {catalog_snapshot.version}" if catalog_snapshot is not None else CATALOG_SOURCE
+        print(
+            f"템플릿 생성: signature {len(signatures)}개 중 {created}개, 저장 {saved}개 "
+            f"(카탈로그 {source}, {time.perf_counter() - t0:.1f}s)"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import datetime
+import sys
+from pathlib import Path
+
+import pytest
+
+# 루트 엔진 모듈은 저장소 최상위에 있다
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from AP_algorithm import TravelRecommendationSystem
+from route_benchmark import make_catalog
+from route_models import RoutePreference
+
+
+class StubDatabase:
+    """카탈로그 조회만 하는 DatabaseConnector 대역 (테마/지역과 무관하게 같은 카탈로그)"""
+
+    def __init__(self, activities):
+        self.activities = activities
+
+    def fetch_activities_by_theme(self, theme_id, transport_mode="public", region=None):
+        return list(self.activities)
+
+
+@pytest.fixture
+def make_system():
+    """카탈로그(기본: 서울 합성 400곳) + 엔진 설정 -> TravelRecommendationSystem (테스트 끝에 close)"""
+    systems = []
+
+    def factory(catalog=None, **settings):
+        if catalog is None:
+            catalog = make_catalog(400, "seoul", 4)
+        system = TravelRecommendationSystem(StubDatabase(catalog), **settings)
+        systems.append(system)
+        return system
+
+    yield factory
+    for system in systems:
+        system.close()
+
+
+@pytest.fixture
+def make_preference():
+    """여행 일수 + RoutePreference 필드 -> 2025-01-01에 시작하는 선호"""
+
+    def factory(days=3, start=datetime.date(2025, 1, 1), **fields):
+        fields.setdefault("user_id", 1)
+        return RoutePreference(start_date=start, end_date=start + datetime.timedelta(days=days - 1),
+                               **fields)
+
+    return factory
+
+
+class FakeCursor:
+    """실행한 SQL을 연결에 기록하는 pymysql cursor 대역 (INSERT는 auto increment ID 발급)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.conn.queries.append((sql, params))
+        self._rows = next((rows for key, rows in self.conn.results.items() if key in sql), [])
+        if sql.startswith("SELECT @@auto_increment_increment"):
+            self._rows = [{"step": self.conn.step}]
+        elif sql.startswith("INSERT"):
+            # 다중 행 INSERT: 첫 행 ID를 돌려주고 행마다 step씩 증가
+            rows = sql.split(" VALUES ", 1)[1].count("), (") + 1
+            self.lastrowid = self.conn.next_id
+            self.conn.next_id += rows * self.conn.step
+
+    def executemany(self, sql, rows):
+        self.conn.queries.append((" ".join(sql.split()), list(rows)))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    pymysql 연결 대역
+
+    - queries: 실행한 (SQL, 파라미터) 목록 (공백 정리됨)
+    - results: SQL에 포함된 문자열 -> 반환할 dict 행 목록 (처음 맞는 항목)
+    - step: auto_increment_increment
+    """
+
+    def __init__(self, step=1, next_id=100):
+        self.step = step
+        self.next_id = next_id
+        self.results = {}
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def statements(self, prefix):
+        return [(sql, params) for sql, params in self.queries if sql.startswith(prefix)]
+
+
+@pytest.fixture
+def fake_connection():
+    return FakeConnection()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from AP_algorithm import TravelRecommendationSystem
+from route_benchmark import make_catalog
+from route_models import ActivityTable
+
+
+@pytest.fixture
+def catalog():
+    catalog = make_catalog(200, "seoul", 4)
+    for i, activity in enumerate(catalog):
+        activity.popularity_score = (i % 10) / 10
+        activity.priority_score = float(i)
+    return catalog
+
+
+@pytest.fixture
+def table(catalog):
+    return ActivityTable.from_activities(catalog)
+
+
+@pytest.mark.parametrize("theme", [
+    None,
+    {"food": 2.0, "museum": 1.0},
+    {"park": -1.0, "market": 0.5, "unknown": 3.0},
+])
+def test_match_scores_agree_with_single_activity_score(catalog, table, theme):
+    system = TravelRecommendationSystem(None)
+    categories = theme if theme is not None else table.category_names
+    expected = [system.calculate_match_score(a, categories) for a in catalog]
+
+    np.testing.assert_allclose(table.match_scores(theme), expected)
+
+
+def test_preference_scores_are_weight_sums(catalog, table):
+    weights = {"food": 0.8, "museum": -0.5, "not-in-catalog": 10.0}
+    expected = [sum(weights.get(cat, 0.0) for cat in set(a.categories)) for a in catalog]
+
+    np.testing.assert_allclose(table.preference_scores(weights), expected, rtol=1e-6)
+
+
+def test_take_keeps_rows_scores_and_categories(catalog, table):
+    order = np.argsort(-table.score)[:50]
+    subset = table.take(order)
+
+    assert [subset.rows[i].location_id for i in range(len(subset))] == \
+        [catalog[i].location_id for i in order]
+    np.testing.assert_array_equal(subset.score, table.score[order])
+    np.testing.assert_array_equal(subset.popularity, table.popularity[order])
+    np.testing.assert_allclose(subset.match_scores({"food": 1.0}), table.match_scores({"food": 1.0})[order])
+    for i, j in enumerate(order):
+        names = {subset.category_names[c]
+                 for c in subset.category_codes[subset.category_offsets[i]:subset.category_offsets[i + 1]]}
+        assert names == set(catalog[j].categories)
+
+
+def test_fingerprint_changes_with_scores(table):
+    assert table.fingerprint() == ActivityTable.from_activities(list(table.rows)).fingerprint()
+    assert table.with_scores(table.score + 1).fingerprint() != table.fingerprint()
+
+
+def test_arrays_are_read_only(table):
+    with pytest.raises(ValueError):
+        table.score[0] = 1.0
+    assert not table.with_scores(table.score).score.flags.writeable
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from route_benchmark import make_catalog
+
+
+def _key(result):
+    activities, distance, _ = result
+    return sum(a.priority_score for a in activities), -distance
+
+
+def _end_hours(activities):
+    last = activities[-1]
+    return last.activity_time.hour + last.activity_time.minute / 60 + last.avg_duration_hours
+
+
+@pytest.fixture
+def system(make_system):
+    return make_system(make_catalog(300, "busan", 2), solver_budget_ms=2000, beam_width=8)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("schedule_type, max_hours", [("relaxed", 10), ("packed", 14)])
+def test_beam_never_worse_than_greedy(system, seed, schedule_type, max_hours):
+    table = system.prepare_catalog(0)
+    matrix = system.build_distance_matrix(table)
+    candidates = np.sort(np.random.default_rng(seed).choice(len(table), 60, replace=False))
+    options = dict(start_time=9, target_count=5, schedule_type=schedule_type,
+                   distance_matrix=matrix, candidate_indices=candidates)
+
+    greedy = system.optimize_daily_route(table, **options)
+    beam = system.solve_daily_orienteering(table, **options)
+
+    assert _key(beam) >= _key(greedy)
+    activities = beam[0]
+    assert {a.location_id for a in activities} <= set(table.location_id[candidates].tolist())
+    assert len({a.location_id for a in activities}) == len(activities)
+    assert [a.activity_order for a in activities] == list(range(1, len(activities) + 1))
+    assert _end_hours(activities) <= 9 + max_hours + 1 / 60
+
+
+def test_beam_route_improves_some_days(system, make_preference):
+    route = system.generate_route(make_preference(days=4, schedule_type="packed"), solver="beam")
+    assert route.trace["counters"].get("solver_improved_days", 0) > 0
+    for day in route.itinerary:
+        assert _end_hours(day.activities) <= 9 + 14 + 1 / 60
+
+
+def test_zero_budget_falls_back_to_greedy(system):
+    table = system.prepare_catalog(0)
+    greedy = system.optimize_daily_route(table, target_count=5)
+    beam = system.solve_daily_orienteering(table, target_count=5, time_budget_ms=0)
+    assert _key(beam) >= _key(greedy)
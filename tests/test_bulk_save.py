@@ -0,0 +1,53 @@
+import pytest
+
+from AP_algorithm import DatabaseConnector
+from route_benchmark import make_catalog
+
+
+@pytest.mark.parametrize("step", [1, 2, 5])
+def test_bulk_insert_ids_follow_auto_increment_step(fake_connection, step):
+    fake_connection.step = step
+    db = DatabaseConnector(fake_connection)
+    db.BULK_INSERT_CHUNK = 4
+    cursor = db._cursor()
+
+    ids = db._bulk_insert(cursor, "INSERT INTO t (a, b) VALUES ", "(%s, %s)", [(k, k) for k in range(10)])
+    more = db._bulk_insert(cursor, "INSERT INTO t (a, b) VALUES ", "(%s, %s)", [(0, 0)])
+
+    assert ids == [100 + k * step for k in range(10)]
+    assert more == [100 + 10 * step]
+    inserts = fake_connection.statements("INSERT INTO t")
+    assert [len(params) // 2 for _, params in inserts] == [4, 4, 2, 1]
+    # auto_increment_increment는 연결당 한 번만 조회
+    assert len(fake_connection.statements("SELECT @@auto_increment_increment")) == 1
+    assert db._bulk_insert(cursor, "INSERT INTO t (a) VALUES ", "(%s)", []) == []
+
+
+def test_save_routes_links_derived_ids(make_system, make_preference, fake_connection):
+    fake_connection.step = 2
+    system = make_system(make_catalog(300, "busan", 8))
+    preferences = [make_preference(days=2, user_id=1), make_preference(days=3, user_id=2)]
+    routes = [system.generate_route(p) for p in preferences]
+    db = DatabaseConnector(fake_connection)
+
+    route_ids = db.save_routes(routes, preferences)
+
+    # 테이블마다 INSERT 한 번
+    tables = [sql.split()[2] for sql, _ in fake_connection.statements("INSERT")]
+    assert tables == ["route_preferences", "recommended_routes", "route_itinerary", "itinerary_activities"]
+    assert fake_connection.commits == 1
+
+    assert route_ids == [r.route_id for r in routes]
+    assert preferences[1].preference_id - preferences[0].preference_id == 2
+    dailies = [d for r in routes for d in r.itinerary]
+    activities = [a for d in dailies for a in d.activities]
+    assert [d.itinerary_id for d in dailies] == list(range(dailies[0].itinerary_id, dailies[0].itinerary_id + 2 * len(dailies), 2))
+    assert len({a.activity_id for a in activities}) == len(activities)
+    assert all(d.route_id == r.route_id for r in routes for d in r.itinerary)
+    assert all(a.itinerary_id == d.itinerary_id for d in dailies for a in d.activities)
+
+    # 활동 INSERT 행의 itinerary_id가 부모 일정의 계산된 ID
+    _, params = fake_connection.statements("INSERT INTO itinerary_activities")[0]
+    assert params[::13] == [a.itinerary_id for a in activities]
+    _, params = fake_connection.statements("INSERT INTO route_itinerary")[0]
+    assert params[::4] == [d.route_id for d in dailies]
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from catalog_api_client import CatalogApiClient, CatalogApiError
+from route_metrics import MetricsRegistry
+
+ITEMS = [{"location_id": i} for i in range(35)]
+
+
+def _page(request, total=None):
+    offset = int(request.url.params["offset"])
+    limit = int(request.url.params["limit"])
+    body = {"success": True, "data": ITEMS[offset:offset + limit]}
+    if total is not None:
+        body["total"] = total
+    return httpx.Response(200, json=body)
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(handler, **kwargs):
+        options = dict(base_url="http://catalog.test", token=None, page_size=10,
+                       backoff_base=0.001, backoff_max=0.001, metrics=MetricsRegistry())
+        options.update(kwargs)
+        client = CatalogApiClient(transport=httpx.MockTransport(handler), **options)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_retries_on_503(make_client):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return _page(request, total=5)
+
+    client = make_client(handler, page_size=100)
+    assert client.fetch_locations({"theme_id": 1}) == ITEMS
+    assert len(calls) == 2
+    assert client.metrics.snapshot()["counters"]["catalog_api_retries"] == 1
+
+
+def test_attempt_deadline_is_retried(make_client):
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return _page(request, total=5)
+
+    client = make_client(handler, page_size=100, attempt_timeout=0.05, total_timeout=5)
+    start = time.perf_counter()
+    assert client.fetch_locations({}) == ITEMS
+    assert len(calls) == 2
+    assert time.perf_counter() - start < 0.9
+
+
+def test_hedged_request_wins(make_client):
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+        return _page(request, total=5)
+
+    client = make_client(handler, page_size=100, hedge_after=0.05, attempt_timeout=2)
+    start = time.perf_counter()
+    assert client.fetch_locations({}) == ITEMS
+    assert time.perf_counter() - start < 0.9
+    assert len(calls) == 2
+    assert client.metrics.snapshot()["counters"]["catalog_api_hedges"] == 1
+
+
+def test_pages_with_total_are_fetched_concurrently(make_client):
+    offsets = []
+
+    def handler(request):
+        offsets.append(int(request.url.params["offset"]))
+        assert request.url.params["theme_id"] == "3"
+        return _page(request, total=len(ITEMS))
+
+    client = make_client(handler)
+    assert client.fetch_locations({"theme_id": 3}) == ITEMS
+    assert sorted(offsets) == [0, 10, 20, 30]
+
+
+def test_pages_without_total_stop_at_short_page(make_client):
+    offsets = []
+
+    def handler(request):
+        offsets.append(int(request.url.params["offset"]))
+        return _page(request)
+
+    client = make_client(handler)
+    assert client.fetch_locations({}) == ITEMS
+    assert offsets == [0, 10, 20, 30]
+
+
+def test_non_json_body_is_retried_then_reported(make_client):
+    def handler(request):
+        return httpx.Response(200, text="<html>bad gateway</html>")
+
+    client = make_client(handler, retries=1)
+    with pytest.raises(CatalogApiError, match="bad gateway"):
+        client.fetch_locations({})
@@ -0,0 +1,93 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from AP_algorithm import TravelRecommendationSystem
+from catalog_snapshot import CatalogSnapshot
+from route_benchmark import make_catalog
+from route_models import RoutePreference
+
+
+THEMES = {
+    1: {"categories": {"food": 2.0, "market": 1.0}, "tags": {}},
+    2: {"categories": {"museum": 1.0}, "tags": {"palace": (1.5, True)}},
+}
+
+
+def _rows(activities):
+    rows = [
+        dict(location_id=a.location_id, name=a.location_name, address=f"addr-{a.location_id}",
+             latitude=a.lat, longitude=a.lon, category_id=7, category_name=a.categories[0],
+             duration_minutes=a.estimated_duration_minutes, cost=a.estimated_cost,
+             popularity_score=0.25)
+        for a in activities
+    ]
+    tags = {a.location_id: a.categories[1:] for a in activities}
+    return rows, tags
+
+
+@pytest.fixture
+def catalog():
+    return make_catalog(500, "seoul", 3)
+
+
+@pytest.fixture
+def snapshot(tmp_path, catalog):
+    rows, tags = _rows(catalog)
+    CatalogSnapshot.write(tmp_path, rows, tags, themes=THEMES)
+    return CatalogSnapshot.open(tmp_path)
+
+
+def test_round_trip(snapshot, catalog):
+    assert len(snapshot) == len(catalog)
+    for i in (0, 17, len(catalog) - 1):
+        activity = snapshot.activity(i)
+        source = catalog[i]
+        assert activity.location_id == source.location_id
+        assert activity.lat == source.lat and activity.lon == source.lon
+        assert activity.location_address == f"addr-{source.location_id}"
+        assert activity.categories == source.categories
+        assert activity.estimated_duration_minutes == source.estimated_duration_minutes
+        assert activity.estimated_cost == (source.estimated_cost or None)
+        assert activity.popularity_score == 0.25
+
+    table = snapshot.table()
+    np.testing.assert_array_equal(table.location_id, [a.location_id for a in catalog])
+    assert table.materialize(3).location_id == catalog[3].location_id
+
+
+def test_version_is_content_hash(tmp_path, snapshot, catalog):
+    rows, tags = _rows(catalog)
+    assert CatalogSnapshot.write(tmp_path, rows, tags, themes=THEMES).version == snapshot.version
+
+    rows[0]["latitude"] += 0.01
+    changed = CatalogSnapshot.write(tmp_path, rows, tags, themes=THEMES)
+    assert changed.version != snapshot.version
+    assert CatalogSnapshot.open(tmp_path).version == changed.version
+
+    # 테마 규칙만 바뀌어도 새 버전
+    assert CatalogSnapshot.write(tmp_path, rows, tags, themes={}).version != changed.version
+
+
+def test_theme_rows_follow_theme_rules(snapshot, catalog):
+    expected_food = [i for i, a in enumerate(catalog) if {"food", "market"} & set(a.categories)]
+    expected_museum = [i for i, a in enumerate(catalog)
+                       if "museum" in a.categories and "palace" in a.categories]
+    assert snapshot.theme_rows(1).tolist() == expected_food
+    assert snapshot.theme_rows(2).tolist() == expected_museum
+    assert snapshot.theme_rows(99) is None
+    assert snapshot.theme_weights(2) == {"museum": 1.0, "palace": 1.5}
+
+
+def test_engine_uses_theme_candidates(snapshot):
+    system = TravelRecommendationSystem(None, catalog_snapshot=snapshot)
+    start = datetime.date(2025, 1, 1)
+    route = system.generate_route(RoutePreference(theme_id=1, start_date=start, end_date=start))
+    activities = route.itinerary[0].activities
+    assert activities
+    assert all({"food", "market"} & set(a.categories) for a in activities)
+
+    # 테마 규칙도 엔진 가중치도 없으면 전체 카탈로그로 대신하지 않는다
+    with pytest.raises(Exception, match="테마 규칙"):
+        system.generate_route(RoutePreference(theme_id=99, start_date=start, end_date=start))
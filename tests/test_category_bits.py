@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+
+from AP_algorithm import TravelRecommendationSystem
+from route_benchmark import make_catalog
+from route_models import ActivityTable
+
+NAMES = [f"cat-{k}" for k in range(150)]
+
+
+@pytest.fixture
+def catalog():
+    # 카테고리 150개 -> uint64 3워드, 일부 활동은 같은 카테고리를 중복으로 가진다
+    rng = random.Random(3)
+    catalog = make_catalog(120, "jeju", 1)
+    for activity in catalog:
+        categories = rng.sample(NAMES, rng.randint(1, 6))
+        activity.categories = categories + categories[:rng.randint(0, 2)]
+    return catalog
+
+
+@pytest.fixture
+def table(catalog):
+    return ActivityTable.from_activities(catalog)
+
+
+def test_bits_span_multiple_words(catalog, table):
+    assert table.category_bits.shape == (len(catalog), -(-len(table.category_names) // 64))
+    assert table.category_bits.shape[1] >= 3
+
+    for i, activity in enumerate(catalog):
+        codes = {table.category_names.index(name) for name in activity.categories}
+        expected = np.zeros(table.category_bits.shape[1], dtype=np.uint64)
+        for code in codes:
+            expected[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        np.testing.assert_array_equal(table.category_bits[i], expected)
+        assert table.category_matrix()[i].sum() == len(codes)
+
+
+def test_mask_ignores_unknown_names(table):
+    last = table.category_names[-1]
+    mask = table.category_mask([last, last, "not-a-category"])
+    code = len(table.category_names) - 1
+    assert mask[code // 64] == np.uint64(1) << np.uint64(code % 64)
+    assert int(np.count_nonzero(mask)) == 1
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_weighted_scores_count_duplicates_once(catalog, table, seed):
+    rng = random.Random(seed)
+    weights = {name: rng.choice([-1.0, 0.0, 0.5, 2.0]) for name in rng.sample(NAMES, 60)}
+    system = TravelRecommendationSystem(None)
+    expected = [system.calculate_match_score(a, weights) for a in catalog]
+
+    np.testing.assert_allclose(table.match_scores(weights), expected)
+    np.testing.assert_allclose(
+        table.preference_scores(weights),
+        [sum(weights.get(name, 0.0) for name in set(a.categories)) for a in catalog], rtol=1e-6
+    )
+
+
+def test_theme_filter_matches_any_word(table):
+    high = list(table.category_names[128:131])
+    rows = np.flatnonzero((table.category_bits & table.category_mask(high)).any(axis=1))
+    expected = [i for i, row in enumerate(table.rows) if set(row.categories) & set(high)]
+    assert rows.tolist() == expected and expected
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from AP_algorithm import _project_km, cluster_day_groups
+from route_benchmark import make_catalog
+
+
+def _coords(seed, size=300):
+    catalog = make_catalog(size, "korea", seed)
+    return np.array([a.lat for a in catalog]), np.array([a.lon for a in catalog])
+
+
+def _spread(points, groups):
+    return sum(np.linalg.norm(points[g] - points[g].mean(axis=0), axis=1).sum() for g in groups)
+
+
+@pytest.mark.parametrize("method", ["kmeans", "sweep"])
+@pytest.mark.parametrize("num_days", [1, 3, 7])
+def test_groups_partition_candidates_within_capacity(method, num_days):
+    lats, lons = _coords(0, size=301)
+    groups = cluster_day_groups(lats, lons, num_days, method=method)
+
+    assert len(groups) == num_days
+    assert sorted(np.concatenate(groups).tolist()) == list(range(301))
+    assert max(g.size for g in groups) <= -(-301 // num_days)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("num_days", [3, 5])
+def test_kmeans_groups_are_tighter_than_sweep(seed, num_days):
+    lats, lons = _coords(seed)
+    points = _project_km(lats, lons)
+    kmeans = cluster_day_groups(lats, lons, num_days, method="kmeans")
+    sweep = cluster_day_groups(lats, lons, num_days, method="sweep")
+    assert _spread(points, kmeans) <= _spread(points, sweep)
+
+
+def test_best_scored_group_comes_first():
+    lats, lons = _coords(1)
+    scores = np.random.default_rng(0).random(lats.size)
+    groups = cluster_day_groups(lats, lons, 4, scores=scores)
+    assert int(np.argmax(scores)) in groups[0]
+    assert [scores[g].max() for g in groups] == sorted((scores[g].max() for g in groups), reverse=True)
+
+
+def test_degenerate_inputs():
+    lats, lons = _coords(2, size=3)
+    assert len(cluster_day_groups(lats, lons, 5)) == 3
+    assert [g.size for g in cluster_day_groups(np.empty(0), np.empty(0), 3)] == [0]
+    with pytest.raises(ValueError):
+        cluster_day_groups(lats, lons, 2, method="dbscan")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_each_day_stays_in_its_group(make_system, make_preference, seed):
+    system = make_system(make_catalog(400, "korea", seed), day_clustering="kmeans")
+    table = system.prepare_catalog(0)
+    groups = cluster_day_groups(table.lat, table.lon, 3, scores=table.score)
+
+    route = system.generate_route(make_preference(days=3))
+    for day, group in zip(route.itinerary, groups):
+        assert day.activities
+        assert {a.location_id for a in day.activities} <= set(table.location_id[group].tolist())
@@ -0,0 +1,33 @@
+import dataclasses
+
+import pytest
+
+from route_benchmark import make_catalog
+
+
+def _route_bytes(route):
+    route.trace = None
+    route.generated_at = None
+    return repr(dataclasses.asdict(route))
+
+
+@pytest.mark.parametrize("settings", [
+    {"day_clustering": "kmeans"},
+    {"day_clustering": "sweep", "candidate_mode": "spatial"},
+    {"day_clustering": "kmeans", "solver": "beam", "solver_budget_ms": 10000},
+])
+def test_parallel_days_match_sequential(make_system, make_preference, settings):
+    preferences = [make_preference(days=6), make_preference(days=4, schedule_type="packed")]
+    sequential = make_system(make_catalog(800, "seoul", 3), **settings)
+    parallel = make_system(make_catalog(800, "seoul", 3), day_workers=2, **settings)
+    submitted = []
+    submit_days = parallel._submit_days
+    parallel._submit_days = lambda *args: submitted.append(args) or submit_days(*args)
+
+    # 같은 워커 풀로 여러 루트를 연속 생성 (이전 루트의 공유 메모리가 남지 않아야 함)
+    for preference in preferences + preferences:
+        expected = sequential.generate_route(preference)
+        actual = parallel.generate_route(preference)
+        assert actual.trace["counters"]["days"] == len(expected.itinerary)
+        assert _route_bytes(actual) == _route_bytes(expected)
+    assert len(submitted) == 4
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from AP_algorithm import DistanceMatrix, haversine_matrix
+from route_benchmark import make_catalog
+
+
+@pytest.fixture
+def points():
+    activities = make_catalog(300, "korea", 6)
+    return np.array([a.lat for a in activities]), np.array([a.lon for a in activities])
+
+
+def test_haversine_matrix_matches_scalar_distance(make_system, points):
+    system = make_system()
+    lats, lons = points
+    matrix = haversine_matrix(lats, lons)
+    rng = np.random.default_rng(0)
+    for i, j in rng.integers(0, lats.size, size=(50, 2)):
+        assert matrix[i, j] == pytest.approx(system.calculate_distance(lats[i], lons[i], lats[j], lons[j]))
+    np.testing.assert_allclose(matrix, matrix.T)
+    np.testing.assert_allclose(np.diag(matrix), 0.0, atol=1e-9)
+
+
+def test_distance_matrix_rows_match_full_matrix(points):
+    lats, lons = points
+    full = haversine_matrix(lats, lons)
+    matrix = DistanceMatrix(lats, lons)
+
+    np.testing.assert_allclose(matrix.row(7), full[7])
+    assert matrix.row(7) is matrix.row(7)
+    np.testing.assert_allclose(matrix[3, [1, 5, 9]], full[3, [1, 5, 9]])
+    subset = [4, 0, 11]
+    np.testing.assert_allclose(matrix.pairwise(subset), full[np.ix_(subset, subset)])
+
+
+def test_daily_distance_is_sum_of_legs(make_system):
+    system = make_system()
+    table = system.prepare_catalog(0)
+    selected, total_distance, _ = system.optimize_daily_route(
+        table, distance_matrix=system.build_distance_matrix(table)
+    )
+    legs = sum(system.calculate_distance(a.lat, a.lon, b.lat, b.lon)
+               for a, b in zip(selected, selected[1:]))
+    assert len(selected) > 1
+    assert total_distance == pytest.approx(legs)
+    # 미리 만든 거리 행렬을 넘기지 않아도 같은 일정
+    again, distance, _ = system.optimize_daily_route(table)
+    assert [a.location_id for a in again] == [a.location_id for a in selected]
+    assert distance == pytest.approx(total_distance)
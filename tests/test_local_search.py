@@ -0,0 +1,62 @@
+import datetime
+import random
+
+import pytest
+
+from route_benchmark import make_catalog
+from route_models import Activity
+
+
+def _length(system, activities):
+    return sum(system.calculate_distance(a.lat, a.lon, b.lat, b.lon)
+               for a, b in zip(activities, activities[1:]))
+
+
+def _end_hours(activities):
+    last = activities[-1]
+    return last.activity_time.hour + last.activity_time.minute / 60 + last.avg_duration_hours
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_local_search_never_lengthens_and_stays_in_window(make_system, seed):
+    system = make_system()
+    day = random.Random(seed).sample(make_catalog(200, "seoul", seed), 6)
+    for activity in day:
+        activity.estimated_duration_minutes = 60
+    ids = sorted(a.location_id for a in day)
+    before_length = _length(system, day)
+
+    result, before, after = system.improve_daily_route(
+        day, start_time=9, schedule_type="packed", time_budget_ms=200
+    )
+
+    assert before == pytest.approx(before_length)
+    assert after <= before + 1e-9
+    assert after == pytest.approx(_length(system, result))
+    assert sorted(a.location_id for a in result) == ids
+    assert [a.activity_order for a in result] == list(range(1, 7))
+    assert [a.activity_time for a in result] == sorted(a.activity_time for a in result)
+    assert _end_hours(result) <= 9 + 14 + 1 / 60
+
+
+def test_crossing_path_is_uncrossed(make_system):
+    system = make_system()
+    corners = [(37.50, 127.00), (37.52, 127.02), (37.50, 127.02), (37.52, 127.00)]
+    day = [Activity(location_id=k + 1, activity_name=str(k), lat=lat, lon=lon,
+                    estimated_duration_minutes=30, categories=[])
+           for k, (lat, lon) in enumerate(corners)]
+
+    result, before, after = system.improve_daily_route(day, time_budget_ms=200)
+    assert after < before * 0.8
+    assert result[0].activity_time == datetime.time(9, 0)
+
+
+def test_engine_stage_only_reorders_each_day(make_system, make_preference):
+    catalog = make_catalog(400, "seoul", 4)
+    preference = make_preference(days=3)
+    plain = make_system(catalog).generate_route(preference)
+    improved = make_system(catalog, local_search_budget_ms=200).generate_route(preference)
+
+    for a, b in zip(plain.itinerary, improved.itinerary):
+        assert sorted(x.location_id for x in a.activities) == sorted(x.location_id for x in b.activities)
+        assert b.total_distance <= a.total_distance + 0.01
@@ -0,0 +1,25 @@
+import pytest
+
+from route_models import popularity_score
+
+
+def test_popularity_without_reviews_is_prior_only():
+    # 평점 = 사전값 3.5 -> (3.5 - 1) / 4 = 0.625, 규모 0
+    assert popularity_score() == pytest.approx(0.7 * 0.625)
+
+
+def test_popularity_rewards_rating_and_volume():
+    few_good = popularity_score(review_count=3, rating_sum=15.0)
+    many_good = popularity_score(review_count=300, rating_sum=1500.0, like_count=200)
+    many_bad = popularity_score(review_count=300, rating_sum=300.0)
+
+    assert popularity_score() < few_good < many_good
+    assert many_bad < popularity_score()
+    assert 0.0 <= many_bad and many_good <= 1.0
+
+
+def test_popularity_external_rating_uses_external_count():
+    own = popularity_score(review_count=10, rating_sum=30.0)
+    assert popularity_score(review_count=10, rating_sum=30.0, external_review_count=500) == own
+    assert popularity_score(review_count=10, rating_sum=30.0,
+                            external_rating=4.8, external_review_count=500) > own
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from AP_algorithm import DatabaseConnector, haversine_matrix, region_bounds, region_mask
+from route_benchmark import make_catalog
+
+
+@pytest.fixture
+def catalog():
+    activities = make_catalog(3000, "korea", 1)
+    return (np.array([a.lat for a in activities]), np.array([a.lon for a in activities]))
+
+
+def test_radius_mask_matches_haversine(catalog):
+    lats, lons = catalog
+    region = ("radius", 37.5796, 126.9770, 25.0)
+    expected = haversine_matrix([37.5796], [126.9770], lats, lons)[0] <= 25.0
+    np.testing.assert_array_equal(region_mask(region, lats, lons), expected)
+    assert expected.any()
+
+
+def test_bbox_mask_includes_edges(catalog):
+    lats, lons = catalog
+    region = ("bbox", 35.0, 128.9, 35.3, 129.3)
+    expected = (lats >= 35.0) & (lats <= 35.3) & (lons >= 128.9) & (lons <= 129.3)
+    np.testing.assert_array_equal(region_mask(region, lats, lons), expected)
+    assert region_mask(region, [35.0, 35.3], [128.9, 129.3]).all()
+
+
+@pytest.mark.parametrize("lat", [0.0, 37.5, 60.0])
+def test_radius_bounds_enclose_circle(lat):
+    min_lat, min_lon, max_lat, max_lon = region_bounds(("radius", lat, 10.0, 50.0))
+    grid_lat, grid_lon = np.meshgrid(np.linspace(lat - 1, lat + 1, 201),
+                                     np.linspace(9.0, 11.0, 201))
+    inside = haversine_matrix([lat], [10.0], grid_lat.ravel(), grid_lon.ravel())[0] <= 50.0
+    assert (grid_lat.ravel()[inside] >= min_lat).all() and (grid_lat.ravel()[inside] <= max_lat).all()
+    assert (grid_lon.ravel()[inside] >= min_lon).all() and (grid_lon.ravel()[inside] <= max_lon).all()
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = [("value",)]
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.queries.append((sql, params))
+        if "ST_GEOMETRY_COLUMNS" in sql:
+            self._rows = [{"srs_id": self.conn.srid}]
+        else:
+            self._rows = [{"location_id": 3}, {"location_id": 8}]
+
+    def fetchall(self):
+        return self._rows
+
+
+class _FakeConnection:
+    def __init__(self, srid):
+        self.srid = srid
+        self.queries = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+
+@pytest.mark.parametrize("srid", [4326, None])
+def test_region_query_matches_column_srid(srid):
+    conn = _FakeConnection(srid)
+    db = DatabaseConnector(conn)
+    region = ("radius", 37.5, 127.0, 5.0)
+    assert db.fetch_region_location_ids(region).tolist() == [3, 8]
+    assert db.fetch_region_location_ids(region).tolist() == [3, 8]
+
+    # SRID 조회는 연결마다 한 번
+    region_queries = [q for q in conn.queries if "FROM locations" in q[0]]
+    assert len(conn.queries) - len(region_queries) == 1
+    sql, params = region_queries[0]
+    if srid == 4326:
+        assert "ST_GeomFromText(%s, 4326, 'axis-order=long-lat')" in sql
+        assert "ST_SRID(POINT(%s, %s), 4326)" in sql
+        assert params[0].startswith("POLYGON((")
+    else:
+        assert "ST_MakeEnvelope" in sql and "4326" not in sql
+    assert "latitude BETWEEN %s AND %s" in sql
@@ -0,0 +1,109 @@
+import copy
+import datetime
+
+import pytest
+
+from AP_algorithm import DatabaseConnector
+from route_benchmark import make_catalog
+
+
+@pytest.fixture
+def catalog():
+    catalog = make_catalog(300, "seoul", 2)
+    for activity in catalog:
+        activity.estimated_duration_minutes = 240
+    return catalog
+
+
+@pytest.fixture
+def system(make_system, catalog):
+    return make_system(catalog)
+
+
+@pytest.fixture
+def preference(make_preference):
+    return make_preference(days=2)
+
+
+class _SavedRouteConnector(DatabaseConnector):
+    """load_route는 메모리의 저장 루트 사본을 반환, 나머지 SQL은 fake 연결에 기록"""
+
+    def __init__(self, conn, route, preference):
+        super().__init__(conn)
+        self.saved = (route, preference)
+
+    def load_route(self, route_id):
+        return copy.deepcopy(self.saved)
+
+
+def _saved(route):
+    """저장된 루트처럼 route/itinerary/activity ID 채우기"""
+    route.route_id = 1
+    activity_id = 1
+    for daily in route.itinerary:
+        daily.route_id = route.route_id
+        daily.itinerary_id = daily.day_number
+        for activity in daily.activities:
+            activity.itinerary_id = daily.itinerary_id
+            activity.activity_id = activity_id
+            activity_id += 1
+    return route
+
+
+def test_pins_over_day_window_are_rejected(system, preference, catalog):
+    route = system.generate_route(preference)
+    used = {a.location_id for day in route.itinerary for a in day.activities}
+    pins = [a.location_id for a in catalog if a.location_id not in used][:5]
+
+    with pytest.raises(ValueError, match="하루 일정"):
+        system.replan_itinerary_day(route, preference, 1, pin=pins)
+
+
+def test_reorder_over_day_window_is_rejected(system, preference):
+    route = system.generate_route(preference)
+    day = route.itinerary[0]
+    day.activities = day.activities + [a for d in route.itinerary[1:] for a in d.activities]
+    order = [a.location_id for a in day.activities]
+
+    with pytest.raises(ValueError, match="하루 일정"):
+        system.replan_itinerary_day(route, preference, 1, reorder=order)
+
+
+def test_pins_within_day_window_are_kept(system, preference):
+    route = system.generate_route(preference)
+    pins = [a.location_id for a in route.itinerary[0].activities][:2]
+
+    daily = system.replan_itinerary_day(route, preference, 1, pin=pins)
+    assert [a.location_id for a in daily.activities][:2] == pins
+    assert all(a.activity_time < datetime.time(23, 0) for a in daily.activities)
+
+
+def test_reorder_is_written_back(system, preference, fake_connection):
+    route = _saved(system.generate_route(preference))
+    system.db = _SavedRouteConnector(fake_connection, route, preference)
+    old = route.itinerary[0].activities
+    order = [a.location_id for a in reversed(old)]
+
+    updated = system.replan_day(route.route_id, 1, reorder=order)
+
+    new = updated.itinerary[0].activities
+    assert [a.location_id for a in new] == order
+    saved = {a.activity_id: (a.activity_order, a.activity_time) for a in old}
+    expected = {(a.activity_order, a.activity_time, a.activity_id) for a in new
+                if (a.activity_order, a.activity_time) != saved[a.activity_id]}
+    [(sql, rows)] = fake_connection.statements("UPDATE itinerary_activities")
+    assert len(old) > 1 and expected and set(rows) == expected
+    assert not fake_connection.statements("DELETE") and not fake_connection.statements("INSERT")
+    assert fake_connection.commits == 1
+
+
+def test_rejected_reorder_leaves_route_untouched(system, preference):
+    route = system.generate_route(preference)
+    day = route.itinerary[0]
+    day.activities = day.activities + [a for d in route.itinerary[1:] for a in d.activities]
+    before = [(a.activity_order, a.activity_time) for a in day.activities]
+
+    with pytest.raises(ValueError, match="하루 일정"):
+        system.replan_itinerary_day(route, preference, 1, reorder=[a.location_id for a in day.activities])
+    assert route.itinerary[0] is day
+    assert [(a.activity_order, a.activity_time) for a in day.activities] == before
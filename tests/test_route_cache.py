@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+
+from AP_algorithm import RouteResultCache, route_signature
+from route_benchmark import make_catalog
+
+
+@pytest.fixture
+def cache():
+    return RouteResultCache()
+
+
+@pytest.fixture
+def system(make_system, cache):
+    return make_system(make_catalog(400, "seoul", 4), route_cache=cache)
+
+
+def _plan(route):
+    return [[a.location_id for a in day.activities] for day in route.itinerary]
+
+
+def test_hit_is_rebased_copy_without_optimizer(system, cache, make_preference):
+    first = system.generate_route(make_preference(days=3, user_id=1))
+    later = make_preference(days=3, user_id=2, start=datetime.date(2025, 5, 10))
+    hit = system.generate_route(later)
+
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "invalidations": 0}
+    assert hit.trace["counters"]["route_cache_hits"] == 1
+    assert "optimize" not in hit.trace["phases_ms"]
+    assert _plan(hit) == _plan(first)
+    assert [d.day_date for d in hit.itinerary] == [later.start_date + datetime.timedelta(days=k)
+                                                   for k in range(3)]
+    assert hit.total_estimated_cost == first.total_estimated_cost
+
+    # 반환된 루트를 바꿔도 캐시에는 영향 없음
+    hit.itinerary[0].activities.clear()
+    assert _plan(system.generate_route(later)) == _plan(first)
+
+
+@pytest.mark.parametrize("change", [
+    {"days": 4},
+    {"schedule_type": "packed"},
+    {"transport_mode": "car"},
+    {"theme_id": 2},
+])
+def test_signature_fields_are_part_of_key(system, cache, make_preference, change):
+    system.generate_route(make_preference(days=3))
+    fields = {"days": 3, **change}
+    system.generate_route(make_preference(**fields))
+    assert cache.stats()["hits"] == 0 and cache.stats()["entries"] == 2
+
+
+def test_solver_is_part_of_key(system, cache, make_preference):
+    system.generate_route(make_preference(days=2), solver="greedy")
+    route = system.generate_route(make_preference(days=2), solver="beam")
+    assert cache.stats()["hits"] == 0
+    assert route.ai_model == "beam_search_orienteering"
+
+
+def test_catalog_change_invalidates_entry(system, cache, make_preference):
+    preference = make_preference(days=2)
+    system.generate_route(preference)
+    system.db.activities[0].estimated_cost = 99999.0
+
+    system.generate_route(preference)
+    assert cache.stats() == {"entries": 1, "hits": 0, "misses": 2, "invalidations": 1}
+    system.generate_route(preference)
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_bound_evicts_oldest(make_system, make_preference):
+    cache = RouteResultCache(max_entries=2)
+    system = make_system(route_cache=cache)
+    preferences = [make_preference(days=days) for days in (1, 2, 3)]
+    for preference in preferences:
+        system.generate_route(preference)
+    assert cache.stats()["entries"] == 2
+
+    assert cache.get(preferences[0], "any") is None
+    system.generate_route(preferences[0])
+    assert cache.stats()["hits"] == 0
+    system.generate_route(preferences[2])
+    assert cache.stats()["hits"] == 1
+
+
+def test_region_is_part_of_signature(make_preference):
+    plain = make_preference(days=2)
+    regional = make_preference(days=2, anchor_lat=37.5, anchor_lon=127.0, radius_km=5.0)
+    assert route_signature(plain) != route_signature(regional)
+    assert route_signature(plain, ("beam",)) != route_signature(plain, ("greedy",))
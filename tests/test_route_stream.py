@@ -0,0 +1,27 @@
+from AP_algorithm import AI_MODELS, DatabaseConnector, RouteTemplateStore
+from route_benchmark import make_catalog
+
+
+def test_streamed_template_hit_saves_template_model(make_system, make_preference, fake_connection):
+    catalog = make_catalog(400, "seoul", 4)
+    preference = make_preference(days=3, user_id=0)
+    builder = make_system(catalog, solver="beam")
+    version = builder.prepare_catalog(preference.theme_id, preference.transport_mode, None).fingerprint()
+    templates = RouteTemplateStore()
+    templates.put(preference, version, builder.generate_route(preference))
+    system = make_system(catalog, route_templates=templates)
+    db = DatabaseConnector(fake_connection)
+
+    # route_api 스트리밍 경로와 같은 순서: 요청 solver로 헤더 저장 -> 날짜별 저장
+    route = system.new_route(preference)
+    route.ai_model = AI_MODELS["greedy"]
+    db.save_route_header(route, preference)
+    for daily in system.iter_route_days(preference, route, solver="greedy"):
+        db.save_itinerary_day(route, daily)
+
+    assert route.ai_model == AI_MODELS["beam"]
+    updates = fake_connection.statements("UPDATE recommended_routes")
+    assert len(updates) == 3
+    sql, params = updates[-1]
+    assert "ai_model = %s" in sql
+    assert params == (route.total_estimated_cost, AI_MODELS["beam"], route.route_id)
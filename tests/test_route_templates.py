@@ -0,0 +1,54 @@
+import logging
+
+import pytest
+
+from AP_algorithm import AI_MODELS, RouteTemplateStore
+from route_benchmark import make_catalog
+
+SIGNATURE = {"theme_id": 0, "transport_mode": "public", "schedule_type": "relaxed", "num_days": 3}
+
+
+@pytest.fixture
+def catalog():
+    return make_catalog(400, "seoul", 4)
+
+
+def _prewarmed(make_system, catalog, **settings):
+    store = RouteTemplateStore()
+    builder = make_system(catalog, solver="beam", **settings)
+    assert builder.prewarm_templates([SIGNATURE], store) == 1
+    return store
+
+
+def test_template_from_same_engine_is_served(make_system, make_preference, catalog):
+    store = _prewarmed(make_system, catalog)
+    system = make_system(catalog, route_templates=store)
+
+    route = system.generate_route(make_preference(days=3, user_id=0))
+    assert route.ai_model == AI_MODELS["beam"]
+    assert route.trace["counters"]["route_template_hits"] == 1
+    assert store.stats()["hits"] == 1 and store.stats()["stale"] == 0
+
+
+def test_version_mismatch_is_counted_and_logged_once(make_system, make_preference, catalog, caplog):
+    # 점수 설정이 다른 배치 엔진 -> 카탈로그 버전 불일치
+    store = _prewarmed(make_system, catalog, theme_category_weights={0: {"food": 3.0}})
+    system = make_system(catalog, route_templates=store)
+
+    with caplog.at_level(logging.WARNING, logger="AP_algorithm"):
+        for _ in range(3):
+            route = system.generate_route(make_preference(days=3, user_id=0))
+            assert route.ai_model == AI_MODELS["greedy"]
+    assert store.stats()["stale"] == 3
+    assert len([r for r in caplog.records if "루트 템플릿" in r.getMessage()]) == 1
+
+
+def test_personalized_request_skips_template(make_system, make_preference, catalog):
+    store = _prewarmed(make_system, catalog)
+    system = make_system(catalog, route_templates=store)
+    system.db.user_preference_weights = lambda user_id: ({"food": 1.0}, "digest")
+
+    route = system.generate_route(make_preference(days=3, user_id=7))
+    assert route.trace["counters"]["route_template_skips_personalized"] == 1
+    assert "route_template_hits" not in route.trace["counters"]
+    assert store.stats()["hits"] == 0
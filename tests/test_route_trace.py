@@ -0,0 +1,53 @@
+import pytest
+
+from route_metrics import _CURRENT_TRACE, current_trace
+
+
+@pytest.fixture
+def system(make_system):
+    return make_system()
+
+
+@pytest.fixture
+def preference(make_preference):
+    return make_preference(days=3)
+
+
+def test_trace_is_not_visible_to_caller_between_days(system, preference):
+    route = system.new_route(preference)
+    days = system.iter_route_days(preference, route)
+    next(days)
+    assert _CURRENT_TRACE.get() is None
+    days.close()
+
+
+def test_interleaved_streams_keep_their_own_trace(system, preference):
+    r1, r2 = system.new_route(preference), system.new_route(preference)
+    g1, g2 = system.iter_route_days(preference, r1), system.iter_route_days(preference, r2)
+    for _ in range(3):
+        next(g1)
+        next(g2)
+    for g in (g1, g2):
+        with pytest.raises(StopIteration):
+            next(g)
+
+    for route in (r1, r2):
+        assert route.trace["counters"]["days"] == 3
+        assert "abandoned_streams" not in route.trace["counters"]
+
+
+def test_abandoned_stream_records_summary(system, preference):
+    route = system.new_route(preference)
+    days = system.iter_route_days(preference, route)
+    next(days)
+    days.close()
+    assert route.trace["counters"]["days"] == 1
+    assert route.trace["counters"]["abandoned_streams"] == 1
+
+
+def test_generate_route_nested_in_active_trace(system, preference):
+    with system._route_trace("outer", system.new_route(preference)) as outer:
+        route = system.generate_route(preference)
+        assert current_trace() is outer
+    assert route.trace is None
+    assert outer.counters["days"] == 3
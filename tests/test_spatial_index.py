@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from AP_algorithm import SpatialGridIndex, haversine_matrix
+from route_benchmark import make_catalog
+
+
+@pytest.fixture
+def catalog():
+    return make_catalog(2000, "seoul", 7)
+
+
+@pytest.fixture
+def points(catalog):
+    return np.array([a.lat for a in catalog]), np.array([a.lon for a in catalog])
+
+
+def _brute_force(lats, lons, alive, lat, lon, radius_km):
+    dist = haversine_matrix([lat], [lon], lats, lons)[0]
+    return np.flatnonzero(alive & (dist <= radius_km)), dist
+
+
+@pytest.mark.parametrize("cell_km", [0.5, 2.0, 7.0])
+@pytest.mark.parametrize("radius_km", [0.8, 3.0, 12.0])
+def test_radius_query_matches_brute_force(points, cell_km, radius_km):
+    lats, lons = points
+    index = SpatialGridIndex(lats, lons, cell_km)
+    rng = np.random.default_rng(1)
+    index.remove(rng.choice(lats.size, 500, replace=False))
+    even = lambda idx: idx % 2 == 0
+
+    for center in rng.choice(lats.size, 20, replace=False):
+        lat, lon = lats[center], lons[center]
+        expected, dist = _brute_force(lats, lons, index.alive, lat, lon, radius_km)
+        found, found_dist = index.query(lat, lon, radius_km, k=lats.size)
+        np.testing.assert_array_equal(found, expected)
+        np.testing.assert_allclose(found_dist, dist[expected])
+
+        found, _ = index.query(lat, lon, radius_km, k=lats.size, predicate=even)
+        np.testing.assert_array_equal(found, expected[expected % 2 == 0])
+
+
+def test_k_nearest_within_radius(points):
+    lats, lons = points
+    index = SpatialGridIndex(lats, lons)
+    expected, dist = _brute_force(lats, lons, index.alive, lats[0], lons[0], 5.0)
+    nearest = np.sort(expected[np.argsort(dist[expected])[:10]])
+
+    found, _ = index.query(lats[0], lons[0], 5.0, k=10)
+    np.testing.assert_array_equal(found, nearest)
+
+    index.remove(found)
+    assert not np.isin(index.query(lats[0], lons[0], 5.0, k=10)[0], found).any()
+    index.restore_all()
+    np.testing.assert_array_equal(index.query(lats[0], lons[0], 5.0, k=10)[0], nearest)
+
+
+def test_unbounded_spatial_mode_matches_full_scan(make_system, make_preference, catalog):
+    full = make_system(catalog)
+    spatial = make_system(catalog, candidate_mode="spatial",
+                          candidate_radius_minutes=100000, candidate_k=len(catalog))
+    preference = make_preference(days=3)
+
+    plan = lambda route: [[a.location_id for a in day.activities] for day in route.itinerary]
+    assert plan(spatial.generate_route(preference)) == plan(full.generate_route(preference))
@@ -0,0 +1,110 @@
+import random
+
+import numpy as np
+import pytest
+
+from theme_index import ThemeLocationIndex
+
+CATEGORIES = range(1, 9)
+TAGS = range(1, 13)
+
+
+def _dataset(seed, size=400):
+    rng = random.Random(seed)
+    locations = [
+        {"location_id": i, "name": f"loc-{i}", "latitude": 37.5, "longitude": 127.0,
+         "category_id": rng.choice(CATEGORIES), "category_name": f"cat-{i % 8}"}
+        for i in sorted(rng.sample(range(1, 5000), size))
+    ]
+    tag_rows = [
+        {"location_id": row["location_id"], "tag_id": tag, "tag_name": f"tag-{tag}"}
+        for row in locations for tag in rng.sample(TAGS, rng.randint(0, 4))
+    ]
+    rules = {}
+    for theme_id in range(1, 16):
+        categories = {c: rng.choice([1.0, 2.0]) for c in rng.sample(CATEGORIES, rng.randint(0, 3))}
+        tags = {t: (1.0, rng.random() < 0.4) for t in rng.sample(TAGS, rng.randint(0, 3))}
+        rules[theme_id] = {"categories": categories, "tags": tags}
+    names = {**{("category", c): f"cat-{c}" for c in CATEGORIES},
+             **{("tag", t): f"tag-{t}" for t in TAGS}}
+    return locations, tag_rows, rules, names
+
+
+def _brute_force(locations, tag_rows, rule):
+    tags = {}
+    for row in tag_rows:
+        tags.setdefault(row["location_id"], set()).add(row["tag_id"])
+    optional = [t for t, (_, required) in rule["tags"].items() if not required]
+    required = {t for t, (_, req) in rule["tags"].items() if req}
+    matched = []
+    for row in locations:
+        own = tags.get(row["location_id"], set())
+        hit = row["category_id"] in rule["categories"] or bool(own.intersection(optional))
+        if not rule["categories"] and not optional:
+            hit = bool(required)
+        if hit and required <= own:
+            matched.append(row["location_id"])
+    return matched
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_lookup_matches_brute_force(seed):
+    locations, tag_rows, rules, names = _dataset(seed)
+    index = ThemeLocationIndex()
+    index.apply(locations, tag_rows, rules, names, full=True)
+
+    for theme_id, rule in rules.items():
+        expected = _brute_force(locations, tag_rows, rule)
+        assert index.lookup(theme_id).tolist() == expected
+        assert [a.location_id for a in index.activities(theme_id)] == expected
+    assert index.lookup(999).size == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_refresh_equals_full_build(seed):
+    locations, tag_rows, rules, names = _dataset(seed)
+    cut = locations[len(locations) // 2]["location_id"]
+    index = ThemeLocationIndex()
+    index.apply([r for r in locations if r["location_id"] < cut],
+                [r for r in tag_rows if r["location_id"] < cut], rules, names, full=True)
+    before = {theme_id: index.lookup(theme_id).tolist() for theme_id in rules}
+
+    index.apply([r for r in locations if r["location_id"] >= cut],
+                [r for r in tag_rows if r["location_id"] >= cut], rules, names, full=False)
+
+    assert index.max_location_id == locations[-1]["location_id"]
+    assert len(index) == len(locations)
+    for theme_id, rule in rules.items():
+        ids = index.lookup(theme_id).tolist()
+        assert ids == _brute_force(locations, tag_rows, rule)
+        assert set(before[theme_id]) <= set(ids)
+
+
+def test_full_refresh_drops_removed_locations():
+    locations, tag_rows, rules, names = _dataset(5)
+    index = ThemeLocationIndex()
+    index.apply(locations, tag_rows, rules, names, full=True)
+    kept = locations[::2]
+    kept_ids = {r["location_id"] for r in kept}
+    index.apply(kept, [r for r in tag_rows if r["location_id"] in kept_ids], rules, names, full=True)
+
+    for theme_id in rules:
+        assert set(index.lookup(theme_id).tolist()) <= kept_ids
+
+
+def test_within_and_weights():
+    locations, tag_rows, rules, names = _dataset(6)
+    index = ThemeLocationIndex()
+    index.apply(locations, tag_rows, rules, names, full=True)
+    theme_id = max(rules, key=lambda t: index.lookup(t).size)
+    within = np.array(sorted(r["location_id"] for r in locations[:100]), dtype=np.int64)
+
+    activities = index.activities(theme_id, within)
+    assert [a.location_id for a in activities] == \
+        [i for i in index.lookup(theme_id).tolist() if i in set(within.tolist())]
+
+    rule = rules[theme_id]
+    expected = {f"cat-{c}": w for c, w in rule["categories"].items()}
+    expected.update({f"tag-{t}": w for t, (w, _) in rule["tags"].items()})
+    assert index.weights(theme_id) == expected
+    assert index.weights(999) is None
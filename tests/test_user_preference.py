@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from AP_algorithm import DatabaseConnector
+from user_preference import UserPreferenceVector
+
+
+SURVEY_AND_RATINGS = {
+    "AS last_id FROM survey_answers": [{"last_id": 7}],
+    "survey_option_categories": [
+        {"kind": "category", "feature_id": 1, "weight": 2.0},
+        {"kind": "tag", "feature_id": 5, "weight": 1.0},
+        {"kind": "category", "feature_id": 1, "weight": 0.5},
+    ],
+    # 평가 10 (좋아요, 활동 2개), 평가 11 (싫어요, 활동 1개)
+    "FROM route_ratings": [
+        {"rating_id": 10, "rating_type": "thumbs_up", "location_id": 100, "category_id": 1},
+        {"rating_id": 10, "rating_type": "thumbs_up", "location_id": 101, "category_id": 2},
+        {"rating_id": 11, "rating_type": "thumbs_down", "location_id": 102, "category_id": 2},
+    ],
+    "FROM location_tag_map": [{"location_id": 100, "tag_id": 5}],
+    "FROM location_categories": [{"category_id": 1, "name": "food"}, {"category_id": 2, "name": "museum"}],
+    "FROM location_tags": [{"tag_id": 5, "name": "palace"}],
+}
+
+
+def test_refresh_builds_and_saves_vector(fake_connection):
+    fake_connection.results.update(SURVEY_AND_RATINGS)
+    db = DatabaseConnector(fake_connection)
+
+    weights, digest = db.refresh_user_preference(42)
+
+    # 설문 food 2.5, palace 1.0 + 평가 (+0.5씩 나눔, -1.0)
+    assert weights == pytest.approx({"food": 3.0, "palace": 1.5, "museum": -0.5})
+    [(sql, params)] = fake_connection.statements("INSERT INTO user_preference_vectors")
+    assert params[0] == 42 and params[3:] == (7, 11)
+    codes, values = UserPreferenceVector.unpack(params[2])
+    assert dict(zip(codes.tolist(), values.tolist())) == {2: 0.5, 4: -0.5, 11: 0.5}
+    assert fake_connection.commits == 1
+    # 갱신 결과는 캐시에 바로 반영 (다음 조회는 DB를 쓰지 않음)
+    queries = len(fake_connection.queries)
+    assert db.user_preference_weights(42) == (weights, digest)
+    assert len(fake_connection.queries) == queries
+
+
+def test_request_path_only_reads_stored_vector(fake_connection):
+    fake_connection.results.update(SURVEY_AND_RATINGS)
+    db = DatabaseConnector(fake_connection)
+
+    assert db.user_preference_weights(42) is None
+    assert [sql.split(" FROM ")[1].split()[0] for sql, _ in fake_connection.queries] == \
+        ["user_preference_vectors"]
+    assert not fake_connection.statements("INSERT") and fake_connection.commits == 0
+
+    # 저장된 벡터는 그대로 사용
+    stored = UserPreferenceVector(42, survey_codes=np.array([2], dtype=np.int32),
+                                  survey_weights=np.array([1.5], dtype=np.float32), last_answer_id=7)
+    fake_connection.results["FROM user_preference_vectors"] = [{
+        "survey_vector": UserPreferenceVector.pack(stored.survey_codes, stored.survey_weights),
+        "rating_vector": b"", "last_answer_id": 7, "last_rating_id": 0,
+    }]
+    db.user_preferences.invalidate(42)
+    assert db.user_preference_weights(42) == ({"food": 1.5}, stored.digest())
+    assert not fake_connection.statements("INSERT")
+
+
+def test_personalized_scores_add_weighted_preference(make_system):
+    system = make_system(personalization_weight=2.0)
+    table = system.prepare_catalog(0)
+    personal = ({"food": 1.0, "museum": -0.5}, "digest")
+
+    scored = system.personalize_catalog(table, personal, reorder=False)
+    bonus = np.array([1.0 * ("food" in a.categories) - 0.5 * ("museum" in a.categories)
+                      for a in table.rows])
+    np.testing.assert_allclose(scored.score, table.score + 2.0 * bonus)
+
+    reordered = system.personalize_catalog(table, personal)
+    assert (np.diff(reordered.score) <= 0).all()
+    assert sorted(reordered.score.tolist()) == sorted(scored.score.tolist())
+
+
+def test_route_without_stored_vector_is_not_personalized(make_system, make_preference):
+    system = make_system()
+    system.db.user_preference_weights = lambda user_id: None if user_id == 1 else ({"food": 5.0}, "d")
+
+    plain = system.generate_route(make_preference(days=2, user_id=1))
+    personalized = system.generate_route(make_preference(days=2, user_id=2))
+
+    assert "personalized_catalogs" not in plain.trace["counters"]
+    assert personalized.trace["counters"]["personalized_catalogs"] == 1
+
+    def food_share(route):
+        activities = [a for day in route.itinerary for a in day.activities]
+        return sum("food" in a.categories for a in activities) / len(activities)
+
+    assert food_share(personalized) > food_share(plain)
@@ -0,0 +1,201 @@
+"""
+DB 테마 역색인
+
+locations/카테고리/태그 테이블로 만든 (카테고리|태그) -> location_id posting list로
+테마 후보를 교집합/합집합 연산만으로 찾는다 (DatabaseConnector catalog_source="db").
+"""
+
+import functools
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from route_models import Activity
+
+
+# ==================== 테마 역색인 ====================
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+
+
+def _location_activity(row: dict, tags: List[str]) -> Activity:
+    """장소 행(_catalog_rows) -> 카탈로그 단계 Activity (카테고리 + 태그)"""
+    categories = [row["category_name"]] if row.get("category_name") else []
+    categories += [tag for tag in tags if tag not in categories]
+    return Activity(
+        location_id=row["location_id"],
+        activity_name=row.get("name") or "",
+        lat=float(row["latitude"]),
+        lon=float(row["longitude"]),
+        location_name=row.get("name"),
+        location_address=row.get("address"),
+        activity_category_id=row.get("category_id"),
+        popularity_score=row.get("popularity_score", 0.0),
+        categories=categories,
+    )
+
+
+class ThemeLocationIndex:
+    """
+    테마/태그/카테고리 -> location_id 역색인 (DB 카탈로그 소스용, 스레드 안전)
+    
+    posting list는 location_id 오름차순 배열이다. 테마 조회는
+        (테마 카테고리 posting ∪ 선택 태그 posting) ∩ 필수 태그 posting들
+    로 계산하며 (필수 태그만 있으면 필수 태그의 교집합), 결과는 다음 갱신까지 재사용한다.
+    
+    갱신은 DatabaseConnector.refresh_theme_index()가 한다. 증분 갱신은 새로 추가된 장소
+    (location_id 증가분)만 반영하므로 수정/삭제는 full_refresh_seconds마다 전체 재구축으로 반영한다.
+    """
+    
+    def __init__(self, refresh_seconds: float = 300, full_refresh_seconds: float = 3600):
+        self.refresh_seconds = refresh_seconds
+        self.full_refresh_seconds = full_refresh_seconds
+        
+        self._activities = {}     # location_id -> Activity
+        self._postings = {}       # ("category", id) / ("tag", id) -> location_id 배열
+        self._rules = {}          # theme_id -> {"categories": {id: 가중치}, "tags": {id: (가중치, 필수)}}
+        self._names = {}          # ("category", id) / ("tag", id) -> 이름
+        self._lookups = {}        # theme_id -> location_id 배열 (갱신시 초기화)
+        self.max_location_id = 0
+        self.refreshed_at = None  # time.monotonic()
+        self.full_refreshed_at = None
+        self._lock = threading.Lock()
+        self.refresh_lock = threading.Lock()  # 갱신은 한 스레드만
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._activities)
+    
+    def needs_refresh(self) -> Optional[bool]:
+        """갱신 필요 여부 (None: 불필요, False: 증분 갱신, True: 전체 재구축)"""
+        now = time.monotonic()
+        if self.full_refreshed_at is None or now - self.full_refreshed_at > self.full_refresh_seconds:
+            return True
+        if now - self.refreshed_at > self.refresh_seconds:
+            return False
+        return None
+    
+    def apply(self, locations: List[dict], tag_rows: List[dict], rules: dict, names: dict,
+              full: bool):
+        """
+        DB 조회 결과 반영
+        
+        Parameters:
+        - locations: _catalog_rows 장소 행 (full=False면 max_location_id보다 큰 장소만)
+        - tag_rows: location_id, tag_id, tag_name 행
+        - rules: theme_id -> {"categories": {...}, "tags": {...}}
+        - names: ("category"|"tag", id) -> 이름
+        - full: True면 전체 교체, False면 추가
+        """
+        tags = {}
+        for row in tag_rows:
+            tags.setdefault(row["location_id"], []).append(row)
+        
+        additions = {}
+        activities = {}
+        for row in locations:
+            location_id = row["location_id"]
+            location_tags = tags.get(location_id, [])
+            activities[location_id] = _location_activity(row, [t["tag_name"] for t in location_tags])
+            additions.setdefault(("category", row["category_id"]), []).append(location_id)
+            for tag in location_tags:
+                additions.setdefault(("tag", tag["tag_id"]), []).append(location_id)
+        
+        with self._lock:
+            base_activities = {} if full else dict(self._activities)
+            base_postings = {} if full else dict(self._postings)
+            base_activities.update(activities)
+            for key, ids in additions.items():
+                ids = np.unique(np.asarray(ids, dtype=np.int64))
+                existing = base_postings.get(key)
+                # 증분 갱신의 새 장소는 기존 location_id보다 크므로 이어 붙여도 정렬이 유지된다
+                base_postings[key] = ids if existing is None else np.union1d(existing, ids)
+            
+            self._activities = base_activities
+            self._postings = base_postings
+            self._rules = rules
+            self._names = names
+            self._lookups = {}
+            if full:
+                self.max_location_id = max(activities, default=0)
+            elif activities:
+                self.max_location_id = max(self.max_location_id, max(activities))
+            now = time.monotonic()
+            self.refreshed_at = now
+            if full:
+                self.full_refreshed_at = now
+    
+    def lookup(self, theme_id: int) -> np.ndarray:
+        """테마에 맞는 location_id (오름차순, 테마 규칙이 없으면 빈 배열)"""
+        with self._lock:
+            ids = self._lookups.get(theme_id)
+            if ids is not None:
+                return ids
+            rule = self._rules.get(theme_id)
+            postings = self._postings
+        
+        ids = _EMPTY_IDS
+        if rule is not None:
+            optional = [("category", c) for c in rule["categories"]]
+            optional += [("tag", t) for t, (_, required) in rule["tags"].items() if not required]
+            required = [("tag", t) for t, (_, req) in rule["tags"].items() if req]
+            
+            ids = None
+            if optional:
+                ids = functools.reduce(np.union1d, (postings.get(key, _EMPTY_IDS) for key in optional))
+            # 짧은 posting부터 교집합 (중간 결과를 작게 유지)
+            for key in sorted(required, key=lambda k: postings.get(k, _EMPTY_IDS).size):
+                posting = postings.get(key, _EMPTY_IDS)
+                ids = posting if ids is None else np.intersect1d(ids, posting, assume_unique=True)
+            if ids is None:
+                ids = _EMPTY_IDS
+        
+        ids.flags.writeable = False
+        with self._lock:
+            if self._postings is postings:
+                self._lookups[theme_id] = ids
+        return ids
+    
+    def activities(self, theme_id: int, within: Optional[np.ndarray] = None) -> List[Activity]:
+        """
+        테마에 맞는 활동 (location_id 순)
+        
+        Parameters:
+        - theme_id: 테마 ID
+        - within: 이 location_id(오름차순)로 제한 (예: 여행 지역 안의 장소)
+        """
+        ids = self.lookup(theme_id)
+        if within is not None:
+            ids = np.intersect1d(ids, within, assume_unique=True)
+        with self._lock:
+            activities = self._activities
+        return [activities[i] for i in ids.tolist() if i in activities]
+    
+    def weights(self, theme_id: int) -> Optional[dict]:
+        """테마 매칭 가중치 {카테고리/태그 이름: 가중치} (테마 규칙이 없으면 None)"""
+        with self._lock:
+            rule = self._rules.get(theme_id)
+            names = self._names
+        if rule is None:
+            return None
+        weights = {}
+        for category_id, weight in rule["categories"].items():
+            name = names.get(("category", category_id))
+            if name:
+                weights[name] = max(weights.get(name, 0.0), weight)
+        for tag_id, (weight, _) in rule["tags"].items():
+            name = names.get(("tag", tag_id))
+            if name:
+                weights[name] = max(weights.get(name, 0.0), weight)
+        return weights
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "locations": len(self._activities),
+                "postings": len(self._postings),
+                "themes": len(self._rules),
+                "max_location_id": self.max_location_id,
+            }
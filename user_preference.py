@@ -0,0 +1,165 @@
+"""
+사용자 선호 벡터
+
+설문 응답과 루트 평가에서 계산한 카테고리/태그 희소 가중치 벡터와
+여러 DB 연결이 공유하는 LRU 캐시 (루트 개인화 점수용)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+
+# ==================== 사용자 선호 벡터 ====================
+
+# route_ratings 한 건이 선호 벡터에 더하는 크기 (루트 활동들의 카테고리/태그에 나눠 더함)
+RATING_PREFERENCE_WEIGHT = 1.0
+
+
+def feature_code(kind: str, feature_id: int) -> int:
+    """("category"|"tag", id) -> 선호 벡터 특징 코드 (카테고리 id * 2, 태그 id * 2 + 1)"""
+    return int(feature_id) * 2 + (1 if kind == "tag" else 0)
+
+
+def sparse_add(*vectors) -> tuple:
+    """
+    희소 벡터 합
+    
+    Parameters:
+    - vectors: (codes, weights) 쌍들
+    
+    Returns:
+    - (codes, weights): codes 오름차순 int32, weights float32 (0이 된 항목은 제외)
+    """
+    codes = np.concatenate([np.asarray(c, dtype=np.int64) for c, _ in vectors] +
+                           [np.empty(0, dtype=np.int64)])
+    weights = np.concatenate([np.asarray(w, dtype=np.float64) for _, w in vectors] + [np.empty(0)])
+    unique, inverse = np.unique(codes, return_inverse=True)
+    sums = np.bincount(inverse, weights=weights, minlength=unique.size)
+    keep = np.abs(sums) > 1e-6
+    return unique[keep].astype(np.int32), sums[keep].astype(np.float32)
+
+
+@dataclass
+class UserPreferenceVector:
+    """
+    사용자 선호 벡터 (user_preference_vectors 테이블)
+    
+    카테고리/태그 특징 코드(feature_code) -> 가중치의 희소 벡터를 설문 부분과 평가 부분으로
+    나눠 보관한다. 설문 부분은 답이 바뀌면(최신 answer id 변경) 다시 계산하고, 평가 부분은
+    last_rating_id 이후의 평가만 더한다.
+    """
+    user_id: int
+    survey_codes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    survey_weights: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    rating_codes: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int32))
+    rating_weights: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float32))
+    last_answer_id: int = 0
+    last_rating_id: int = 0
+    
+    def combined(self) -> tuple:
+        """설문 + 평가 벡터 (codes, weights)"""
+        return sparse_add((self.survey_codes, self.survey_weights),
+                          (self.rating_codes, self.rating_weights))
+    
+    def digest(self) -> str:
+        """벡터 내용 해시 (루트 결과 캐시 키용, 같은 벡터면 사용자가 달라도 같은 값)"""
+        codes, weights = self.combined()
+        return hashlib.sha1(self.pack(codes, weights)).hexdigest()[:16]
+    
+    @staticmethod
+    def pack(codes, weights) -> bytes:
+        """희소 벡터 -> BLOB (int32 코드 배열 + float32 가중치 배열, little endian)"""
+        return (np.asarray(codes, dtype="<i4").tobytes() +
+                np.asarray(weights, dtype="<f4").tobytes())
+    
+    @staticmethod
+    def unpack(blob: Optional[bytes]) -> tuple:
+        """BLOB -> (codes int32, weights float32)"""
+        data = np.frombuffer(blob or b"", dtype=np.uint8)
+        n = data.size // 8
+        return (data[:n * 4].view("<i4").astype(np.int32),
+                data[n * 4:n * 8].view("<f4").astype(np.float32))
+
+
+class UserPreferenceStore:
+    """
+    사용자 선호 가중치 메모리 캐시 (LRU + TTL, 스레드 안전, 여러 DB 연결이 공유)
+    
+    항목은 (특징 이름 -> 가중치, 벡터 digest)이며, 루트 엔진은 이를 카탈로그 카테고리
+    행렬과 한 번 내적해 개인화 점수를 계산한다. 선호 벡터가 없는 사용자(None)도 캐시한다.
+    특징 코드 -> 이름(카테고리/태그 이름)은 names_ttl_seconds마다 다시 불러온다.
+    """
+    
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 600,
+                 names_ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.names_ttl_seconds = names_ttl_seconds
+        
+        self._entries = OrderedDict()  # user_id -> ((weights, digest) 또는 None, loaded_at)
+        self._names = None             # 특징 코드 -> 이름
+        self._names_loaded_at = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id: int, loader) -> Optional[tuple]:
+        """
+        캐시 조회 (없거나 TTL이 지났으면 loader 호출)
+        
+        Parameters:
+        - user_id: 사용자 ID
+        - loader: 인자 없는 함수, (weights, digest) 또는 None 반환
+        
+        Returns:
+        - (weights, digest) 또는 None: weights는 {카테고리/태그 이름: 가중치} (수정 금지)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        
+        value = loader()
+        self.put(user_id, value)
+        return value
+    
+    def put(self, user_id: int, value: Optional[tuple]):
+        with self._lock:
+            self._entries[user_id] = (value, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+    
+    def names(self, loader) -> dict:
+        """특징 코드 -> 이름 (없거나 오래됐으면 loader 호출)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._names is not None and now - self._names_loaded_at <= self.names_ttl_seconds:
+                return self._names
+        names = loader()
+        with self._lock:
+            self._names = names
+            self._names_loaded_at = now
+        return names
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
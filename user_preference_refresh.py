@@ -0,0 +1,47 @@
+"""
+사용자 선호 벡터 갱신 (야간 배치)
+
+설문 응답/루트 평가가 선호 벡터(user_preference_vectors)보다 새로운 사용자를 찾아
+벡터를 증분 갱신해 저장한다. 루트 생성은 저장된 벡터를 읽기만 하므로, 갱신 API
+(/route-api/users/{user_id}/preferences/refresh)를 호출하지 않은 사용자도 다음 날부터
+개인화된다. route_api의 메모리 캐시는 TTL(기본 10분)이 지나면 새 벡터를 읽는다.
+
+사용 예 (cron):
+    30 3 * * * python user_preference_refresh.py --limit 5000
+"""
+
+import argparse
+import time
+
+from AP_algorithm import DatabaseConnector
+from route_engine import connect_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사용자 선호 벡터 갱신")
+    parser.add_argument("--limit", type=int, default=5000, help="한 번에 갱신할 최대 사용자 수")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    try:
+        db = DatabaseConnector(conn)
+
+        t0 = time.perf_counter()
+        user_ids = db.fetch_stale_preference_users(args.limit)
+        failed = 0
+        for user_id in user_ids:
+            try:
+                db.refresh_user_preference(user_id)
+            except Exception as e:
+                failed += 1
+                print(f"선호 벡터 갱신 실패 (user_id={user_id}): {str(e)}")
+        print(
+            f"선호 벡터 갱신: 사용자 {len(user_ids)}명 중 {len(user_ids) - failed}명 "
+            f"({time.perf_counter() - t0:.1f}s)"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()